@@ -0,0 +1,270 @@
+"""
+Persistent cache of what happens to a file before inference.
+
+    <key>.pcm   the decoded 16 kHz mono float32 samples, read back as a
+                memory map (nothing is loaded until the model reads it)
+    speech      the VAD speech regions, per file and VAD parameter set
+
+Entries are keyed by the file's path, size and mtime: a re-run of the same
+file - with another prompt, beam size, model or mode - skips demuxing,
+resampling and the VAD pass and goes straight to inference. A file whose
+speech map is empty is finished without decoding it or loading a model.
+
+The cache lives in Util.app_data_dir("audio_cache") and its PCM files are
+capped at global_vars.audio_cache_max_mb with LRU eviction (about 230 MB
+per hour of audio). Speech maps are tiny and kept for the newest
+SPEECH_MAX_ROWS files.
+
+Inspect / clear it with:
+    python audio_cache.py stats
+    python audio_cache.py list
+    python audio_cache.py clear
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import global_vars
+from util import Util
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 4  # float32
+SPEECH_MAX_ROWS = 10000
+
+
+class AudioCache:
+    def __init__(self, folder=None, max_bytes=None):
+        self.folder = folder or Util.app_data_dir("audio_cache")
+        self.max_bytes = max_bytes if max_bytes is not None else int(global_vars.audio_cache_max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        # Worker processes (see process_worker) share the same index
+        self._db = sqlite3.connect(os.path.join(self.folder, "index.sqlite"), timeout=30,
+                                   check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, source_path TEXT, samples INTEGER, size INTEGER,"
+                " created REAL, last_access REAL)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS speech ("
+                " key TEXT, params TEXT, samples INTEGER, regions TEXT, last_access REAL,"
+                " PRIMARY KEY (key, params))")
+
+    # --- KEYS ---
+    def key_for(self, file_path):
+        st = os.stat(file_path)
+        ident = f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}"
+        return hashlib.sha256(ident.encode("utf-8")).hexdigest()
+
+    def _pcm_path(self, key):
+        return os.path.join(self.folder, key + ".pcm")
+
+    # --- PCM ---
+    def _open(self, key, samples):
+        import numpy as np
+        if samples == 0:
+            return np.zeros(0, dtype=np.float32)
+        return np.memmap(self._pcm_path(key), dtype=np.float32, mode="r", shape=(samples,))
+
+    def has_pcm(self, file_path):
+        try:
+            key = self.key_for(file_path)
+        except OSError:
+            return False
+        with self._lock:
+            row = self._db.execute("SELECT key FROM entries WHERE key=?", (key,)).fetchone()
+        return row is not None and os.path.exists(self._pcm_path(key))
+
+    def load(self, file_path):
+        """ Memory-mapped samples of file_path, or None if they aren't cached. """
+        key = self.key_for(file_path)
+        with self._lock, self._db:
+            row = self._db.execute("SELECT samples FROM entries WHERE key=?", (key,)).fetchone()
+            if not row:
+                return None
+            if not os.path.exists(self._pcm_path(key)):
+                self._db.execute("DELETE FROM entries WHERE key=?", (key,))
+                return None
+            self._db.execute("UPDATE entries SET last_access=? WHERE key=?", (time.time(), key))
+        return self._open(key, row[0])
+
+    def writer(self, file_path):
+        """ PcmWriter that adds file_path's samples block by block. """
+        return PcmWriter(self, file_path)
+
+    def store(self, file_path, audio):
+        """ Saves decoded samples; returns them memory-mapped from the cache. """
+        writer = self.writer(file_path)
+        writer.write(audio)
+        return writer.commit()
+
+    def decode(self, file_path):
+        """ Cached samples, decoding (and caching) the file first if needed. """
+        audio = self.load(file_path)
+        if audio is None:
+            # Straight to disk a block at a time (see audio_stream)
+            import audio_stream
+            writer = self.writer(file_path)
+            try:
+                for block in audio_stream.StreamDecoder(file_path):
+                    writer.write(block)
+            except BaseException:
+                writer.abort()
+                raise
+            audio = writer.commit()
+        return audio
+
+    # --- SPEECH MAP ---
+    def cached_speech(self, file_path, vad_parameters):
+        """ (speech regions in samples, total samples), or None if not computed yet. """
+        key = self.key_for(file_path)
+        params = json.dumps(vad_parameters, sort_keys=True)
+        with self._lock, self._db:
+            row = self._db.execute("SELECT samples, regions FROM speech WHERE key=? AND params=?",
+                                   (key, params)).fetchone()
+            if not row:
+                return None
+            self._db.execute("UPDATE speech SET last_access=? WHERE key=? AND params=?", (time.time(), key, params))
+        return [{"start": start, "end": end} for start, end in json.loads(row[1])], row[0]
+
+    def speech(self, file_path, audio, vad_parameters):
+        """ Speech regions of audio (the samples of file_path), running the VAD if needed. """
+        cached = self.cached_speech(file_path, vad_parameters)
+        if cached is not None:
+            return cached[0]
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+        regions = get_speech_timestamps(audio, VadOptions(**vad_parameters))
+        self._save_speech(self.key_for(file_path), vad_parameters, len(audio), regions)
+        return [{"start": r["start"], "end": r["end"]} for r in regions]
+
+    def _save_speech(self, key, vad_parameters, samples, regions):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO speech VALUES (?, ?, ?, ?, ?)",
+                             (key, json.dumps(vad_parameters, sort_keys=True), samples,
+                              json.dumps([[r["start"], r["end"]] for r in regions]), time.time()))
+
+    # --- EVICTION ---
+    def _evict(self, keep=None):
+        with self._lock, self._db:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    if key == keep or not self._remove_file(key):
+                        continue
+                    self._db.execute("DELETE FROM entries WHERE key=?", (key,))
+                    total -= size
+            self._db.execute(
+                "DELETE FROM speech WHERE rowid NOT IN"
+                " (SELECT rowid FROM speech ORDER BY last_access DESC LIMIT ?)", (SPEECH_MAX_ROWS,))
+
+    def _remove_file(self, key):
+        try:
+            os.remove(self._pcm_path(key))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Still mapped by a running job (Windows); next time
+            return False
+        return True
+
+    # --- INSPECT / CLEAR ---
+    def stats(self):
+        with self._lock:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            maps = self._db.execute("SELECT COUNT(*) FROM speech").fetchone()[0]
+        return {"folder": self.folder, "entries": count, "bytes": total, "max_bytes": self.max_bytes,
+                "speech_maps": maps}
+
+    def entries(self):
+        with self._lock:
+            return self._db.execute(
+                "SELECT key, source_path, size, created, last_access FROM entries ORDER BY last_access DESC").fetchall()
+
+    def clear(self):
+        with self._lock, self._db:
+            for (key,) in self._db.execute("SELECT key FROM entries").fetchall():
+                if self._remove_file(key):
+                    self._db.execute("DELETE FROM entries WHERE key=?", (key,))
+            self._db.execute("DELETE FROM speech")
+
+
+class PcmWriter:
+    """
+    Writes decoded samples into the cache as they come (see audio_stream).
+    commit() makes them an entry - optionally with the file's speech map -
+    and returns them memory-mapped; abort() throws them away.
+    """
+    def __init__(self, cache, file_path):
+        self.cache = cache
+        self.file_path = file_path
+        self.key = cache.key_for(file_path)
+        # Unique name: two slots may decode the same file at once
+        self.part_path = f"{cache._pcm_path(self.key)}.{os.getpid()}.{threading.get_ident()}.part"
+        self.samples = 0
+        self._f = open(self.part_path, "wb")
+
+    def write(self, block):
+        import numpy as np
+        np.ascontiguousarray(block, dtype=np.float32).tofile(self._f)
+        self.samples += len(block)
+
+    def commit(self, vad_parameters=None, regions=None):
+        self._f.close()
+        os.replace(self.part_path, self.cache._pcm_path(self.key))
+        now = time.time()
+        with self.cache._lock, self.cache._db:
+            self.cache._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                                   (self.key, os.path.abspath(self.file_path), self.samples,
+                                    self.samples * BYTES_PER_SAMPLE, now, now))
+        if regions is not None:
+            self.cache._save_speech(self.key, vad_parameters, self.samples, regions)
+        self.cache._evict(keep=self.key)
+        return self.cache._open(self.key, self.samples)
+
+    def abort(self):
+        self._f.close()
+        try:
+            os.remove(self.part_path)
+        except OSError:
+            pass
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+def get_cache():
+    """ Shared instance (None when the cache is disabled). """
+    global _CACHE
+    if not global_vars.audio_cache_enabled:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = AudioCache()
+        return _CACHE
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = AudioCache()
+
+    if command == "stats":
+        s = cache.stats()
+        print(f"Folder:      {s['folder']}")
+        print(f"Entries:     {s['entries']}")
+        print(f"Size:        {s['bytes'] / 1024 / 1024:.1f} MB of {s['max_bytes'] / 1024 / 1024:.0f} MB")
+        print(f"Speech maps: {s['speech_maps']}")
+    elif command == "list":
+        for key, path, size, created, last_access in cache.entries():
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(last_access))
+            print(f"{key[:12]}  {size:>10}  {used}  {path}")
+    elif command == "clear":
+        cache.clear()
+        print("Cache cleared.")
+    else:
+        print("Usage: python audio_cache.py [stats|list|clear]")
+        sys.exit(1)
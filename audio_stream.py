@@ -0,0 +1,74 @@
+"""
+Streaming decode: a recording as consecutive blocks of 16 kHz mono float32
+samples, produced while the file is read.
+
+faster-whisper's decode_audio returns the whole file as one array (about
+230 MB per hour) and only then can transcription start. StreamDecoder
+demuxes just the audio stream (the video packets of an mp4 / mkv are
+skipped, never decoded) and resamples it frame by frame, so memory stays
+at one block however long the recording is. The transcription side (see
+transcribe_module) cuts the blocks into windows at silences and
+transcribes each window as soon as it is complete.
+"""
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class StreamDecoder:
+    """
+    Iterating yields float32 arrays of block_seconds (the last one shorter).
+    samples is what was decoded so far; done turns True after the last block.
+    """
+    def __init__(self, file_path, block_seconds=30):
+        self.file_path = file_path
+        self.block_samples = max(1, int(block_seconds * SAMPLE_RATE))
+        self.samples = 0
+        self.done = False
+
+    def _frames(self, container, stream):
+        import av
+
+        for packet in container.demux(stream):
+            try:
+                yield from packet.decode()
+            except av.error.InvalidDataError:
+                # A damaged packet costs its few milliseconds, not the file
+                continue
+
+    def __iter__(self):
+        import av
+
+        resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+        with av.open(self.file_path, mode="r", metadata_errors="ignore") as container:
+            if not container.streams.audio:
+                raise ValueError(f"No audio stream in {self.file_path}")
+            stream = container.streams.audio[0]
+            pending, pending_samples = [], 0
+            for frame in self._frames(container, stream):
+                for resampled in resampler.resample(frame):
+                    pending.append(resampled.to_ndarray().reshape(-1))
+                    pending_samples += pending[-1].shape[0]
+                if pending_samples >= self.block_samples:
+                    yield from self._emit(pending, final=False)
+                    pending_samples = sum(len(p) for p in pending)
+            # Flush what the resampler still holds
+            for resampled in resampler.resample(None):
+                pending.append(resampled.to_ndarray().reshape(-1))
+            yield from self._emit(pending, final=True)
+        self.done = True
+
+    def _emit(self, pending, final):
+        """ Yields full blocks from pending (in place); with final also the rest. """
+        samples = np.concatenate(pending) if len(pending) > 1 else (pending[0] if pending else None)
+        pending.clear()
+        if samples is None:
+            return
+        start = 0
+        while len(samples) - start >= self.block_samples or (final and start < len(samples)):
+            block = samples[start:start + self.block_samples]
+            start += len(block)
+            self.samples += len(block)
+            yield block.astype(np.float32) / 32768.0
+        if start < len(samples):
+            pending.append(samples[start:])
@@ -0,0 +1,584 @@
+"""
+Benchmarks for the transcription pipeline.
+
+Compare transcription modes on real recordings (throughput + transcript parity):
+    python benchmark.py compare call1.mp3 call2.wav --modes sequential batched
+
+Time the RTL document writers ("Open in Word") on a synthetic transcript:
+    python benchmark.py rtl --mb 8
+
+Offline suite: synthetic audio of fixed lengths through the pipeline, with a
+stub model (deterministic segments, no model files needed) or a real one.
+Each case runs in its own process so load time and peak RSS are its own:
+    python benchmark.py suite --backend stub --lengths 60 600 --json before.json
+    python benchmark.py suite --backend real --model-dir models --json after.json
+    python benchmark.py diff before.json after.json
+"""
+import argparse
+import difflib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from collections import namedtuple
+import eta
+import global_vars
+import transcribe_module
+
+
+def transcribe_timed(file_path, mode):
+    """ Returns (text, audio_seconds, wall_seconds) for one file in one mode. """
+    parts = []
+
+    def on_progress(percent, chunk_text):
+        if chunk_text:
+            parts.append(chunk_text)
+
+    start = time.perf_counter()
+    duration = transcribe_module.run_transcription(file_path, progress_callback=on_progress, mode=mode)
+    wall = time.perf_counter() - start
+    return " ".join(parts), duration or 0, wall
+
+
+def word_parity(reference, candidate):
+    """ Similarity of the two transcripts' word sequences, 0..1 (1 = identical). """
+    return difflib.SequenceMatcher(None, reference.split(), candidate.split(), autojunk=False).ratio()
+
+
+def compare_modes(files, modes):
+    # Load once up front so the first mode doesn't pay for it
+    transcribe_module.load_model_globally(status_callback=print)
+
+    results = []
+    for file_path in files:
+        texts = {}
+        for mode in modes:
+            text, audio_seconds, wall = transcribe_timed(file_path, mode)
+            texts[mode] = text
+            results.append({
+                "file": file_path,
+                "mode": mode,
+                "audio_seconds": audio_seconds,
+                "wall_seconds": wall,
+                "rtf": wall / audio_seconds if audio_seconds else None,
+                "speedup_vs_realtime": audio_seconds / wall if wall else None,
+                "words": len(text.split()),
+                "parity_vs_" + modes[0]: word_parity(texts[modes[0]], text),
+            })
+    return results
+
+
+def print_comparison(results, modes):
+    baseline = {r["file"]: r["wall_seconds"] for r in results if r["mode"] == modes[0]}
+    print(f"\n{'file':40} {'mode':12} {'RTF':>7} {'x realtime':>11} {'speedup':>8} {'parity':>7}")
+    for r in results:
+        speedup = baseline[r["file"]] / r["wall_seconds"] if r["wall_seconds"] else 0
+        rtf = f"{r['rtf']:.3f}" if r["rtf"] is not None else "n/a"
+        realtime = f"{r['speedup_vs_realtime']:.1f}" if r["speedup_vs_realtime"] else "n/a"
+        print(f"{r['file'][-40:]:40} {r['mode']:12} {rtf:>7} {realtime:>11} "
+              f"{speedup:>7.2f}x {r['parity_vs_' + modes[0]]:>7.3f}")
+
+
+# --- RTL DOCUMENT WRITERS ---
+_WORDS = ["مرحبا", "السلام", "عليكم", "شكرا", "اليوم", "اجتماع", "{note}", "2024", "OK"]
+_FakeSegment = namedtuple("_FakeSegment", "start end text avg_logprob no_speech_prob")
+
+
+def make_transcript(path, megabytes, seed=0):
+    """ Segment store of about megabytes of (mostly Arabic) UTF-8 text. """
+    import segment_store
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    size, t = 0, 0.0
+    with segment_store.SegmentWriter(path) as writer:
+        while size < target:
+            text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 30)))
+            writer.append(_FakeSegment(t, t + 4.0, text, -0.2, 0.01))
+            size += len(text.encode("utf-8"))
+            t += 4.0
+    return size
+
+
+def legacy_rtf(text):
+    """ The old per-character MediaItem.open_in_word_rtl encoder, kept as the baseline. """
+    import rtl_document
+    rtf_content = rtl_document.RTF_HEADER + rtl_document.RTF_PARAGRAPH
+    for char in text:
+        code = ord(char)
+        if code > 127:
+            rtf_content += f"\\u{code}?"
+        elif char == "\n":
+            rtf_content += "\\par "
+        elif char in ["{", "}", "\\"]:
+            rtf_content += "\\" + char
+        else:
+            rtf_content += char
+    return rtf_content + "}"
+
+
+def bench_rtl(megabytes, include_legacy=True):
+    from segment_store import SegmentStore
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        store_path = os.path.join(folder, "transcript.seg")
+        text_bytes = make_transcript(store_path, megabytes)
+        store = SegmentStore(store_path)
+
+        def record(name, wall, out_path):
+            results.append({"writer": name, "text_mb": text_bytes / 1024 / 1024, "wall_seconds": wall,
+                            "mb_per_second": text_bytes / 1024 / 1024 / wall if wall else None,
+                            "output_mb": os.path.getsize(out_path) / 1024 / 1024})
+
+        if include_legacy:
+            out_path = os.path.join(folder, "legacy.rtf")
+            start = time.perf_counter()
+            content = legacy_rtf(store.read_text())
+            with open(out_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            record("legacy rtf", time.perf_counter() - start, out_path)
+            del content
+
+        for fmt in ("rtf", "docx"):
+            out_path = os.path.join(folder, "out." + fmt)
+            start = time.perf_counter()
+            store.export(out_path, fmt)
+            record(fmt, time.perf_counter() - start, out_path)
+    return results
+
+
+def print_rtl(results):
+    print(f"\n{'writer':12} {'text MB':>8} {'seconds':>8} {'MB/s':>8} {'out MB':>8}")
+    for r in results:
+        print(f"{r['writer']:12} {r['text_mb']:>8.1f} {r['wall_seconds']:>8.2f} "
+              f"{r['mb_per_second']:>8.1f} {r['output_mb']:>8.1f}")
+
+
+# --- OFFLINE SUITE ---
+SUITE_PATHS = ("direct", "scheduler")
+STUB_SEGMENT_SECONDS = 4.0
+_STUB_WORDS = ["مرحبا", "السلام", "عليكم", "شكرا", "اليوم", "اجتماع", "الموضوع", "نعم"]
+_StubInfo = namedtuple("_StubInfo", "duration")
+
+
+def synthetic_audio_path(seconds, folder=None, seed=0):
+    """
+    16 kHz mono 16-bit WAV of exactly seconds: 2-6 s of voiced tones with
+    0.4-1.2 s pauses, so VAD finds speech regions like in a real call.
+    Generated once per (seconds, seed) and kept in the app data folder.
+    """
+    import numpy as np
+    from util import Util
+
+    folder = folder or Util.app_data_dir("benchmark_audio")
+    path = os.path.join(folder, f"synthetic_{int(seconds)}s_{seed}.wav")
+    if os.path.exists(path):
+        return path
+
+    rate = transcribe_module.SAMPLE_RATE
+    rng = np.random.default_rng(seed)
+    audio = np.zeros(int(seconds * rate), dtype=np.float32)
+    pos = 0
+    while pos < len(audio):
+        voiced = int(rng.uniform(2, 6) * rate)
+        t = np.arange(min(voiced, len(audio) - pos), dtype=np.float32) / rate
+        pitch = rng.uniform(100, 250)
+        tone = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in (1, 2, 3))
+        # Syllable-rate amplitude modulation
+        audio[pos:pos + len(t)] = 0.2 * tone * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+        pos += voiced + int(rng.uniform(0.4, 1.2) * rate)
+    audio += 0.005 * rng.standard_normal(len(audio)).astype(np.float32)
+
+    pcm = (np.clip(audio, -1, 1) * 32767).astype("<i2")
+    tmp_path = path + ".part"
+    with wave.open(tmp_path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+class StubModel:
+    """
+    Stands in for WhisperModel: one deterministic segment every
+    STUB_SEGMENT_SECONDS of audio, after sleeping rtf * segment length.
+    Accepts a WAV path or decoded samples, like WhisperModel.transcribe.
+    """
+    def __init__(self, rtf=0.01):
+        self.rtf = rtf
+
+    def transcribe(self, audio, **options):
+        if isinstance(audio, str):
+            import numpy as np
+            with wave.open(audio, "rb") as w:
+                samples = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+        else:
+            samples = audio
+        duration = len(samples) / transcribe_module.SAMPLE_RATE
+
+        def generate():
+            rng = random.Random(len(samples))
+            start = 0.0
+            while start < duration:
+                end = min(duration, start + STUB_SEGMENT_SECONDS)
+                time.sleep(self.rtf * (end - start))
+                text = " ".join(rng.choice(_STUB_WORDS) for _ in range(8))
+                yield _FakeSegment(start, end, text, -0.2, 0.01)
+                start = end
+
+        return generate(), _StubInfo(duration)
+
+
+def peak_rss_bytes():
+    """ Peak resident memory of this process so far (None if unknown). """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    except Exception:
+        return None
+
+
+class _CallbackTimer:
+    """ Wraps callbacks and adds up the time spent inside them (on the worker thread). """
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.first_call = None
+        self._lock = threading.Lock()
+
+    def wrap(self, callback):
+        def timed(*args):
+            start = time.perf_counter()
+            try:
+                return callback(*args)
+            finally:
+                end = time.perf_counter()
+                with self._lock:
+                    if self.first_call is None:
+                        self.first_call = start
+                    self.seconds += end - start
+                    self.calls += 1
+        return timed
+
+
+def _run_direct(audio_path, mode, work_dir):
+    """ run_transcription with the callbacks the scheduler passes (segment store + UI bus). """
+    from segment_store import SegmentWriter
+    from ui_bus import UIEventBus
+
+    bus = UIEventBus()
+    job = namedtuple("_BenchJob", "job_id")(0)
+    segments = _CallbackTimer()
+    progress = _CallbackTimer()
+    with SegmentWriter(os.path.join(work_dir, "direct.seg")) as writer:
+        def on_progress(percent, chunk_text):
+            if writer.commit_due():
+                writer.flush(sync=True)
+            bus.post_progress(job, percent, chunk_text)
+
+        start = time.perf_counter()
+        duration = transcribe_module.run_transcription(
+            audio_path, progress_callback=progress.wrap(on_progress), mode=mode,
+            segment_callback=segments.wrap(writer.append))
+        wall = time.perf_counter() - start
+        count = writer.count
+    bus.drain()
+
+    return {
+        "audio_seconds": duration, "wall_seconds": wall, "segments": count,
+        "ttfs_seconds": segments.first_call - start if segments.first_call else None,
+        "callback_seconds": segments.seconds + progress.seconds,
+        "callback_calls": segments.calls + progress.calls,
+    }
+
+
+class _BenchListener:
+    """ Scheduler listener that behaves like the window: posts to a UI bus drained on a clock. """
+    def __init__(self):
+        from ui_bus import UIEventBus
+        self.bus = UIEventBus()
+        self.timer = _CallbackTimer()
+        self.first_text = None
+        self.finished = threading.Event()
+        self.result = None
+        self.drain_seconds = 0.0
+        self.on_job_started = self.timer.wrap(lambda job: self.bus.post("started", job))
+        self.on_job_progress = self.timer.wrap(self._progress)
+        self.on_job_done = self.timer.wrap(lambda job: self._finish(job, "done"))
+        self.on_job_stopped = self.timer.wrap(lambda job: self._finish(job, "stopped"))
+        self.on_job_error = self.timer.wrap(lambda job, msg: self._finish(job, f"error: {msg}"))
+
+    def _progress(self, job, percent, chunk_text):
+        if chunk_text and self.first_text is None:
+            self.first_text = time.perf_counter()
+        self.bus.post_progress(job, percent, chunk_text)
+
+    def _finish(self, job, result):
+        self.result = result
+        self.bus.post(result, job)
+        self.finished.set()
+
+    def ui_clock(self):
+        # Stand-in for TranscriptorQueueApp.ui_tick
+        while not self.finished.is_set():
+            time.sleep(global_vars.ui_refresh_ms / 1000)
+            start = time.perf_counter()
+            self.bus.drain()
+            self.drain_seconds += time.perf_counter() - start
+
+
+def _run_scheduler(audio_path, mode, work_dir):
+    """ The same file through TranscriptionScheduler.worker_loop, as the GUI runs it. """
+    from job_model import Job
+    from scheduler import TranscriptionScheduler
+
+    global_vars.transcription_mode = mode
+    listener = _BenchListener()
+    scheduler = TranscriptionScheduler(listener, worker_count=1)
+    # Benchmark runs must not change the ETAs of real batches
+    scheduler.rtf = eta.RtfEstimator(os.path.join(work_dir, "rtf.json"))
+    scheduler.start()
+    # Loads the model where the jobs will run (a worker process, or here)
+    load_start = time.perf_counter()
+    scheduler.warm_up()
+    load_seconds = time.perf_counter() - load_start
+    clock = threading.Thread(target=listener.ui_clock, daemon=True)
+    clock.start()
+
+    job = Job(0, audio_path)
+    start = time.perf_counter()
+    scheduler.submit(job)
+    listener.finished.wait()
+    wall = time.perf_counter() - start
+    clock.join()
+    scheduler.shutdown()
+    if listener.result != "done":
+        raise RuntimeError(f"Benchmark job ended with {listener.result}")
+
+    from segment_store import SegmentStore
+    store = SegmentStore(job.recovery_file)
+    return {
+        "audio_seconds": store.segment(len(store) - 1).end if len(store) else 0.0,
+        "wall_seconds": wall, "segments": len(store),
+        # What the user sees: the first text reaching the UI bus
+        "ttfs_seconds": listener.first_text - start if listener.first_text else None,
+        "callback_seconds": listener.timer.seconds,
+        "callback_calls": listener.timer.calls,
+        "ui_drain_seconds": listener.drain_seconds,
+        "model_load_seconds": load_seconds,
+    }
+
+
+def run_case(audio_path, backend, mode, path, model_dir=None, stub_rtf=0.01):
+    """ One measurement in this (fresh) process. """
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Measure the pipeline, not the caches around it
+        global_vars.rec_folder = work_dir
+        global_vars.result_cache_enabled = False
+        global_vars.audio_cache_enabled = False
+        global_vars.prefetch_enabled = False
+        if backend == "stub":
+            transcribe_module._create_model = lambda num_workers, model_dir=None: StubModel(stub_rtf)
+            # The stub only exists in this process
+            global_vars.worker_isolation = "thread"
+            # Streaming needs faster-whisper's VAD to cut windows
+            global_vars.stream_decode = False
+        elif model_dir:
+            global_vars.models = dict(global_vars.models, **{global_vars.default_model: os.path.abspath(model_dir)})
+
+        if path == "direct":
+            start = time.perf_counter()
+            transcribe_module.load_model_globally()
+            load_seconds = time.perf_counter() - start
+            result = _run_direct(audio_path, mode, work_dir)
+            result["model_load_seconds"] = load_seconds
+        else:
+            result = _run_scheduler(audio_path, mode, work_dir)
+
+    audio_seconds = result["audio_seconds"] or 0
+    result.update({
+        "isolation": global_vars.worker_isolation if path == "scheduler" else "thread",
+        "rtf": result["wall_seconds"] / audio_seconds if audio_seconds else None,
+        "callback_overhead": result["callback_seconds"] / result["wall_seconds"] if result["wall_seconds"] else None,
+        "peak_rss_mb": peak_rss_bytes() / 1024 / 1024 if peak_rss_bytes() else None,
+        "device": transcribe_module.DEVICE or backend,
+        "compute_type": transcribe_module.COMPUTE_TYPE,
+    })
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_suite(lengths, backend, modes, paths, model_dir=None, stub_rtf=0.01, repeat=1):
+    if backend == "stub" and set(modes) - {"sequential"}:
+        raise ValueError("The stub model only runs the sequential mode (chunked / batched need faster-whisper)")
+
+    cases = []
+    for seconds in lengths:
+        audio_path = synthetic_audio_path(seconds)
+        for mode in modes:
+            for path in paths:
+                for n in range(repeat):
+                    case = {"audio": os.path.basename(audio_path), "length_seconds": seconds,
+                            "mode": mode, "path": path, "run": n}
+                    print(f"Running {case['audio']} / {mode} / {path} (run {n + 1}/{repeat})...")
+                    # Fresh process per case: cold model load, peak RSS of this case only
+                    cmd = [sys.executable, os.path.abspath(__file__), "_case", audio_path,
+                           "--backend", backend, "--mode", mode, "--path", path, "--stub-rtf", str(stub_rtf)]
+                    if model_dir:
+                        cmd += ["--model-dir", model_dir]
+                    proc = subprocess.run(cmd, capture_output=True, text=True)
+                    lines = proc.stdout.strip().splitlines()
+                    if proc.returncode != 0 or not lines:
+                        case["error"] = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+                        print(f"  failed: {case['error']}")
+                    else:
+                        case.update(json.loads(lines[-1]))
+                    cases.append(case)
+
+    return {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": backend,
+        "model_dir": os.path.abspath(model_dir) if model_dir else None,
+        "stub_rtf": stub_rtf if backend == "stub" else None,
+        "settings": {"worker_count": global_vars.worker_count, "batch_size": global_vars.batch_size,
+                     "chunk_seconds": global_vars.chunk_seconds, "ui_refresh_ms": global_vars.ui_refresh_ms},
+        "cases": cases,
+    }
+
+
+def _fmt(value, pattern):
+    return format(value, pattern) if value is not None else "n/a"
+
+
+def print_suite(report):
+    print(f"\n{'audio':26} {'mode':10} {'path':9} {'load s':>7} {'TTFS s':>7} {'RTF':>7} "
+          f"{'peak MB':>8} {'cb ms':>8} {'cb %':>6}")
+    for c in report["cases"]:
+        if "error" in c:
+            print(f"{c['audio']:26} {c['mode']:10} {c['path']:9} error: {c['error']}")
+            continue
+        print(f"{c['audio']:26} {c['mode']:10} {c['path']:9} {_fmt(c['model_load_seconds'], '7.2f')} "
+              f"{_fmt(c['ttfs_seconds'], '7.2f')} {_fmt(c['rtf'], '7.4f')} {_fmt(c['peak_rss_mb'], '8.0f')} "
+              f"{c['callback_seconds'] * 1000:8.1f} {_fmt(c['callback_overhead'] and c['callback_overhead'] * 100, '6.2f')}")
+
+
+def diff_reports(old_path, new_path):
+    """ Prints new / old for every case the two result files share. """
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    def key(c):
+        return c["length_seconds"], c["mode"], c["path"], c["run"]
+    old_cases = {key(c): c for c in old["cases"] if "error" not in c}
+    metrics = ("model_load_seconds", "ttfs_seconds", "rtf", "peak_rss_mb", "callback_seconds")
+
+    print(f"{old.get('commit')} -> {new.get('commit')}  (ratio new/old, < 1 is better)")
+    print(f"{'length':>7} {'mode':10} {'path':9} " + " ".join(f"{m.split('_')[0]:>9}" for m in metrics))
+    for c in new["cases"]:
+        before = old_cases.get(key(c))
+        if before is None or "error" in c:
+            continue
+        ratios = []
+        for m in metrics:
+            ratios.append(_fmt(c[m] / before[m] if c.get(m) is not None and before.get(m) else None, "9.3f"))
+        print(f"{c['length_seconds']:>7} {c['mode']:10} {c['path']:9} " + " ".join(ratios))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcription pipeline benchmarks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    compare = sub.add_parser("compare", help="Compare transcription modes on real files")
+    compare.add_argument("files", nargs="+")
+    compare.add_argument("--modes", nargs="+", default=["sequential", "batched"],
+                         choices=transcribe_module.TRANSCRIPTION_MODES,
+                         help="First mode is the reference for speedup and parity")
+    compare.add_argument("--json", help="Also write the results to this file")
+
+    rtl = sub.add_parser("rtl", help="Time the RTF / DOCX writers on a synthetic transcript")
+    rtl.add_argument("--mb", type=float, default=8, help="Size of the transcript text")
+    rtl.add_argument("--skip-legacy", action="store_true", help="Don't run the old per-character encoder")
+    rtl.add_argument("--json", help="Also write the results to this file")
+
+    suite = sub.add_parser("suite", help="Offline pipeline benchmark on synthetic audio")
+    suite.add_argument("--backend", choices=["stub", "real"], default="stub")
+    suite.add_argument("--model-dir", help="Model folder for --backend real (default: the app's)")
+    suite.add_argument("--lengths", nargs="+", type=float, default=[60, 600], help="Audio lengths in seconds")
+    suite.add_argument("--modes", nargs="+", default=["sequential"], choices=transcribe_module.TRANSCRIPTION_MODES)
+    suite.add_argument("--paths", nargs="+", default=list(SUITE_PATHS), choices=SUITE_PATHS,
+                       help="direct = run_transcription, scheduler = through worker_loop")
+    suite.add_argument("--stub-rtf", type=float, default=0.01, help="Simulated compute per audio second")
+    suite.add_argument("--repeat", type=int, default=1)
+    suite.add_argument("--json", help="Write the results to this file")
+
+    diff = sub.add_parser("diff", help="Compare two suite result files")
+    diff.add_argument("old")
+    diff.add_argument("new")
+
+    # Internal: one suite case in a fresh process, result as JSON on stdout
+    case = sub.add_parser("_case")
+    case.add_argument("audio")
+    case.add_argument("--backend", choices=["stub", "real"], default="stub")
+    case.add_argument("--model-dir")
+    case.add_argument("--mode", default="sequential")
+    case.add_argument("--path", default="direct", choices=SUITE_PATHS)
+    case.add_argument("--stub-rtf", type=float, default=0.01)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        results = compare_modes(args.files, args.modes)
+        print_comparison(results, args.modes)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    elif args.command == "suite":
+        report = run_suite(args.lengths, args.backend, args.modes, args.paths,
+                           model_dir=args.model_dir, stub_rtf=args.stub_rtf, repeat=args.repeat)
+        print_suite(report)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+    elif args.command == "diff":
+        diff_reports(args.old, args.new)
+    elif args.command == "_case":
+        result = run_case(args.audio, args.backend, args.mode, args.path,
+                          model_dir=args.model_dir, stub_rtf=args.stub_rtf)
+        print(json.dumps(result))
+    elif args.command == "rtl":
+        results = bench_rtl(args.mb, include_legacy=not args.skip_legacy)
+        print_rtl(results)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Headless batch transcription (no window needed).
+
+Usage:
+    python cli.py INPUT [INPUT ...] -o OUTPUT_DIR
+
+INPUT can be a file, a glob pattern ("calls/**/*.mp3") or a directory
+(scanned recursively for media files). Each transcript is written to
+OUTPUT_DIR as <name>.txt, in the folder layout below the directory, below
+the fixed part of the glob ("calls/2024/a.mp3" -> OUTPUT_DIR/2024/a.txt) or
+below the common folder of the files given one by one. Files whose
+transcript already exists are skipped, so an interrupted run can simply be
+started again. Two inputs that would get the same transcript path stop the
+run before anything is transcribed.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import transcribe_module
+import global_vars
+from util import Util
+
+
+def is_media_file(path):
+    return os.path.splitext(path)[1].lower() in global_vars.media_extensions
+
+
+def glob_base(pattern):
+    """ The folder part of pattern before the first wildcard ("calls/**/*.mp3" -> "calls"). """
+    parts = []
+    for part in os.path.dirname(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or "."
+
+
+def collect_inputs(inputs):
+    """
+    Expands files / globs / directories into a list of (file_path, base_dir).
+    base_dir is used to mirror the folder layout in the output directory.
+    """
+    found = []
+    seen = set()
+    single_files = []
+
+    def add(path, base_dir):
+        key = os.path.abspath(path)
+        if key in seen:
+            return
+        seen.add(key)
+        found.append((path, base_dir))
+
+    for entry in inputs:
+        if os.path.isdir(entry):
+            for root, dirs, files in os.walk(entry):
+                dirs.sort()
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    if is_media_file(path):
+                        add(path, entry)
+        elif glob.has_magic(entry):
+            base_dir = glob_base(entry)
+            for path in sorted(glob.glob(entry, recursive=True)):
+                if os.path.isfile(path) and is_media_file(path):
+                    add(path, base_dir)
+        elif os.path.isfile(entry):
+            single_files.append(entry)
+        else:
+            print(f"Warning: no such file or directory: {entry}", file=sys.stderr)
+
+    if single_files:
+        # Same name in different folders must not end up in the same place
+        base_dir = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in single_files])
+        for path in single_files:
+            add(path, base_dir)
+
+    return found
+
+
+def find_collisions(jobs, output_dir):
+    """ [(out_path, [file_path, ...])] for transcript paths more than one input maps to. """
+    targets = {}
+    for file_path, base_dir in jobs:
+        out_path = os.path.normcase(os.path.abspath(output_path_for(file_path, base_dir, output_dir)))
+        targets.setdefault(out_path, []).append(file_path)
+    return [(out_path, files) for out_path, files in targets.items() if len(files) > 1]
+
+
+def output_path_for(file_path, base_dir, output_dir):
+    rel = os.path.relpath(file_path, base_dir or ".")
+    return os.path.join(output_dir, os.path.splitext(rel)[0] + ".txt")
+
+
+def transcribe_file(file_path, out_path):
+    """
+    Transcribes one file into out_path. Text goes to a .part file first and is
+    renamed at the end, so a half-written transcript never counts as done.
+    Returns the audio duration in seconds.
+    """
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    part_path = out_path + ".part"
+    try:
+        with open(part_path, "w", encoding="utf-8") as f:
+            def on_progress(percent, chunk_text):
+                if chunk_text:
+                    f.write(chunk_text + " ")
+
+            duration = transcribe_module.run_transcription(file_path, progress_callback=on_progress)
+        os.replace(part_path, out_path)
+        return duration or 0
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+
+def format_throughput(audio_seconds, wall_seconds):
+    if wall_seconds <= 0:
+        return "n/a"
+    return f"{audio_seconds / wall_seconds:.2f} audio-hours/wall-hour"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe media files without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="Files, glob patterns or directories")
+    parser.add_argument("-o", "--output-dir", required=True, help="Where to write the .txt transcripts")
+    parser.add_argument("--overwrite", action="store_true", help="Redo files whose transcript already exists")
+    parser.add_argument("--model", choices=list(global_vars.models), default=global_vars.default_model,
+                        help="Which of the configured models to use")
+    args = parser.parse_args(argv)
+    global_vars.default_model = args.model
+
+    jobs = collect_inputs(args.inputs)
+    if not jobs:
+        print("No media files found.", file=sys.stderr)
+        return 1
+
+    collisions = find_collisions(jobs, args.output_dir)
+    if collisions:
+        for out_path, files in collisions:
+            print(f"Error: {', '.join(files)} would all be written to {out_path}", file=sys.stderr)
+        print("Pass their common parent folder (or a glob below it) instead, so the layout is kept.", file=sys.stderr)
+        return 2
+
+    print(f"Found {len(jobs)} file(s).")
+    transcribe_module.load_model_globally(status_callback=print)
+
+    done = skipped = failed = 0
+    audio_seconds = 0.0
+    start = time.perf_counter()
+
+    try:
+        for index, (file_path, base_dir) in enumerate(jobs, 1):
+            out_path = output_path_for(file_path, base_dir, args.output_dir)
+            prefix = f"[{index}/{len(jobs)}] {file_path}"
+
+            if os.path.exists(out_path) and not args.overwrite:
+                print(f"{prefix}: skipped (output exists)")
+                skipped += 1
+                continue
+
+            file_start = time.perf_counter()
+            try:
+                duration = transcribe_file(file_path, out_path)
+            except Exception as e:
+                print(f"{prefix}: FAILED ({e})", file=sys.stderr)
+                failed += 1
+                continue
+
+            elapsed = time.perf_counter() - file_start
+            done += 1
+            audio_seconds += duration
+            print(f"{prefix}: done in {Util.format_duration(elapsed)} "
+                  f"(audio {Util.format_duration(duration)}, {format_throughput(duration, elapsed)})")
+    except KeyboardInterrupt:
+        print("\nInterrupted. Run the same command again to continue.", file=sys.stderr)
+
+    wall = time.perf_counter() - start
+    print(f"\nDone: {done}, skipped: {skipped}, failed: {failed}")
+    print(f"Audio: {Util.format_duration(audio_seconds)} in {Util.format_duration(wall)} "
+          f"-> {format_throughput(audio_seconds, wall)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Picks the device / compute type the model runs with.
+
+Order of precedence:
+  1. Environment: TRANSCRIPTOR_DEVICE, TRANSCRIPTOR_COMPUTE_TYPE, TRANSCRIPTOR_CPU_THREADS
+  2. global_vars.device / compute_type / cpu_threads (when not "auto" / 0)
+  3. The calibration winner cached for this machine (see calibrate())
+  4. Built-in preference: CUDA float16 -> int8_float16, then CPU int8 -> int8_float32
+
+Run "python device_select.py --calibrate" to measure every candidate once and
+cache the fastest one.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from collections import namedtuple
+import global_vars
+from util import Util
+
+DeviceConfig = namedtuple("DeviceConfig", ["device", "compute_type", "cpu_threads"])
+
+# Fastest first
+PREFERRED_COMPUTE_TYPES = {
+    "cuda": ["float16", "int8_float16", "int8", "float32"],
+    "cpu": ["int8", "int8_float32", "float32"],
+}
+
+CALIBRATION_FILE = "device_calibration.json"
+DEFAULT_MODEL_DIR = Util.resource_path("models")
+
+
+def _setting(env_name, config_value, default):
+    value = os.environ.get(env_name)
+    if value:
+        return value
+    if config_value not in (None, "", "auto", 0):
+        return config_value
+    return default
+
+
+def requested_device():
+    return _setting("TRANSCRIPTOR_DEVICE", global_vars.device, "auto")
+
+
+def requested_compute_type():
+    return _setting("TRANSCRIPTOR_COMPUTE_TYPE", global_vars.compute_type, "auto")
+
+
+def cpu_threads_per_worker(workers):
+    """ Threads for each CTranslate2 worker (intra_threads). """
+    requested = int(_setting("TRANSCRIPTOR_CPU_THREADS", global_vars.cpu_threads, 0))
+    if requested:
+        return requested
+    # Split the cores between the concurrent slots so they don't fight
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def cuda_available():
+    try:
+        import ctranslate2
+        return ctranslate2.get_cuda_device_count() > 0
+    except Exception:
+        return False
+
+
+def supported_compute_types(device):
+    try:
+        import ctranslate2
+        return set(ctranslate2.get_supported_compute_types(device))
+    except Exception:
+        return set()
+
+
+def detect_candidates(workers=1):
+    """ All working-looking configurations on this machine, fastest first. """
+    threads = cpu_threads_per_worker(workers)
+    devices = ["cuda", "cpu"] if cuda_available() else ["cpu"]
+
+    candidates = []
+    for device in devices:
+        supported = supported_compute_types(device)
+        for compute_type in PREFERRED_COMPUTE_TYPES[device]:
+            if not supported or compute_type in supported:
+                candidates.append(DeviceConfig(device, compute_type, threads))
+    return candidates
+
+
+def candidate_configs(workers=1):
+    """
+    Configurations to try, in order. The loader falls through to the next
+    one when a configuration fails to load (e.g. CUDA libraries missing).
+    """
+    threads = cpu_threads_per_worker(workers)
+    device = requested_device()
+    compute_type = requested_compute_type()
+
+    # Fully pinned: no guessing, let it fail loudly if it doesn't work
+    if device != "auto" and compute_type != "auto":
+        return [DeviceConfig(device, compute_type, threads)]
+
+    candidates = detect_candidates(workers)
+    if device != "auto":
+        candidates = [c for c in candidates if c.device == device] or \
+            [DeviceConfig(device, t, threads) for t in PREFERRED_COMPUTE_TYPES.get(device, ["default"])]
+    if compute_type != "auto":
+        candidates = [c for c in candidates if c.compute_type == compute_type] or \
+            [DeviceConfig("cpu", compute_type, threads)]
+
+    cached = load_calibration()
+    if cached:
+        winner = DeviceConfig(cached["device"], cached["compute_type"], threads)
+        if winner in candidates:
+            candidates.remove(winner)
+            candidates.insert(0, winner)
+
+    if global_vars.calibrate_device or os.environ.get("TRANSCRIPTOR_CALIBRATE") == "1":
+        if not cached and len(candidates) > 1:
+            best = calibrate(candidates)
+            if best:
+                candidates.remove(best)
+                candidates.insert(0, best)
+
+    return candidates
+
+
+# --- CALIBRATION ---
+
+def machine_key(model_dir=None):
+    """ Identifies this machine + model so a cached winner is not reused elsewhere. """
+    parts = [
+        platform.node(),
+        platform.machine(),
+        platform.processor(),
+        str(os.cpu_count()),
+        str(cuda_available()),
+        os.path.abspath(model_dir or DEFAULT_MODEL_DIR),
+    ]
+    return "|".join(parts)
+
+
+def _calibration_path():
+    return os.path.join(Util.app_data_dir(), CALIBRATION_FILE)
+
+
+def load_calibration():
+    path = _calibration_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get(machine_key())
+    except Exception as e:
+        print(f"Ignoring calibration cache: {e}")
+        return None
+
+
+def save_calibration(config, rtf):
+    path = _calibration_path()
+    data = {}
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            data = {}
+    data[machine_key()] = {
+        "device": config.device,
+        "compute_type": config.compute_type,
+        "rtf": rtf,
+        "measured_at": time.time(),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def _calibration_audio(seconds):
+    """ A real clip if global_vars.calibration_audio is set, otherwise synthetic audio. """
+    import numpy as np
+    sample_rate = 16000
+
+    if global_vars.calibration_audio and os.path.exists(global_vars.calibration_audio):
+        from faster_whisper import decode_audio
+        audio = decode_audio(global_vars.calibration_audio, sampling_rate=sample_rate)
+        return audio[:int(seconds * sample_rate)]
+
+    # Speech-band tones + a little noise: enough to make the decoder run
+    t = np.arange(int(seconds * sample_rate), dtype=np.float32) / sample_rate
+    audio = 0.1 * np.sin(2 * np.pi * 220 * t) * (1 + np.sin(2 * np.pi * 3 * t))
+    audio += 0.01 * np.random.default_rng(0).standard_normal(len(t))
+    return audio.astype(np.float32)
+
+
+def measure_rtf(config, audio, model_dir=None):
+    """ Seconds of compute per second of audio (lower is faster). """
+    from faster_whisper import WhisperModel
+
+    model = WhisperModel(model_dir or DEFAULT_MODEL_DIR, device=config.device,
+                         compute_type=config.compute_type, cpu_threads=config.cpu_threads)
+    # First call pays one-off allocation costs; don't count it
+    segments, _ = model.transcribe(audio[:16000], language="ar", beam_size=1, vad_filter=False)
+    list(segments)
+
+    start = time.perf_counter()
+    segments, _ = model.transcribe(audio, language="ar", beam_size=1, vad_filter=False,
+                                   condition_on_previous_text=False)
+    list(segments)
+    elapsed = time.perf_counter() - start
+    del model
+    return elapsed / (len(audio) / 16000)
+
+
+def calibrate(candidates=None, seconds=None):
+    """ Measures every candidate, caches and returns the fastest one. """
+    candidates = candidates or detect_candidates()
+    audio = _calibration_audio(seconds or global_vars.calibration_seconds)
+
+    best, best_rtf = None, None
+    for config in candidates:
+        try:
+            rtf = measure_rtf(config, audio)
+        except Exception as e:
+            print(f"Calibration: {config.device}/{config.compute_type} failed: {e}")
+            continue
+        print(f"Calibration: {config.device}/{config.compute_type} RTF={rtf:.3f}")
+        if best_rtf is None or rtf < best_rtf:
+            best, best_rtf = config, rtf
+
+    if best:
+        save_calibration(best, best_rtf)
+        print(f"Calibration: using {best.device}/{best.compute_type}")
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or calibrate the device configuration.")
+    parser.add_argument("--calibrate", action="store_true", help="Measure all candidates and cache the fastest")
+    parser.add_argument("--seconds", type=float, default=None, help="Length of the calibration clip")
+    args = parser.parse_args()
+
+    if args.calibrate:
+        calibrate(seconds=args.seconds)
+    else:
+        for config in candidate_configs():
+            print(f"{config.device:5} {config.compute_type:14} cpu_threads={config.cpu_threads}")
+    sys.exit(0)
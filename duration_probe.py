@@ -0,0 +1,97 @@
+"""
+Reads media durations off the UI thread.
+
+Durations come from the container header via PyAV (works for mp4/mkv/m4a,
+where mutagen often returns 0), with mutagen as the fallback. Results are
+cached by (path, size, mtime) in the app data folder, so re-adding the same
+files costs nothing.
+"""
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import global_vars
+from util import Util
+
+
+def read_container_duration(file_path):
+    """ Duration in seconds from the container / stream headers (no decoding). """
+    import av
+
+    with av.open(file_path) as container:
+        if container.duration:
+            return container.duration / av.time_base
+        for stream in container.streams.audio:
+            if stream.duration and stream.time_base:
+                return float(stream.duration * stream.time_base)
+    return 0
+
+
+def probe_duration(file_path):
+    try:
+        seconds = read_container_duration(file_path)
+        if seconds:
+            return seconds
+    except Exception as e:
+        print(f"Container probe failed for {file_path}: {e}")
+    return Util.get_audio_duration(file_path)
+
+
+class DurationProber:
+    def __init__(self, workers=None):
+        self._executor = ThreadPoolExecutor(max_workers=workers or global_vars.probe_workers,
+                                            thread_name_prefix="duration-probe")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(Util.app_data_dir(), "durations.sqlite"), check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS durations ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime REAL, seconds REAL)")
+
+    def _cached(self, path, st):
+        with self._lock:
+            row = self._db.execute("SELECT size, mtime, seconds FROM durations WHERE path=?", (path,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime:
+            return row[2]
+        return None
+
+    def _store(self, path, st, seconds):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO durations VALUES (?, ?, ?, ?)",
+                             (path, st.st_size, st.st_mtime, seconds))
+
+    def get_duration(self, file_path):
+        """ Blocking lookup (cache first). Returns seconds, 0 if unknown. """
+        path = os.path.abspath(file_path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return 0
+
+        seconds = self._cached(path, st)
+        if seconds is not None:
+            return seconds
+
+        seconds = probe_duration(path)
+        # Don't cache failures; the file may still be being written
+        if seconds:
+            self._store(path, st, seconds)
+        return seconds
+
+    def probe_async(self, file_path, callback):
+        """
+        callback(seconds) is called from a probe thread when the result is
+        known; GUI callers have to hop back to the UI thread themselves.
+        """
+        def run():
+            try:
+                seconds = self.get_duration(file_path)
+            except Exception as e:
+                print(f"Duration probe failed for {file_path}: {e}")
+                seconds = 0
+            callback(seconds)
+
+        return self._executor.submit(run)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,96 @@
+"""
+Finish-time predictions from the speed measured on this machine.
+
+RtfEstimator keeps the real-time factor (processing seconds per audio
+second, see job_metrics) of finished jobs, per model and transcription
+mode, as an average weighted by audio length that follows recent jobs
+(rtf.json in the app data folder, so it carries over between sessions).
+Until a combination has been measured, the device calibration result (see
+device_select) or global_vars.eta_default_rtf stands in.
+
+predict() hands the waiting jobs to the slots in queue order, each to the
+slot that becomes free first - the same thing the scheduler will do -
+and returns when each job and the whole batch should be finished.
+"""
+import heapq
+import json
+import os
+import threading
+import global_vars
+from util import Util
+
+# Jobs shorter than this say more about start-up costs than about speed
+MIN_AUDIO_SECONDS = 30
+# How much one hour of new audio moves the average (older hours count less)
+WEIGHT_PER_HOUR = 0.5
+
+
+def _key(model, mode):
+    return f"{model or global_vars.default_model}|{mode or global_vars.transcription_mode}"
+
+
+class RtfEstimator:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(Util.app_data_dir(), "rtf.json")
+        self._lock = threading.Lock()
+        self._rtf = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._rtf = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Ignoring {self.path}: {e}")
+        self._fallback = None
+
+    def _default(self):
+        if self._fallback is None:
+            self._fallback = global_vars.eta_default_rtf
+            try:
+                import device_select
+                calibration = device_select.load_calibration()
+                if calibration and calibration.get("rtf"):
+                    self._fallback = calibration["rtf"]
+            except Exception:
+                pass
+        return self._fallback
+
+    def rtf(self, model=None, mode=None):
+        with self._lock:
+            return self._rtf.get(_key(model, mode)) or self._default()
+
+    def record(self, model, mode, metrics):
+        """ Learns from a finished job (its JobMetrics). """
+        if metrics.result != "done" or metrics.audio_seconds < MIN_AUDIO_SECONDS or metrics.rtf is None:
+            return
+        weight = min(1.0, WEIGHT_PER_HOUR * metrics.audio_seconds / 3600)
+        with self._lock:
+            key = _key(model, mode)
+            old = self._rtf.get(key)
+            self._rtf[key] = metrics.rtf if old is None else old + weight * (metrics.rtf - old)
+            try:
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self._rtf, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"Could not save {self.path}: {e}")
+
+
+def predict(running, waiting, slots):
+    """
+    running: [(job, seconds of work left)] on the slots now
+    waiting: [(job, seconds of work)] in queue order
+    Returns ({id(job): seconds from now until it is finished}, seconds until all are).
+    """
+    free_at = [0.0] * max(1, slots)
+    finish = {}
+    for n, (job, work) in enumerate(running[:len(free_at)]):
+        free_at[n] = work
+        finish[id(job)] = work
+    heapq.heapify(free_at)
+    for job, work in waiting:
+        done = heapq.heappop(free_at) + work
+        finish[id(job)] = done
+        heapq.heappush(free_at, done)
+    return finish, max(free_at)
@@ -0,0 +1,65 @@
+import customtkinter as ctk
+from tkinter import filedialog
+import global_vars
+import segment_store
+
+
+class ExportDialog(ctk.CTkToplevel):
+    """
+    Asks how "Save All Finished" should write: which formats, and a folder
+    or a single zip archive. on_confirm(formats, folder, zip_path) is called
+    with exactly one of folder / zip_path set.
+    """
+    FORMAT_LABELS = {"txt": "Text (.txt)", "srt": "Subtitles (.srt)", "vtt": "WebVTT (.vtt)",
+                     "json": "JSON segments (.json)", "rtf": "Word RTL (.rtf)",
+                     "docx": "Word RTL (.docx)"}
+
+    def __init__(self, parent, count, on_confirm):
+        super().__init__(parent)
+        self.on_confirm = on_confirm
+        self.title("Save All Finished")
+        self.resizable(False, False)
+        self.transient(parent)
+
+        ctk.CTkLabel(self, text=f"Export {count} finished transcript(s) as:",
+                     font=("Arial", 13, "bold")).pack(padx=20, pady=(15, 5), anchor="w")
+
+        self.format_vars = {}
+        for fmt in segment_store.EXPORT_FORMATS:
+            var = ctk.BooleanVar(value=fmt in global_vars.export_formats)
+            ctk.CTkCheckBox(self, text=self.FORMAT_LABELS.get(fmt, fmt), variable=var).pack(padx=30, pady=2, anchor="w")
+            self.format_vars[fmt] = var
+
+        self.zip_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(self, text="Pack everything into one .zip archive",
+                        variable=self.zip_var).pack(padx=20, pady=(10, 5), anchor="w")
+
+        self.lbl_error = ctk.CTkLabel(self, text="", text_color="#c0392b")
+        self.lbl_error.pack(padx=20)
+
+        buttons = ctk.CTkFrame(self, fg_color="transparent")
+        buttons.pack(padx=20, pady=(0, 15), fill="x")
+        ctk.CTkButton(buttons, text="Cancel", width=90, fg_color="gray", command=self.destroy).pack(side="right", padx=(5, 0))
+        ctk.CTkButton(buttons, text="Save...", width=90, command=self._confirm).pack(side="right")
+
+        self.after(10, self.grab_set)
+
+    def _confirm(self):
+        formats = [fmt for fmt, var in self.format_vars.items() if var.get()]
+        if not formats:
+            self.lbl_error.configure(text="Pick at least one format.")
+            return
+
+        if self.zip_var.get():
+            zip_path = filedialog.asksaveasfilename(
+                parent=self, title="Save Transcripts Archive", defaultextension=".zip",
+                initialfile="transcripts.zip", filetypes=[("Zip archive", "*.zip")])
+            if not zip_path: return
+            folder = None
+        else:
+            folder = filedialog.askdirectory(parent=self, title="Select Folder to Save All Transcripts")
+            if not folder: return
+            zip_path = None
+
+        self.destroy()
+        self.on_confirm(formats, folder, zip_path)
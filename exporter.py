@@ -0,0 +1,151 @@
+"""
+Background export of many finished transcripts ("Save All Finished").
+
+Every transcript is streamed from its segment store straight into the
+output (a folder of files, or one zip archive), in as many formats as
+asked for. Nothing runs on the UI thread: progress and the final report
+come back through callbacks, and every failure is collected per file
+instead of being skipped silently.
+"""
+import io
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import global_vars
+import segment_store
+from segment_store import SegmentStore
+
+
+def unique_names(jobs):
+    """ Export base name per job; two "call.mp3" from different folders become "call" and "call (2)". """
+    names = {}
+    used = set()
+    for job in jobs:
+        base = os.path.splitext(job.filename)[0]
+        name, n = base, 2
+        while name.lower() in used:
+            name = f"{base} ({n})"
+            n += 1
+        used.add(name.lower())
+        names[job.job_id] = name
+    return names
+
+
+class BulkExporter:
+    """
+    Exports jobs in the given formats either into folder (one file per job
+    and format, written by a thread pool) or into zip_path (one archive,
+    written in order since a zip has a single writer).
+
+    on_progress(done, total) and on_finished(written, failures) are called
+    from the export thread; failures is a list of (filename, fmt, message).
+    """
+    def __init__(self, jobs, formats, folder=None, zip_path=None, workers=None,
+                 on_progress=None, on_finished=None):
+        for fmt in formats:
+            if fmt not in segment_store.EXPORT_FORMATS:
+                raise ValueError(f"Unsupported export format: {fmt}")
+        if (folder is None) == (zip_path is None):
+            raise ValueError("Give either a folder or a zip path")
+        self.jobs = list(jobs)
+        self.formats = list(formats)
+        self.folder = folder
+        self.zip_path = zip_path
+        self.workers = workers or global_vars.export_workers
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.total = len(self.jobs) * len(self.formats)
+        self.done = 0
+        self.written = 0
+        self.failures = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+
+    def run(self):
+        names = unique_names(self.jobs)
+        tasks = [(job, names[job.job_id], fmt) for job in self.jobs for fmt in self.formats]
+        try:
+            if self.zip_path:
+                self._export_zip(tasks)
+            else:
+                self._export_folder(tasks)
+        except Exception as e:
+            # The archive itself failed (disk full, no permission, ...)
+            print(f"Export failed: {e}")
+            with self._lock:
+                self.failures.append(("", "", str(e)))
+        if self.on_finished:
+            self.on_finished(self.written, self.failures)
+
+    # --- FOLDER ---
+    def _export_folder(self, tasks):
+        os.makedirs(self.folder, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="export") as pool:
+            futures = {pool.submit(self._export_file, job, name, fmt): (job, fmt) for job, name, fmt in tasks}
+            for future in as_completed(futures):
+                job, fmt = futures[future]
+                self._finish_one(job, fmt, future.exception())
+
+    def _export_file(self, job, name, fmt):
+        self._check_source(job)
+        path = os.path.join(self.folder, f"{name}.{fmt}")
+        # Half-written files never carry the final name
+        part_path = path + ".part"
+        try:
+            SegmentStore(job.recovery_file).export(part_path, fmt)
+            os.replace(part_path, path)
+        except Exception:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+    # --- ZIP ---
+    def _export_zip(self, tasks):
+        part_path = self.zip_path + ".part"
+        try:
+            with zipfile.ZipFile(part_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+                for job, name, fmt in tasks:
+                    error = None
+                    try:
+                        self._check_source(job)
+                        with zf.open(f"{name}.{fmt}", "w") as raw:
+                            # Streamed into the archive, never held in memory as a whole
+                            if fmt in segment_store.BINARY_FORMATS:
+                                SegmentStore(job.recovery_file).write_binary(raw, fmt)
+                            else:
+                                with io.TextIOWrapper(raw, encoding="utf-8", newline="\n") as f:
+                                    SegmentStore(job.recovery_file).write(f, fmt)
+                    except Exception as e:
+                        error = e
+                    self._finish_one(job, fmt, error)
+            os.replace(part_path, self.zip_path)
+        except Exception:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+    # --- SHARED ---
+    def _check_source(self, job):
+        if not segment_store.exists(job.recovery_file):
+            raise FileNotFoundError("transcript is missing (was the recovery folder cleared?)")
+
+    def _finish_one(self, job, fmt, error):
+        with self._lock:
+            self.done += 1
+            if error is None:
+                self.written += 1
+            else:
+                print(f"Export failed for {job.filename} ({fmt}): {error}")
+                self.failures.append((job.filename, fmt, str(error)))
+            done = self.done
+        if self.on_progress:
+            self.on_progress(done, self.total)
@@ -1 +1,156 @@
-rec_folder="recovery_tmp"
\ No newline at end of file
+# Transcripts being written / finished, plus the job journal that restores
+# the queue on the next start. "" = the "queue" folder in the app data folder
+rec_folder=""
+# Group commit: partial transcripts are made durable and checkpointed at
+# most this often (seconds), or when this much segment data is buffered
+journal_commit_seconds=2.0
+journal_commit_bytes=256*1024
+
+# Extensions accepted by "+ Add Media Files" and the headless CLI
+media_extensions=(".mp3", ".mp4", ".wav", ".m4a", ".mkv")
+
+# Number of files transcribed at the same time
+worker_count=2
+
+# Order waiting files are taken in: "fifo", "sjf" (shortest first) or
+# "ljf" (longest first); see job_queue
+queue_policy="fifo"
+# Real-time factor assumed for ETAs until this machine has measured one
+eta_default_rtf=0.5
+# With a deadline set, files started while the queue would finish too late
+# use these instead ("" = unchanged): a smaller model and/or a faster mode
+deadline_fast_model=""
+deadline_fast_mode="batched"
+# True: one resident model shared by all slots (CTranslate2 num_workers)
+# False: every slot loads its own model instance (uses more memory)
+share_model=True
+
+# Available models: name -> folder with model.bin (relative = next to the app).
+# Every job uses one of them, default_model unless chosen otherwise, e.g.
+#   models={"small": "models/small", "large": "models/large-v3"}
+models={"default": "models"}
+default_model="default"
+# Loaded models stay resident up to these sizes (MB, 0 = no limit); the least
+# recently used idle model is dropped to make room for another one
+model_ram_budget_mb=8192
+model_vram_budget_mb=6144
+# Drop models nobody used for this long (seconds, 0 = keep them loaded)
+model_idle_unload_seconds=15*60
+
+# Model device: "auto", "cuda" or "cpu" (env: TRANSCRIPTOR_DEVICE)
+device="auto"
+# "auto", "float16", "int8_float16", "int8", "int8_float32", "float32" (env: TRANSCRIPTOR_COMPUTE_TYPE)
+compute_type="auto"
+# CPU threads per slot, 0 = cores / worker_count (env: TRANSCRIPTOR_CPU_THREADS)
+cpu_threads=0
+# Measure each candidate once and cache the fastest (env: TRANSCRIPTOR_CALIBRATE=1)
+calibrate_device=False
+calibration_seconds=10
+# Optional real recording to calibrate with (synthetic audio otherwise)
+calibration_audio=""
+
+# How a single file is transcribed:
+#   "sequential" - one model.transcribe call (default)
+#   "chunked"    - split long recordings at silences, transcribe parts in parallel
+#   "batched"    - faster-whisper BatchedInferencePipeline (batch_size chunks per pass)
+transcription_mode="sequential"
+batch_size=8
+# Chunked mode: only files at least this long (seconds) are split
+chunked_min_seconds=20*60
+# Target length of each part (seconds) and how many run at once
+chunk_seconds=5*60
+chunk_workers=4
+
+# Reuse finished transcripts of identical audio (kept in the app data folder)
+result_cache_enabled=True
+result_cache_max_mb=512
+
+# Keep decoded audio + VAD speech maps of recent files (app data folder), so
+# a re-run skips decoding and VAD; files without speech finish immediately
+audio_cache_enabled=True
+audio_cache_max_mb=4096
+
+# Decode recordings a window at a time (audio stream only, see audio_stream)
+# and transcribe each window as soon as it is decoded: memory stays flat
+# however long the file is, and the first text comes sooner. The chunked
+# mode still decodes the whole file first.
+stream_decode=True
+stream_window_seconds=5*60
+
+# Decode upcoming files in a background process while others are transcribed.
+# Only used by the chunked mode or with stream_decode off: streamed files are
+# decoded window by window as they are transcribed, nothing to do ahead
+prefetch_enabled=True
+prefetch_ahead=2
+# Max decoded audio held in memory (16 kHz float32 = ~230 MB per hour)
+prefetch_budget_mb=1024
+# Assumed length when a file's duration is unknown (seconds)
+prefetch_unknown_seconds=3600
+
+# Load the model in the background as soon as the window is up
+warmup_on_start=True
+
+# Threads reading file durations when files are added
+probe_workers=4
+
+# How often the window applies queued worker updates (milliseconds)
+ui_refresh_ms=100
+
+# "Save All Finished": files written at once, and the formats ticked by default
+export_workers=4
+export_formats=["txt"]
+
+# "Open in Word" document type: "rtf" or "docx"
+rtl_viewer_format="rtf"
+
+# Per-job stage timings (see job_metrics). The metrics file is in Prometheus
+# text format; "" = metrics/transcriptor.prom in the app data folder
+metrics_enabled=True
+metrics_file=""
+# Jobs kept in detail (per-job lines in the metrics file, trace spans)
+metrics_keep_jobs=200
+# Also write a Chrome trace (open in chrome://tracing or ui.perfetto.dev)
+trace_enabled=False
+trace_file=""
+
+# Where inference runs:
+#   "thread"  - inside the app: one model shared by all slots (see share_model)
+#   "process" - one child process per worker slot, each with its own model
+#               (worker_count times the memory). Stop takes effect at once,
+#               a crash only fails that job.
+worker_isolation="thread"
+# On Stop, how long a child may take to finish its segment before it is
+# killed and restarted (model reloads). 0 = kill immediately
+cancel_grace_seconds=1.0
+
+# Local HTTP service (python server.py)
+server_host="127.0.0.1"
+server_port=8765
+# Jobs waiting or running before new submissions get "429, retry later"
+server_max_queue=64
+# Seconds clients are told to wait (Retry-After) when the queue is full
+server_retry_after=30
+server_max_upload_mb=2048
+# Finished jobs kept (with their transcripts) before the oldest are deleted
+server_keep_jobs=500
+# Every request (but /health) must send the token stored in
+# <app data>/server/token as X-Transcriptor-Token
+server_require_token=True
+
+# Watch folder: new recordings under watch_folder are queued and started
+# automatically; transcripts go to the same relative path under
+# watch_output_folder. Both "" = off until chosen with the Watch button
+watch_folder=""
+watch_output_folder=""
+watch_output_formats=["txt"]
+# A file counts as complete once unchanged for this long (seconds)
+watch_stable_seconds=5
+# Queue files in groups: up to watch_batch_size, at most every watch_batch_seconds
+watch_batch_size=50
+watch_batch_seconds=2
+# Also pick up files that were already there when watching started
+watch_scan_existing=True
+# Poll instead of file system events (e.g. shares that don't send events);
+# also used when watchdog isn't installed
+watch_use_polling=False
+watch_poll_seconds=5
@@ -0,0 +1,158 @@
+"""
+Crash-safe record of the queue: journal.sqlite in rec_folder (WAL mode).
+
+    jobs         every row of the GUI list (file, model, state, progress,
+                 duration, position), so the next start shows the queue as
+                 it was - finished transcripts, unfinished ones resumed.
+                 Keyed by a row id of its own (Job.journal_id): the same
+                 file queued twice shares a segment store, not a row
+    checkpoints  how far each unfinished transcript got (see scheduler),
+                 keyed by the job's segment store
+
+Writes are collected in memory and committed together, one transaction at
+most every global_vars.journal_commit_seconds (group commit), so a busy
+queue costs one small WAL append per interval instead of one per change.
+A crash loses at most that interval: a job is then redone from its
+previous checkpoint. The scheduler makes the segment data durable before
+it records a checkpoint, so a committed checkpoint never points past what
+is on disk (and load_checkpoint checks that anyway).
+"""
+import json
+import os
+import sqlite3
+import threading
+import global_vars
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    " row_id INTEGER PRIMARY KEY, recovery_file TEXT, position INTEGER, file_path TEXT, model TEXT,"
+    " state TEXT, status_text TEXT, progress REAL, duration REAL, elapsed REAL)",
+    "CREATE TABLE IF NOT EXISTS checkpoints (recovery_file TEXT PRIMARY KEY, data TEXT)",
+)
+
+_JOB_COLUMNS = ("row_id", "recovery_file", "position", "file_path", "model", "state", "status_text",
+                "progress", "duration", "elapsed")
+# Primary key of each table
+_KEYS = {"jobs": "row_id", "checkpoints": "recovery_file"}
+
+
+class JobJournal:
+    def __init__(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        self.path = os.path.join(folder, "journal.sqlite")
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: a commit is an append, durable against app crashes
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._upgrade()
+            for statement in _SCHEMA:
+                self._db.execute(statement)
+        self._lock = threading.Lock()
+        self._next_row_id = self._db.execute("SELECT COALESCE(MAX(row_id), -1) + 1 FROM jobs").fetchone()[0]
+        self._pending = {}   # (table, recovery_file) -> row tuple / data, None = delete
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True, name="job-journal")
+        self._thread.start()
+
+    def _upgrade(self):
+        # Journals that keyed jobs by recovery_file get a row id per row
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(jobs)")]
+        if columns and "row_id" not in columns:
+            self._db.execute("ALTER TABLE jobs RENAME TO jobs_old")
+            self._db.execute(_SCHEMA[0])
+            old = ", ".join(_JOB_COLUMNS[1:])
+            self._db.execute(f"INSERT INTO jobs ({old}) SELECT {old} FROM jobs_old ORDER BY position")
+            self._db.execute("DROP TABLE jobs_old")
+
+    # --- GROUP COMMIT ---
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(global_vars.journal_commit_seconds)
+            self._wake.clear()
+            try:
+                self.commit()
+            except Exception as e:
+                print(f"Job journal: commit failed: {e}")
+
+    def commit(self):
+        """ Writes everything queued so far in one transaction. """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            with self._db:
+                for (table, key), value in pending.items():
+                    if value is None:
+                        self._db.execute(f"DELETE FROM {table} WHERE {_KEYS[table]}=?", (key,))
+                    elif table == "jobs":
+                        self._db.execute(f"INSERT OR REPLACE INTO jobs ({', '.join(_JOB_COLUMNS)}) "
+                                         f"VALUES ({', '.join('?' * len(_JOB_COLUMNS))})", value)
+                    else:
+                        self._db.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?)", (key, value))
+
+    def _queue(self, table, key, value):
+        with self._lock:
+            # Only the latest value of a row matters
+            self._pending.pop((table, key), None)
+            self._pending[(table, key)] = value
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.commit()
+        with self._lock:
+            self._db.close()
+
+    # --- JOBS (GUI list) ---
+    def save_job(self, job):
+        if job.journal_id is None:
+            with self._lock:
+                job.journal_id = self._next_row_id
+                self._next_row_id += 1
+        self._queue("jobs", job.journal_id, (
+            job.journal_id, job.recovery_file, job.job_id, job.file_path, job.model, job.state,
+            job.status_text, job.progress, job.durationInSeconds, job.elapsed))
+
+    def delete_job(self, job):
+        if job.journal_id is not None:
+            self._queue("jobs", job.journal_id, None)
+
+    def load_jobs(self):
+        """ Rows of the last session, in list order, as dicts. """
+        self.commit()
+        with self._lock:
+            rows = self._db.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs ORDER BY position").fetchall()
+        return [dict(zip(_JOB_COLUMNS, row)) for row in rows]
+
+    # --- CHECKPOINTS ---
+    def set_checkpoint(self, recovery_file, checkpoint):
+        self._queue("checkpoints", recovery_file, json.dumps(checkpoint))
+
+    def clear_checkpoint(self, recovery_file):
+        self._queue("checkpoints", recovery_file, None)
+
+    def get_checkpoint(self, recovery_file):
+        with self._lock:
+            key = ("checkpoints", recovery_file)
+            if key in self._pending:
+                data = self._pending[key]
+            else:
+                row = self._db.execute("SELECT data FROM checkpoints WHERE recovery_file=?",
+                                       (recovery_file,)).fetchone()
+                data = row[0] if row else None
+        return json.loads(data) if data else None
+
+
+_JOURNALS = {}
+_JOURNALS_LOCK = threading.Lock()
+
+def get_journal(folder=None):
+    """ Shared journal of folder (default: global_vars.rec_folder). """
+    folder = os.path.abspath(folder or global_vars.rec_folder)
+    with _JOURNALS_LOCK:
+        if folder not in _JOURNALS:
+            _JOURNALS[folder] = JobJournal(folder)
+        return _JOURNALS[folder]
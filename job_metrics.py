@@ -0,0 +1,216 @@
+"""
+Per-job stage timings.
+
+The scheduler gives every job a JobMetrics; run_transcription and
+worker_loop time their stages into it:
+
+    queue_wait    submitted -> picked up by a slot
+    cache_lookup  content hash + result cache lookup
+    prefetch      waiting for the background decode (see prefetch)
+    model_load    getting the resident model (only slow the first time)
+    decode        decoding the file when it wasn't prefetched
+    vad           speech detection (chunked mode)
+    prepare       model.transcribe() up to the first segment (faster-whisper
+                  decodes / runs VAD / extracts features here)
+    inference     waiting for the next segment
+    callbacks     segment store writes + UI notifications
+    cache_store   copying the finished transcript into the result cache
+
+Finished jobs go to the shared MetricsRegistry, which keeps the metrics file
+(Prometheus text format) up to date and, with global_vars.trace_enabled, a
+Chrome trace (chrome://tracing, Perfetto) with one span per stage.
+"""
+import os
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import global_vars
+from util import Util
+
+# Trace timestamps are relative to this (microseconds)
+_EPOCH = time.perf_counter()
+
+
+class JobMetrics:
+    def __init__(self, job_id=None, filename="", slot=None):
+        self.job_id = job_id
+        self.filename = filename
+        self.slot = slot
+        self.stages = {}       # stage -> seconds
+        self.spans = []        # (stage, start, end) in perf_counter time
+        self.audio_seconds = 0.0
+        self.segments = 0
+        self.result = None     # done, cached, stopped, error
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, start)
+
+    def add(self, name, seconds, start=None):
+        """ Adds to a stage's total; with start it is also drawn as a span in the trace. """
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if start is not None:
+            self.spans.append((name, start, start + seconds))
+
+    def span(self, name, start, end):
+        """ Trace only: for stages whose totals are added up separately (inference). """
+        self.spans.append((name, start, end))
+
+    def finish(self, result):
+        self.result = result
+        self.finished = time.perf_counter()
+
+    # --- DERIVED ---
+    @property
+    def processing_seconds(self):
+        """ From being picked up to finished (queue wait not included). """
+        end = self.finished or time.perf_counter()
+        return end - self.started
+
+    @property
+    def rtf(self):
+        if not self.audio_seconds:
+            return None
+        return self.processing_seconds / self.audio_seconds
+
+    @property
+    def segments_per_second(self):
+        seconds = self.processing_seconds
+        return self.segments / seconds if seconds > 0 else None
+
+    def summary(self):
+        """ Short text for the queue row, e.g. "RTF 0.12 · 35 seg/s". """
+        if self.result == "cached":
+            return "cached"
+        parts = []
+        if self.rtf is not None:
+            parts.append(f"RTF {self.rtf:.2f}")
+        if self.segments_per_second is not None and self.segments:
+            parts.append(f"{self.segments_per_second:.0f} seg/s")
+        return " · ".join(parts)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """
+    Totals over all jobs plus the last keep_jobs jobs in detail. Every
+    record() rewrites the metrics file (and the trace), atomically, so a
+    scraper / node_exporter textfile collector never sees half a file.
+    """
+    def __init__(self, metrics_path=None, trace_path=None, keep_jobs=None):
+        folder = Util.app_data_dir("metrics")
+        self.metrics_path = metrics_path or global_vars.metrics_file or os.path.join(folder, "transcriptor.prom")
+        self.trace_path = trace_path or global_vars.trace_file or os.path.join(folder, "trace.json")
+        self.jobs = deque(maxlen=keep_jobs or global_vars.metrics_keep_jobs)
+        self.results = {}
+        self.stage_totals = {}
+        self.audio_seconds = 0.0
+        self.segments = 0
+        self._lock = threading.Lock()
+
+    def record(self, metrics):
+        with self._lock:
+            self.jobs.append(metrics)
+            self.results[metrics.result] = self.results.get(metrics.result, 0) + 1
+            for stage, seconds in metrics.stages.items():
+                self.stage_totals[stage] = self.stage_totals.get(stage, 0.0) + seconds
+            self.audio_seconds += metrics.audio_seconds
+            self.segments += metrics.segments
+            try:
+                self._write_atomic(self.metrics_path, self.prometheus_text())
+                if global_vars.trace_enabled:
+                    self._write_atomic(self.trace_path, json.dumps(self.chrome_trace()))
+            except Exception as e:
+                print(f"Could not write metrics: {e}")
+
+    @staticmethod
+    def _write_atomic(path, text):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    # --- PROMETHEUS ---
+    def prometheus_text(self):
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value:.6g}" if label_text else f"{name} {value:.6g}")
+
+        metric("transcriptor_jobs_total", "counter", "Finished jobs by result.",
+               [({"result": r}, n) for r, n in sorted(self.results.items())])
+        metric("transcriptor_stage_seconds_total", "counter", "Time spent per stage over all jobs.",
+               [({"stage": s}, v) for s, v in sorted(self.stage_totals.items())])
+        metric("transcriptor_audio_seconds_total", "counter", "Audio transcribed.", [({}, self.audio_seconds)])
+        metric("transcriptor_segments_total", "counter", "Segments produced.", [({}, self.segments)])
+
+        recent = list(self.jobs)
+
+        def job_labels(m, **extra):
+            labels = {"job": m.job_id, "file": m.filename, "result": m.result}
+            labels.update(extra)
+            return labels
+
+        metric("transcriptor_job_stage_seconds", "gauge", "Stage timings of recent jobs.",
+               [(job_labels(m, stage=s), v) for m in recent for s, v in sorted(m.stages.items())])
+        metric("transcriptor_job_rtf", "gauge", "Real-time factor of recent jobs (processing / audio).",
+               [(job_labels(m), m.rtf) for m in recent if m.rtf is not None])
+        metric("transcriptor_job_segments_per_second", "gauge", "Segments per second of recent jobs.",
+               [(job_labels(m), m.segments_per_second) for m in recent if m.segments_per_second is not None])
+        metric("transcriptor_job_audio_seconds", "gauge", "Audio length of recent jobs.",
+               [(job_labels(m), m.audio_seconds) for m in recent])
+        return "\n".join(lines) + "\n"
+
+    # --- CHROME TRACE ---
+    def chrome_trace(self):
+        pid = os.getpid()
+        events = []
+        slots = set()
+        for m in self.jobs:
+            tid = m.slot if m.slot is not None else 0
+            slots.add(tid)
+            args = {"file": m.filename, "job": m.job_id}
+            for name, start, end in m.spans:
+                events.append({"name": name, "cat": "stage", "ph": "X", "pid": pid, "tid": tid,
+                               "ts": (start - _EPOCH) * 1e6, "dur": (end - start) * 1e6, "args": args})
+            if m.finished is not None:
+                events.append({"name": m.filename, "cat": "job", "ph": "X", "pid": pid, "tid": tid,
+                               "ts": (m.started - _EPOCH) * 1e6, "dur": (m.finished - m.started) * 1e6,
+                               "args": dict(args, result=m.result, rtf=m.rtf, stages=m.stages)})
+        for tid in sorted(slots):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": f"slot {tid}"}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+def get_registry():
+    """ Shared instance (None when metrics are disabled). """
+    global _REGISTRY
+    if not global_vars.metrics_enabled:
+        return None
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = MetricsRegistry()
+        return _REGISTRY
+
+def record(metrics):
+    registry = get_registry()
+    if registry is not None:
+        registry.record(metrics)
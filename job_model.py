@@ -0,0 +1,139 @@
+import os
+import hashlib
+import time
+import global_vars
+
+
+class Job:
+    """
+    One file in the queue. Plain slotted record - no widgets - so tens of
+    thousands of them stay cheap. The rows on screen (MediaItem) are bound to
+    jobs while they are visible.
+    """
+    __slots__ = ("job_id", "file_path", "filename", "recovery_file", "durationInSeconds",
+                 "state", "status_text", "progress", "cancel_flag",
+                 "started_at", "elapsed", "metrics", "model", "journal_id")
+
+    def __init__(self, job_id, file_path, model=None):
+        self.job_id = job_id
+        self.file_path = file_path
+        self.filename = os.path.basename(file_path)
+        # One of global_vars.models (see model_registry)
+        self.model = model or global_vars.default_model
+        # Segment store the transcript is written to (see segment_store); the
+        # text is never kept in memory. Keyed by the full path (and model) so
+        # two "call.mp3" from different folders, or a draft and a final
+        # transcript of the same file, never share a recovery file.
+        path_key = os.path.abspath(file_path)
+        if self.model != global_vars.default_model:
+            path_key += "|" + self.model
+        path_tag = hashlib.md5(path_key.encode("utf-8")).hexdigest()[:8]
+        self.recovery_file = os.path.join(global_vars.rec_folder, f"{self.filename}.{path_tag}.seg")
+        self.durationInSeconds = 0   # filled in by the duration prober
+        self.state = "idle"          # idle, waiting, processing, stopping, done, error
+        self.status_text = "Idle"
+        self.progress = 0.0
+        self.cancel_flag = False
+        self.started_at = None       # time.time() while processing
+        self.elapsed = 0             # seconds spent processing
+        self.metrics = None          # job_metrics.JobMetrics of the last run
+        self.journal_id = None       # its row in the job journal, once saved
+
+    def elapsed_seconds(self):
+        if self.started_at is not None:
+            return int(time.time() - self.started_at)
+        return self.elapsed
+
+
+class JobList:
+    """
+    Ordered jobs plus running counters, so the header never has to rescan the
+    whole list. All state changes go through set_state() to keep counts right.
+
+    With a journal (job_journal.JobJournal) every add / remove / state or
+    duration change is recorded, and restore() brings the list back.
+    """
+    def __init__(self, journal=None):
+        self.jobs = []
+        self._next_id = 0
+        self.done_count = 0
+        self.total_duration = 0
+        self.journal = journal
+        self._by_path = {}   # file_path -> jobs of that file, oldest first
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def __iter__(self):
+        return iter(self.jobs)
+
+    def __getitem__(self, index):
+        return self.jobs[index]
+
+    def __contains__(self, job):
+        # O(1): remove() marks jobs as gone instead of searching the list
+        return job.job_id >= 0
+
+    def add(self, file_path, model=None):
+        job = Job(self._next_id, file_path, model)
+        self._next_id += 1
+        self.jobs.append(job)
+        self._by_path.setdefault(file_path, []).append(job)
+        if self.journal: self.journal.save_job(job)
+        return job
+
+    def with_path(self, file_path):
+        """ The newest job of file_path, or None. O(1). """
+        jobs = self._by_path.get(file_path)
+        return jobs[-1] if jobs else None
+
+    def restore(self):
+        """ Re-adds the last session's jobs, in their order, as they were. Returns them. """
+        restored = []
+        for row in self.journal.load_jobs():
+            job = Job(self._next_id, row["file_path"], row["model"])
+            self._next_id += 1
+            # Same row from now on (its recovery_file is updated if rec_folder moved)
+            job.journal_id = row["row_id"]
+            job.state = row["state"]
+            job.status_text = row["status_text"]
+            job.progress = row["progress"] or 0.0
+            job.elapsed = row["elapsed"] or 0
+            if job.state == "done":
+                self.done_count += 1
+            self.set_duration(job, row["duration"] or 0)
+            self.jobs.append(job)
+            self._by_path.setdefault(job.file_path, []).append(job)
+            restored.append(job)
+        return restored
+
+    def remove(self, job):
+        if self.journal: self.journal.delete_job(job)
+        self.jobs.remove(job)
+        same_file = self._by_path.get(job.file_path, [])
+        if job in same_file:
+            same_file.remove(job)
+        if not same_file:
+            self._by_path.pop(job.file_path, None)
+        if job.state == "done":
+            self.done_count -= 1
+        self.total_duration -= job.durationInSeconds
+        job.job_id = -1  # mark as removed for late callbacks
+
+    def set_state(self, job, state, status_text=None):
+        if job.state == "done" and state != "done":
+            self.done_count -= 1
+        elif job.state != "done" and state == "done":
+            self.done_count += 1
+        job.state = state
+        if status_text is not None:
+            job.status_text = status_text
+        if self.journal: self.journal.save_job(job)
+
+    def set_duration(self, job, seconds):
+        self.total_duration += seconds - job.durationInSeconds
+        job.durationInSeconds = seconds
+        if self.journal: self.journal.save_job(job)
+
+    def index_of(self, job):
+        return self.jobs.index(job)
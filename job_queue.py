@@ -0,0 +1,170 @@
+"""
+Waiting jobs, in the order the slots should take them.
+
+global_vars.queue_policy decides the order:
+
+    "fifo"  in the order they were submitted
+    "sjf"   shortest first (durationInSeconds): many short files finish early
+    "ljf"   longest first: a long recording doesn't end up alone at the end
+            of a batch while the other slots sit idle
+
+Unknown durations count as global_vars.prefetch_unknown_seconds.
+
+move() puts a job at a given position: the current order is pinned from
+then on, and jobs submitted later go behind it (ordered by the policy)
+until set_policy() is called again. remove() takes a job out at once, so
+cancelled jobs don't hold a place until a slot gets to them.
+
+get(take) lets a caller pass over jobs it can't run yet without taking
+them out of line.
+
+A heap with lazy deletion: put / get / remove / update are O(log n);
+snapshot() (the whole order, for ETAs and prefetching) sorts.
+"""
+import heapq
+import itertools
+import threading
+import global_vars
+
+POLICIES = ("fifo", "sjf", "ljf")
+
+
+class JobQueue:
+    def __init__(self, policy=None):
+        self.policy = policy or global_vars.queue_policy
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy: {self.policy}")
+        self._heap = []
+        self._entries = {}    # id(job) -> [key, push number, job]; job None = removed
+        self._pinned = {}     # id(job) -> position set by move()
+        self._seq = itertools.count()
+        # Tie-breaker: a re-pushed job has the same key as its removed entry
+        self._pushes = itertools.count()
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries)
+
+    def __contains__(self, job):
+        with self._cond:
+            return id(job) in self._entries
+
+    # --- ORDER ---
+    def _policy_value(self, job):
+        if self.policy == "fifo":
+            return 0
+        seconds = getattr(job, "durationInSeconds", 0) or global_vars.prefetch_unknown_seconds
+        return seconds if self.policy == "sjf" else -seconds
+
+    def _key(self, job, seq):
+        # Pinned jobs first (in their pinned order), then the policy, then arrival
+        pinned = self._pinned.get(id(job))
+        return (0, pinned, 0, seq) if pinned is not None else (1, 0, self._policy_value(job), seq)
+
+    def _push(self, job, seq):
+        entry = [self._key(job, seq), next(self._pushes), job]
+        self._entries[id(job)] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _unlink(self, job):
+        """ Marks the job's heap entry as removed; returns its arrival number. """
+        entry = self._entries.pop(id(job), None)
+        if entry is None:
+            return None
+        entry[2] = None
+        return entry[0][3]
+
+    def _rebuild(self):
+        live = [(entry[2], entry[0][3]) for entry in self._entries.values()]
+        self._heap, self._entries = [], {}
+        for job, seq in live:
+            self._push(job, seq)
+
+    # --- QUEUE ---
+    def put(self, job):
+        with self._cond:
+            seq = self._unlink(job)
+            self._push(job, next(self._seq) if seq is None else seq)
+            self._cond.notify()
+
+    def get(self, take=None):
+        """
+        Blocks until a job is waiting; returns the first in order. With take,
+        the first one take(job) accepts (called under the queue's lock): the
+        others keep their place, and if none is accepted get() waits for the
+        next put() or wake().
+        """
+        with self._cond:
+            while True:
+                skipped = []
+                found = None
+                while self._heap:
+                    entry = heapq.heappop(self._heap)
+                    job = entry[2]
+                    if job is None:
+                        continue
+                    if take is not None and not take(job):
+                        skipped.append(entry)
+                        continue
+                    del self._entries[id(job)]
+                    self._pinned.pop(id(job), None)
+                    found = job
+                    break
+                for entry in skipped:
+                    heapq.heappush(self._heap, entry)
+                if found is not None:
+                    return found
+                self._cond.wait()
+
+    def wake(self):
+        """ Makes waiting get() calls look again (what take accepts has changed). """
+        with self._cond:
+            self._cond.notify_all()
+
+    def remove(self, job):
+        """ Takes a job out; False if it wasn't waiting. """
+        with self._cond:
+            self._pinned.pop(id(job), None)
+            return self._unlink(job) is not None
+
+    def update(self, job):
+        """ Re-sorts one job after its duration changed. """
+        with self._cond:
+            seq = self._unlink(job)
+            if seq is not None:
+                self._push(job, seq)
+
+    def snapshot(self):
+        """ Waiting jobs in the order they will be taken. """
+        with self._cond:
+            return [entry[2] for entry in sorted(self._entries.values())]
+
+    # --- REORDERING ---
+    def move(self, job, index):
+        """ Puts a waiting job at position index (0 = next); pins the order. """
+        with self._cond:
+            if id(job) not in self._entries:
+                return False
+            order = [entry[2] for entry in sorted(self._entries.values())]
+            order.remove(job)
+            index = max(0, min(index, len(order))) if index >= 0 else len(order)
+            order.insert(index, job)
+            self._pinned = {id(queued): position for position, queued in enumerate(order)}
+            self._rebuild()
+            return True
+
+    def move_to_front(self, job):
+        return self.move(job, 0)
+
+    def move_to_back(self, job):
+        return self.move(job, -1)
+
+    def set_policy(self, policy):
+        """ Switches the policy; forgets any manual order. """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy}")
+        with self._cond:
+            self.policy = policy
+            self._pinned.clear()
+            self._rebuild()
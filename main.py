@@ -1,16 +1,30 @@
+import time
+# Taken before anything else is imported: time-to-window / time-to-ready are
+# measured from here
+_PROCESS_START = time.perf_counter()
+
 import customtkinter as ctk
 import threading
+import multiprocessing
 from tkinter import filedialog, messagebox
 import os
-import queue
-import transcribe_module
-import time
-from media_item import MediaItem
-from stopwatch import StopWatchLabel
+import datetime
+from job_model import JobList
+import job_journal
+import segment_store
+from queue_view import QueueView
+from ui_bus import UIEventBus
+from exporter import BulkExporter
+from export_dialog import ExportDialog
+from watch_folder import FolderWatcher
+from scheduler import TranscriptionScheduler
+from duration_probe import DurationProber
 import global_vars
 from util import Util
 
 # --- CONFIGURATION ---
+# How often the ETAs are recalculated (seconds)
+ETA_REFRESH_SECONDS = 5
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
@@ -19,7 +33,10 @@ class TranscriptorQueueApp(ctk.CTk):
         super().__init__()
 
        
+        # Partial transcripts + the queue journal live here between sessions
+        global_vars.rec_folder = global_vars.rec_folder or Util.app_data_dir("queue")
         os.makedirs(global_vars.rec_folder, exist_ok=True)
+        self.journal = job_journal.get_journal()
 
         # --- WINDOW SETUP ---
         self.title("Transcriptor")
@@ -30,9 +47,14 @@ class TranscriptorQueueApp(ctk.CTk):
         self.grid_columnconfigure(0, weight=1)
 
              # --- VARIABLES ---
-        self.items = [] 
-        self.job_queue = queue.Queue()
-        self.total_duration=0
+        # Compact job records + running counters; rows only exist for what's visible
+        self.jobs = JobList(self.journal)
+        # Worker -> UI updates, applied by one refresh clock (see ui_tick)
+        self.ui_bus = UIEventBus()
+        self._last_clock_second = 0
+        self.exporter = None  # running "Save All" export, if any
+        self.watcher = None   # FolderWatcher while a folder is watched
+        self.watched_jobs = set()  # job_ids whose transcript goes to the watcher's output tree
         
 
         # --- 1. HEADER ---
@@ -74,7 +96,7 @@ class TranscriptorQueueApp(ctk.CTk):
 
         # 4. Total Duration Label (Fixed width, Far Right)
         # Assuming you have a format_duration function defined elsewhere
-        formatted_time = Util.format_duration(self.total_duration)
+        formatted_time = Util.format_duration(self.jobs.total_duration)
         self.lbl_total_duration = ctk.CTkLabel(
             self.header_frame, 
             text=f'Total: {formatted_time}', 
@@ -83,12 +105,15 @@ class TranscriptorQueueApp(ctk.CTk):
         )
         self.lbl_total_duration.grid(row=0, column=3, sticky="e",padx=20)
 
+        # 5. When the queue will be done (see scheduler.eta)
+        self.lbl_eta = ctk.CTkLabel(self.header_frame, text="", text_color="gray", font=("Arial", 12))
+        self.lbl_eta.grid(row=0, column=4, sticky="e", padx=(0, 10))
+
 
 
         # --- 2. SCROLLABLE QUEUE AREA ---
-        self.scroll_area = ctk.CTkScrollableFrame(self, label_text="Transcription Queue")
-        self.scroll_area.grid(row=1, column=0, sticky="nsew", padx=20, pady=5)
-        self.scroll_area.grid_columnconfigure(0, weight=1) # Items expand width
+        self.queue_view = QueueView(self, self, self.jobs, label_text="Transcription Queue")
+        self.queue_view.grid(row=1, column=0, sticky="nsew", padx=20, pady=5)
 
         # --- 3. GLOBAL FOOTER ---
         self.footer = ctk.CTkFrame(self)
@@ -97,106 +122,347 @@ class TranscriptorQueueApp(ctk.CTk):
         self.btn_save_all = ctk.CTkButton(self.footer, text="Save All Finished", command=self.save_all_finished)
         self.btn_save_all.pack(side="left", padx=10, pady=10)
 
+        self.btn_watch = ctk.CTkButton(self.footer, text="Watch Folder...", command=self.toggle_watch)
+        self.btn_watch.pack(side="left", padx=10, pady=10)
+
+        # Model for files added from now on (see model_registry)
+        self.model_choice = ctk.StringVar(value=global_vars.default_model)
+        if len(global_vars.models) > 1:
+            self.model_menu = ctk.CTkOptionMenu(self.footer, variable=self.model_choice,
+                                                values=list(global_vars.models), width=120)
+            self.model_menu.pack(side="left", padx=10, pady=10)
+
+        # Startup timings (model state)
+        self.lbl_startup = ctk.CTkLabel(self.footer, text="", text_color="gray", font=("Arial", 11))
+        self.lbl_startup.pack(side="left", padx=10)
+
         self.btn_stop_all = ctk.CTkButton(self.footer, text="Stop All", command=self.stop_all, fg_color="#c0392b")
         self.btn_stop_all.pack(side="right", padx=10)
 
         self.btn_start_all = ctk.CTkButton(self.footer, text="Start All Pending", command=self.start_all_pending, fg_color="green")
         self.btn_start_all.pack(side="right", padx=10)
 
+        self.btn_deadline = ctk.CTkButton(self.footer, text="Deadline...", command=self.ask_deadline, width=110)
+        self.btn_deadline.pack(side="right", padx=10)
+
+        # Order waiting files are taken in (see job_queue)
+        self.policy_labels = {"First added first": "fifo", "Shortest first": "sjf", "Longest first": "ljf"}
+        self.policy_menu = ctk.CTkOptionMenu(
+            self.footer, values=list(self.policy_labels), width=140,
+            command=lambda label: self.scheduler.set_policy(self.policy_labels[label]))
+        self.policy_menu.set(next(label for label, policy in self.policy_labels.items()
+                                  if policy == global_vars.queue_policy))
+        self.policy_menu.pack(side="right", padx=10)
+
 
    
-        # Start the background worker
-        self.start_worker_thread()
+        # Start the background workers
+        self.start_worker_threads()
+        self.restore_queue()
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
-     
 
-    def start_worker_thread(self):
-        self.worker_thread = threading.Thread(target=self.worker_loop, daemon=True)
-        self.worker_thread.start()
+        # Runs once the main loop is up, i.e. the window is on screen
+        self.time_to_window = None
+        self.after(0, self.on_window_shown)
+        self.after(global_vars.ui_refresh_ms, self.ui_tick)
+        if global_vars.watch_folder:
+            self.start_watch(global_vars.watch_folder, global_vars.watch_output_folder)
+     
 
+    def start_worker_threads(self):
+        # global_vars.worker_count slots, all fed from the same queue
+        self.scheduler = TranscriptionScheduler(self)
+        self.scheduler.start()
+        self.duration_prober = DurationProber()
+
+
+
+
+    def restore_queue(self):
+        """ Brings back the queue of the last session (see job_journal). """
+        restored = self.jobs.restore()
+        known = {job.recovery_file for job in restored}
+        # Stores no row refers to any more: jobs deleted while they were
+        # still running (a file queued twice keeps its store for the other row)
+        for name in os.listdir(global_vars.rec_folder):
+            path = os.path.join(global_vars.rec_folder, name)
+            if name.endswith(".seg") and path not in known:
+                segment_store.delete(path)
+                self.journal.clear_checkpoint(path)
+
+        for job in restored:
+            if job.state == "done" and not segment_store.exists(job.recovery_file):
+                self.jobs.set_state(job, "idle", "Transcript missing")
+            elif job.state in ("waiting", "processing"):
+                # Interrupted: picks up again from its checkpoint
+                checkpoint = self.journal.get_checkpoint(job.recovery_file)
+                if checkpoint:
+                    job.progress = checkpoint.get("percent", job.progress)
+                self.jobs.set_state(job, "waiting", "Waiting...")
+                self.add_to_queue(job)
+            elif job.state == "stopping":
+                self.jobs.set_state(job, "idle", "Stopped (resumable)")
+            if not job.durationInSeconds:
+                self.duration_prober.probe_async(
+                    job.file_path, lambda seconds, target=job: self.ui_bus.post("duration", target, seconds))
+        if restored:
+            self.queue_view.refresh()
+            self.update_total_duration_label()
+            self.progress_bar.grid()
+            self.update_total_progress()
 
+    # --- STARTUP ---
+    def on_window_shown(self):
+        self.time_to_window = time.perf_counter() - _PROCESS_START
+        print(f"Startup: window shown after {self.time_to_window:.2f}s")
+        if global_vars.warmup_on_start:
+            self.lbl_startup.configure(text="Loading model...")
+            threading.Thread(target=self._warm_up_model, daemon=True).start()
+        else:
+            self._log_startup(None)
+
+    def _warm_up_model(self):
+        """Background thread: loads the model + dummy inference."""
+        try:
+            # In the worker processes when worker_isolation = "process"
+            self.scheduler.warm_up()
+        except Exception as e:
+            print(f"Warm-up failed: {e}")
+            self.after(0, lambda: self.lbl_startup.configure(text="Model not loaded (will retry on first job)"))
+            return
 
+        time_to_ready = time.perf_counter() - _PROCESS_START
+        print(f"Startup: model ready after {time_to_ready:.2f}s")
+        self.after(0, lambda: self.lbl_startup.configure(
+            text=f"Ready in {time_to_ready:.1f}s (window {self.time_to_window:.1f}s)"))
+        self._log_startup(time_to_ready)
+
+    def _log_startup(self, time_to_ready):
+        # One line per start, so regressions show up over time
+        try:
+            path = os.path.join(Util.app_data_dir(), "startup_times.csv")
+            new_file = not os.path.exists(path)
+            with open(path, "a", encoding="utf-8") as f:
+                if new_file:
+                    f.write("timestamp,time_to_window,time_to_ready\n")
+                ready = f"{time_to_ready:.3f}" if time_to_ready is not None else ""
+                f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')},{self.time_to_window:.3f},{ready}\n")
+        except Exception as e:
+            print(f"Could not log startup times: {e}")
 
     def update_total_duration_label(self):
-        self.lbl_total_duration.configure(text=f'Total Duration: {Util.format_duration(self.total_duration)}')
+        self.lbl_total_duration.configure(text=f'Total Duration: {Util.format_duration(self.jobs.total_duration)}')
 
     
     def add_files(self):
-        file_paths = filedialog.askopenfilenames(filetypes=[("Media Files", "*.mp3 *.mp4 *.wav *.m4a *.mkv")])
+        file_paths = filedialog.askopenfilenames(filetypes=[("Media Files", " ".join("*" + ext for ext in global_vars.media_extensions))])
         for path in file_paths:
-            item = MediaItem(self.scroll_area, path, self,on_delete_click=self.delete_item)
-            item.pack(fill="x", pady=2, padx=5)
-            self.items.append(item)
-            self.total_duration=self.total_duration+item.durationInSeconds
-            self.update_total_duration_label()
+            job = self.jobs.add(path, self.model_choice.get())
+            # Duration arrives later from a probe thread
+            self.duration_prober.probe_async(
+                path, lambda seconds, target=job: self.ui_bus.post("duration", target, seconds))
+        if file_paths:
+            self.queue_view.refresh()
             self.progress_bar.grid()
             self.update_total_progress()
 
+    # --- WATCH FOLDER ---
+    def toggle_watch(self):
+        if self.watcher is not None:
+            self.stop_watch()
+            return
+        root = filedialog.askdirectory(title="Folder to watch for new recordings")
+        if not root: return
+        output_root = filedialog.askdirectory(title="Folder for the transcripts")
+        if not output_root: return
+        self.start_watch(root, output_root)
+
+    def start_watch(self, root, output_root):
+        if not output_root:
+            output_root = os.path.join(root, "transcripts")
+        # Batches come from the watcher's threads; queue them on the UI thread
+        self.watcher = FolderWatcher(root, output_root,
+                                     on_batch=lambda paths: self.after(0, self._add_watched, paths))
+        self.watcher.start()
+        self.btn_watch.configure(text=f"Stop Watching {os.path.basename(os.path.abspath(root))}")
+
+    def stop_watch(self):
+        watcher, self.watcher = self.watcher, None
+        self.btn_watch.configure(text="Watch Folder...")
+        # Jobs already queued keep running; their transcripts just stay in the app
+        self.watched_jobs.clear()
+        threading.Thread(target=watcher.stop, daemon=True).start()
+
+    def _add_watched(self, paths):
+        if self.watcher is None: return  # stopped meanwhile
+        for path in paths:
+            job = self.jobs.with_path(path)
+            if job is not None:
+                # Restored from the last session; already queued or done
+                self.watched_jobs.add(job.job_id)
+                if job.state == "done":
+                    self.watcher.write_outputs(job.file_path, job.recovery_file)
+                continue
+            job = self.jobs.add(path, self.model_choice.get())
+            self.watched_jobs.add(job.job_id)
+            self.duration_prober.probe_async(
+                path, lambda seconds, target=job: self.ui_bus.post("duration", target, seconds))
+            self.start_job(job)
+        # One refresh for the whole batch, not one per file
+        self.queue_view.refresh()
+        self.progress_bar.grid()
+        self.update_total_progress()
+
+    def on_duration_probed(self, job, seconds):
+        if job not in self.jobs: return # deleted meanwhile
+        self.jobs.set_duration(job, seconds)
+        self.update_total_duration_label()
+        if job.state == "waiting":
+            self.scheduler.update(job)
+
             
 
     # --- QUEUE MANAGEMENT ---
-    def add_to_queue(self, media_item):
-        self.job_queue.put(media_item)
+    def add_to_queue(self, job):
+        self.scheduler.submit(job)
+
+    def start_job(self, job):
+        if job.state in ["processing", "waiting", "stopping"]: return
+        job.progress = 0
+        job.cancel_flag = False
+        job.elapsed = 0
+        self.jobs.set_state(job, "waiting", "Waiting...")
+        self.add_to_queue(job)
+        self.queue_view.refresh_job(job)
+
+    def stop_job(self, job):
+        job.cancel_flag = True
+        if job.state == "waiting":
+            # Safe to stop immediately because no thread is running
+            self.scheduler.remove(job)
+            self.jobs.set_state(job, "idle", "Cancelled")
+        elif job.state == "processing":
+            # DO NOT set state to "idle" here!
+            # "stopping" until the worker confirms (see _job_stopped)
+            self.jobs.set_state(job, "stopping", "Stopping...")
+        job.started_at = None
+        job.elapsed = 0
+        self.queue_view.refresh_job(job)
+
+    def move_to_front(self, job):
+        if job.state == "waiting" and self.scheduler.move(job, 0):
+            self.update_eta()
+
+    def ask_deadline(self):
+        current = self.scheduler.deadline
+        dialog = ctk.CTkInputDialog(
+            title="Deadline",
+            text="Finish the queue by (HH:MM, empty = no deadline)" +
+                 (f"\nNow: {time.strftime('%H:%M', time.localtime(current))}" if current else ""))
+        answer = dialog.get_input()
+        if answer is None: return
+        answer = answer.strip()
+        if not answer:
+            self.scheduler.deadline = None
+            self.btn_deadline.configure(text="Deadline...")
+        else:
+            try:
+                at = datetime.datetime.combine(datetime.date.today(), datetime.datetime.strptime(answer, "%H:%M").time())
+            except ValueError:
+                messagebox.showerror("Deadline", f"Not a time: {answer}")
+                return
+            if at < datetime.datetime.now():
+                at += datetime.timedelta(days=1)  # e.g. 02:00 means tonight
+            self.scheduler.deadline = at.timestamp()
+            self.btn_deadline.configure(text=f"Deadline {answer}")
+        self.update_eta()
+
+    def update_eta(self):
+        """ Header ETA plus an ETA on the visible waiting rows (see scheduler.eta). """
+        finish, total, at_risk = self.scheduler.eta()
+        if not finish:
+            self.lbl_eta.configure(text="")
+            return
+        now = time.time()
+        text = f"Done at {time.strftime('%H:%M', time.localtime(now + total))}"
+        if self.scheduler.deadline is not None:
+            text += "  ·  deadline at risk" if at_risk else "  ·  on time"
+            if self.scheduler.fast_active:
+                text += " (faster settings)"
+        self.lbl_eta.configure(text=text, text_color="#e67e22" if at_risk else "gray")
+        for row in self.queue_view.rows:
+            job = row.job
+            if job is not None and job.state == "waiting" and id(job) in finish:
+                job.status_text = f"Waiting · ETA {time.strftime('%H:%M', time.localtime(now + finish[id(job)]))}"
+                row.render()
 
     def start_all_pending(self):
-        for item in self.items:
-            if item.state in ["idle", "stopped", "error"]:
-                item.request_start() 
+        for job in self.jobs:
+            if job.state in ["idle", "error"]:
+                self.start_job(job)
 
     def stop_all(self):
         # Mark all items to stop
-        for item in self.items:
-            if item.state in ["waiting", "processing"]:
-                item.request_stop()
+        for job in self.jobs:
+            if job.state in ["waiting", "processing"]:
+                self.stop_job(job)
 
     def save_all_finished(self):
-        done_items = [i for i in self.items if i.state == "done"]
+        done_items = [job for job in self.jobs if job.state == "done"]
         if not done_items:
             messagebox.showinfo("Info", "No finished items to save.")
             return
-
-        folder = filedialog.askdirectory(title="Select Folder to Save All Transcripts")
-        if folder:
-            count = 0
-            for item in done_items:
-                if os.path.exists(item.recovery_file):
-                    name = f"{os.path.splitext(item.filename)[0]}.txt"
-                    path = os.path.join(folder, name)
-                    try:
-                        with open(item.recovery_file, "r", encoding="utf-8") as src, open(path, "w", encoding="utf-8") as dst:
-                            dst.write(src.read())
-                        count += 1
-                    except: pass
-            messagebox.showinfo("Success", f"Saved {count} files to {folder}")
+        if self.exporter is not None:
+            messagebox.showinfo("Info", "An export is already running.")
+            return
+        ExportDialog(self, len(done_items),
+                     lambda formats, folder, zip_path: self._start_export(done_items, formats, folder, zip_path))
+
+    def _start_export(self, jobs, formats, folder, zip_path):
+        # Runs in the background; the footer shows how far it got
+        self.exporter = BulkExporter(
+            jobs, formats, folder=folder, zip_path=zip_path,
+            on_progress=lambda done, total: self.after(0, self._export_progress, done, total),
+            on_finished=lambda written, failures: self.after(0, self._export_finished, written, failures))
+        self.btn_save_all.configure(state="disabled")
+        self._export_progress(0, self.exporter.total)
+        self.exporter.start()
+
+    def _export_progress(self, done, total):
+        self.btn_save_all.configure(text=f"Saving {done}/{total}...")
+
+    def _export_finished(self, written, failures):
+        target = self.exporter.zip_path or self.exporter.folder
+        self.exporter = None
+        self.btn_save_all.configure(text="Save All Finished", state="normal")
+        if not failures:
+            messagebox.showinfo("Success", f"Saved {written} files to {target}")
+            return
+        lines = [f"{name} ({fmt}): {msg}" if name else msg for name, fmt, msg in failures[:15]]
+        if len(failures) > 15:
+            lines.append(f"... and {len(failures) - 15} more")
+        messagebox.showwarning("Saved with errors",
+                               f"Saved {written} files to {target}\n{len(failures)} failed:\n\n" + "\n".join(lines))
 
 
 
-    def delete_item(self, item_to_remove):
+    def delete_item(self, job):
         """
-        Removes the item.
+        Removes the job (stopping it first if needed).
         """
-        if item_to_remove in self.items:
-            self.total_duration=self.total_duration-item_to_remove.durationInSeconds
+        if job in self.jobs:
+            self.stop_job(job)
+            self.jobs.remove(job)
+            # A running job still writes to its store; swept at the next start
+            if job.state not in ("processing", "stopping") and \
+                    not any(other.recovery_file == job.recovery_file for other in self.jobs):
+                segment_store.delete(job.recovery_file)
+                self.journal.clear_checkpoint(job.recovery_file)
             self.update_total_duration_label()
-            self.items.remove(item_to_remove)
-            item_to_remove.pack_forget() # Hide immediately so it looks deleted
-            item_to_remove.request_stop()
-            item_to_remove.destroy()
+            self.queue_view.refresh()
             self.after(0, self.update_total_progress)
         else: print("item is not found in items")
 
-    def delete_recovery_file(self,item):
-        if os.path.exists(item.recovery_file):
-            try:
-                os.remove(item.recovery_file)
-                print('deleted')
-            except Exception as e:
-                print(f"Failed to delete: {e}")
-
-    def remove_from_list(self, item_to_remove):
-        if item_to_remove in self.items:
-            self.items.remove(item_to_remove)
-
     # [ADD THIS NEW METHOD]
 
     def on_closing(self):
@@ -241,8 +507,15 @@ class TranscriptorQueueApp(ctk.CTk):
         
         # --- YOUR LOGIC ADAPTED FOR THREADING ---
         
-        # 1. Stop threads
+        # 1. Stop threads. The journal keeps the queue as it is now (it comes
+        #    back on the next start), so the cancellations aren't recorded
+        self.journal.commit()
+        self.jobs.journal = None
         self.stop_all()
+        if self.watcher is not None:
+            self.watcher.stop()
+        self.scheduler.shutdown()
+        self.duration_prober.shutdown()
         
         # 2. Give threads time to react
         #    NOTE: We replaced your 'self.update()' loop with a simple sleep.
@@ -250,9 +523,8 @@ class TranscriptorQueueApp(ctk.CTk):
         #    running free, so we don't need to manually pump it with update().
         time.sleep(0.5) 
 
-        # 3. Nuke the folder (This was the main cause of the lag)
-        #    Now it runs in the background while the UI says "Wrapping up"
-        Util.force_delete_folder(global_vars.rec_folder, max_retries=20, delay=0.1)
+        # 3. Last checkpoints to disk; rec_folder is kept for the next session
+        self.journal.close()
 
         # 4. Trigger the actual exit on the main thread
         self.after(0, self._complete_exit)
@@ -263,86 +535,118 @@ class TranscriptorQueueApp(ctk.CTk):
         os._exit(0)
 
     def update_total_progress(self):
-        totalCount=len(self.items)
+        totalCount=len(self.jobs)
         if totalCount==0: 
             self.lbl_progress_count.configure(text="")
             self.progress_bar.grid_remove()
             return
-        doneCount=sum([1 for x in self.items if x.state=="done"])
+        doneCount=self.jobs.done_count
         percentage=doneCount/totalCount
         self.progress_bar.set(percentage)
         self.lbl_progress_count.configure(text=f"{doneCount}/{totalCount}")
 
 
-    class UserCancelled(Exception): 
-        pass
-
-    def worker_loop(self):
-        while True:
-            try:
-                
-                # 1. Get next job
-                current_item = self.job_queue.get()
-                
-                # ... (your existing setup code) ...
-                
-                if current_item.cancel_flag:
-                    # ... (your existing skip logic) ...
-                    self.job_queue.task_done()
-                    continue
-
-                self.after(0, lambda target=current_item: target.update_status("Processing...", "processing"))
-                current_item.lbl_stopwatch.start()
-
-                try:
-                    with open(current_item.recovery_file, "w", encoding="utf-8") as f:
-                        
-                        # --- CHANGE 1: Force stop in on_progress ---
-                        def on_progress(percent, chunk_text):
-                            if current_item.cancel_flag:
-                                raise self.UserCancelled()  # <--- CRITICAL: Abort immediately!
-                                
-                            if chunk_text:
-                                f.write(chunk_text + " ")
-                                f.flush()
-                            self.after(0, lambda target=current_item: target.on_progress(percent, chunk_text))
-                        
-                        # --- CHANGE 2: Force stop in check_cancel ---
-                        def check_cancel(): 
-                            if current_item.cancel_flag:
-                                raise self.UserCancelled()  # <--- CRITICAL: Abort immediately!
-                            return False
-
-                        transcribe_module.run_transcription(
-                            current_item.file_path,
-                            progress_callback=on_progress,
-                            check_cancel=check_cancel
-                        )
-                    
-                    # If we get here, it finished successfully
-                    self.after(0, lambda target=current_item: target.finish_success())
-                    self.after(0, self.update_total_progress)
-
-                # --- CHANGE 3: Catch the forced stop ---
-                except self.UserCancelled:
-                    # This block runs INSTANTLY when you raise the exception above
-                    
-                    self.delete_recovery_file(current_item)
-                    self.after(0, lambda target=current_item: target.finish_stopped())
-
-                except Exception as e:
-                    self.delete_recovery_file(current_item)
-                    # This handles actual errors
-                    self.after(0, lambda target=current_item: target.finish_error(str(e)))
-                    current_item.destroy()
-
-                self.job_queue.task_done()
-                current_item.lbl_stopwatch.stop()
-            except Exception as e:
-                print(f"Queue Error: {e}")
-                time.sleep(1)
+    # --- SCHEDULER CALLBACKS (called from the worker threads) ---
+    # They only post to the bus; ui_tick applies them on the UI thread.
+    def on_job_started(self, job):
+        self.ui_bus.post("started", job)
+
+    def on_job_progress(self, job, percent, chunk_text):
+        # Text is read back from the segment store when needed
+        self.ui_bus.post_progress(job, percent, None)
+
+    def on_job_done(self, job):
+        self.ui_bus.post("done", job)
+
+    def on_job_stopped(self, job):
+        self.ui_bus.post("stopped", job)
+
+    def on_job_error(self, job, err_msg):
+        self.ui_bus.post("error", job, err_msg)
+
+    # --- SHARED UI CLOCK ---
+    def ui_tick(self):
+        """Drains the bus at a fixed rate and drives all stopwatches."""
+        try:
+            dirty = {}
+            totals_changed = False
+            for event in self.ui_bus.drain():
+                kind, job = event[0], event[1]
+                if kind == "progress":
+                    self._job_progress(job, event[2], event[3])
+                elif kind == "started":
+                    self._job_started(job)
+                elif kind == "done":
+                    self._job_done(job)
+                    totals_changed = True
+                elif kind == "stopped":
+                    self._job_stopped(job)
+                elif kind == "error":
+                    self._job_error(job, event[2])
+                elif kind == "duration":
+                    self.on_duration_probed(job, event[2])
+                dirty[job.job_id] = job
+
+            # Each changed row is drawn once per frame, however many updates it got
+            for job in dirty.values():
+                self.queue_view.refresh_job(job)
+            if totals_changed:
+                self.update_total_progress()
+
+            second = int(time.time())
+            if second != self._last_clock_second:
+                self._last_clock_second = second
+                self.queue_view.tick_clocks()
+                if second % ETA_REFRESH_SECONDS == 0:
+                    self.update_eta()
+        except Exception as e:
+            print(f"UI update error: {e}")
+        self.after(global_vars.ui_refresh_ms, self.ui_tick)
+
+    # --- Same events, on the UI thread ---
+    def _job_started(self, job):
+        if job not in self.jobs or job.cancel_flag: return
+        self.jobs.set_state(job, "processing", "Processing...")
+        job.started_at = time.time()
+
+    def _job_progress(self, job, percent, chunks):
+        # The text itself lives in the job's segment store, not in memory
+        if job not in self.jobs: return
+        job.progress = percent
+        if job.state == "processing":
+            job.status_text = f"Processing {int(percent*100)}%"
+
+    def _stop_clock(self, job):
+        if job.started_at is not None:
+            job.elapsed = job.elapsed_seconds()
+            job.started_at = None
+
+    def _job_done(self, job):
+        if job not in self.jobs: return
+        self._stop_clock(job)
+        job.progress = 1
+        self.jobs.set_state(job, "done", "Completed")
+        if job.job_id in self.watched_jobs and self.watcher is not None:
+            self.watched_jobs.discard(job.job_id)
+            self.watcher.write_outputs(job.file_path, job.recovery_file)
+
+    def _job_stopped(self, job):
+        if job not in self.jobs: return
+        self._stop_clock(job)
+        # Progress is kept: the next start resumes from the checkpoint
+        if job.progress > 0:
+            self.jobs.set_state(job, "idle", f"Stopped at {int(job.progress*100)}% (resumable)")
+        else:
+            self.jobs.set_state(job, "idle", "Stopped")
+
+    def _job_error(self, job, err_msg):
+        if job not in self.jobs: return
+        self._stop_clock(job)
+        self.jobs.set_state(job, "error", f"Error: {err_msg}")
 
 if __name__ == "__main__":
+    # Needed for the decode prefetch process in the PyInstaller build
+    multiprocessing.freeze_support()
     app = TranscriptorQueueApp()
     app.mainloop()
 
@@ -4,7 +4,6 @@ from tkinter import filedialog, messagebox
 import os
 import queue
 import time
-import transcribe_module
 from util import Util
 import global_vars
 import textwrap
@@ -12,40 +11,35 @@ import arabic_reshaper
 from bidi.algorithm import get_display
 import tempfile
 from stopwatch import StopWatchLabel
+import segment_store
+from segment_store import SegmentStore
+
+# Fixed height of one row (including padding); the queue view uses it to
+# work out how many rows fit on screen
+ROW_HEIGHT = 84
 
 class MediaItem(ctk.CTkFrame):
     """
     Represents a single row in the scrollable list.
+    Rows are recycled: the queue view binds whichever Job is visible at this
+    position (bind_job) and the row just renders that job's state.
     """
-    def __init__(self, parent, file_path, app_manager,on_delete_click=None):
-        super().__init__(parent)
+    def __init__(self, parent, app_manager):
+        super().__init__(parent, height=ROW_HEIGHT - 4)
         self.app = app_manager
-        self.file_path = file_path
-        self.on_delete_click=on_delete_click
-        self.filename = os.path.basename(file_path)
-        self.transcription_text = ""
-        self.state = "idle"  # idle, waiting, processing, done, error, stopped
-        self.durationInSeconds=Util.get_audio_duration(self.file_path)
-        # Create a unique recovery filename
-        safe_name = "".join([c for c in self.filename if c.isalpha() or c.isdigit() or c==' ']).rstrip()
-        self.recovery_file = f"recovery_{safe_name}.txt"
-
-        safe_filename = os.path.basename(self.file_path) + ".txt"
-        recovery_path = os.path.join(global_vars.rec_folder, safe_filename)
-        
-        # Store this path so we can reference it later if needed
-        self.recovery_file = recovery_path
+        self.job = None
+        self.grid_propagate(False)
 
         # --- UI LAYOUT ---
         self.grid_columnconfigure(1, weight=1) 
         
         
         # 1. Filename
-        self.lbl_name = ctk.CTkLabel(self, text=self.filename, anchor="w", font=("Arial", 12, "bold"))
+        self.lbl_name = ctk.CTkLabel(self, text="", anchor="w", font=("Arial", 12, "bold"))
         self.lbl_name.grid(row=0, column=0, columnspan=2, padx=10, pady=(5,0), sticky="ew")
         
         
-        self.lbl_duration = ctk.CTkLabel(self, text=Util.format_duration(self.durationInSeconds), text_color="gray", font=("Arial", 11))
+        self.lbl_duration = ctk.CTkLabel(self, text="--:--", text_color="gray", font=("Arial", 11))
         self.lbl_duration.grid(row=2, column=0, padx=15, pady=1, sticky="w") 
     
         # 2. Status
@@ -74,6 +68,11 @@ class MediaItem(ctk.CTkFrame):
                                       command=self.request_stop, fg_color="#c0392b", state="disabled")
         self.btn_stop.pack(side="left", padx=2)
 
+        # Take this one next (waiting jobs only)
+        self.btn_first = ctk.CTkButton(self.btn_frame, text="⇧", width=30, height=30,
+                                       command=self.request_first, state="disabled")
+        self.btn_first.pack(side="left", padx=2)
+
         self.btn_view = ctk.CTkButton(
     self.btn_frame, 
     text="👁",           # The Eye Icon
@@ -95,142 +94,81 @@ class MediaItem(ctk.CTkFrame):
                                         command=self._handle_delete_click, fg_color="#7f8c8d", hover_color="#95a5a6")
         self.btn_delete.pack(side="left", padx=2)
 
-        self.cancel_flag = False
-
-
-
- 
 
 
     def open_in_word_rtl(self):
-    # 1. Prepare RTF Header for Arabic (RTL) Support
-    # \rtf1 = RTF format
-    # \ansi = Character set
-    # \deflang1025 = Arabic (Saudi Arabia) default language ID
-        header = r"{\rtf1\ansi\ansicpg1252\deff0\nouicompat\deflang1025" \
-                r"{\fonttbl{\f0\fnil\fcharset178 Arial;}}" \
-                r"\viewkind4\uc1"
-
-        # 2. Configure Paragraph: RTL Direction + Right Alignment
-        # \pard = Reset paragraph
-        # \rtlpar = Right-to-Left Direction (Critical for Arabic)
-        # \qr = Right Align
-        # \f0\fs32 = Arial Font, Size 16
-        formatting = r"\pard\sa200\sl276\slmult1\rtlpar\qr\lang1025\f0\fs32 "
-
-        # 3. Encode Text to RTF-safe format
-        # This loop ensures every Arabic character is readable by Word
-        safe_text = ""
-        for char in self.transcription_text:
-            code = ord(char)
-            if code > 127:
-                safe_text += f"\\u{code}?" # Unicode escape
-            elif char == "\n":
-                safe_text += "\\par "      # New line
-            elif char in ["{", "}", "\\"]:
-                safe_text += "\\" + char   # Escape special chars
-            else:
-                safe_text += char
-
-        # 4. Combine parts
-        full_content = header + formatting + safe_text + "}"
-
-        # 5. Create a standard Temporary File (Invisible to your project)
-        # This creates a file in C:\Users\You\AppData\Local\Temp\...
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.rtf', encoding='utf-8') as temp:
-            temp.write(full_content)
+        # Streams the transcript as an RTL document (see rtl_document) into a
+        # standard Temporary File (Invisible to your project)
+        fmt = global_vars.rtl_viewer_format
+        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{fmt}") as temp:
             temp_path = temp.name
+        try:
+            SegmentStore(self.job.recovery_file).export(temp_path, fmt)
+            # Open immediately in Word (or whatever handles the format)
+            Util.open_path(temp_path)
+        except Exception as e:
+            print(f"Open in Word Failed: {e}")
+            messagebox.showerror("Open Failed", f"Could not open the transcript:\n{e}")
+
+    # --- BINDING / RENDERING ---
+    def bind_job(self, job):
+        self.job = job
+        if job is not None:
+            self.render()
+
+    def render(self):
+        """ Draws the bound job's current state. """
+        job = self.job
+        if job is None or not self.winfo_exists(): return
+
+        # Model name only when there is a choice of models
+        name = job.filename if len(global_vars.models) < 2 else f"{job.filename}  [{job.model}]"
+        self.lbl_name.configure(text=name)
+        duration_text = Util.format_duration(job.durationInSeconds) if job.durationInSeconds else "--:--"
+        # Compact speed summary once the job has finished (see job_metrics)
+        if job.state == "done" and job.metrics is not None and job.metrics.summary():
+            duration_text += f"  ·  {job.metrics.summary()}"
+        self.lbl_duration.configure(text=duration_text)
+        self.progress_bar.set(job.progress)
+        self.lbl_stopwatch.track(job)
+
+        self.lbl_status.configure(text=job.status_text)
+        if job.state == "done": self.lbl_status.configure(text_color="#2ecc71")
+        elif job.state == "error": self.lbl_status.configure(text_color="#e74c3c")
+        elif job.state == "processing": self.lbl_status.configure(text_color="#3498db")
+        else: self.lbl_status.configure(text_color="gray")
 
-        # 6. Open immediately in Word
-        os.startfile(temp_path)
+        can_start = job.state in ["idle", "error"]
+        can_stop = job.state in ["waiting", "processing"]
+        is_done = job.state == "done"
+        self.btn_start.configure(state="normal" if can_start else "disabled")
+        self.btn_stop.configure(state="normal" if can_stop else "disabled")
+        self.btn_first.configure(state="normal" if job.state == "waiting" else "disabled")
+        for btn in (self.btn_view, self.btn_copy, self.btn_save):
+            btn.configure(state="normal" if is_done else "disabled")
 
     def _handle_delete_click(self):
-        if self.on_delete_click:
-            self.on_delete_click(self)
+        if self.job is not None:
+            self.app.delete_item(self.job)
 
-    
-    # --- METHODS THAT WERE MISSING ---
     def request_start(self):
-        if self.state in ["processing", "waiting"]: return
-        self.reset_ui()
-        self.app.add_to_queue(self)
-        self.update_status("Waiting...", "waiting")
-        self.btn_start.configure(state="disabled")
-        self.btn_stop.configure(state="normal")
+        if self.job is not None:
+            self.app.start_job(self.job)
 
     def request_stop(self):
-        self.cancel_flag = True
-        if self.state == "waiting":
-            # Safe to stop immediately because no thread is running
-            
-            self.update_status("Cancelled", "idle") 
-            self.btn_start.configure(state="normal")
-            self.btn_stop.configure(state="disabled")
-            
-        elif self.state == "processing":
-            # DO NOT set state to "stopped" here!
-            # Set it to "stopping" so delete_item knows to keep waiting.
-            self.update_status("Stopping...", "stopping") 
-            self.btn_stop.configure(state="disabled")
-
-        self.lbl_stopwatch.stopAndReset()
-        
+        if self.job is not None:
+            self.app.stop_job(self.job)
 
-        
-    def update_status(self, text, state_code):
-        if not self.winfo_exists(): return # [ADD THIS LINE]
-        self.state = state_code
-        self.lbl_status.configure(text=text)
-        if state_code == "done": self.lbl_status.configure(text_color="#2ecc71")
-        elif state_code == "error": self.lbl_status.configure(text_color="#e74c3c")
-        elif state_code == "processing": self.lbl_status.configure(text_color="#3498db")
-        else: self.lbl_status.configure(text_color="gray")
-
-    def reset_ui(self):
-        self.transcription_text = ""
-        self.progress_bar.set(0)
-        self.cancel_flag = False
-        self.btn_copy.configure(state="disabled")
-        self.btn_save.configure(state="disabled")
-        
-
-    def on_progress(self, percent, chunk_text):
-        if not self.winfo_exists(): return
-        self.progress_bar.set(percent)
-        self.lbl_status.configure(text=f"Processing {int(percent*100)}%")
-        if chunk_text:
-            self.transcription_text += chunk_text + " "
-
-    def finish_success(self):
-        self.progress_bar.set(1)
-        self.update_status("Completed", "done")
-        self.btn_start.configure(state="disabled")
-        self.btn_stop.configure(state="disabled")
-
-        self.btn_view.configure(state="normal")
-        self.btn_copy.configure(state="normal")
-        self.btn_save.configure(state="normal")
-
-    # [REPLACE THE EXISTING finish_stopped WITH THIS]
-    def finish_stopped(self):
-        if not self.winfo_exists(): return
-        self.update_status("Stopped", "idle")  
-        self.progress_bar.set(0)
-        self.btn_start.configure(state="normal")
-        self.btn_stop.configure(state="disabled")
-
-    def finish_error(self, err_msg):
-        self.update_status(f"Error: {err_msg}", "error")
-        self.btn_start.configure(state="normal")
-        self.btn_stop.configure(state="disabled")
+    def request_first(self):
+        if self.job is not None:
+            self.app.move_to_front(self.job)
 
     def copy_text(self):
         # 1. Verify file exists
-        if os.path.exists(self.recovery_file):
+        if segment_store.exists(self.job.recovery_file):
             try:
                 # 2. Read and Copy to Clipboard
-                with open(self.recovery_file, "r", encoding="utf-8") as f:
-                    text = f.read()
+                text = SegmentStore(self.job.recovery_file).read_text()
                 self.app.clipboard_clear()
                 self.app.clipboard_append(text)
                 self.app.update() # Keeps clipboard ready
@@ -265,12 +203,19 @@ class MediaItem(ctk.CTkFrame):
                 print(f"Copy Failed: {e}")
 
     def save_text(self):
-        if not os.path.exists(self.recovery_file): return
-        default_name = f"{os.path.splitext(self.filename)[0]}_transcript.txt"
-        save_path = filedialog.asksaveasfilename(defaultextension=".txt", initialfile=default_name)
+        if not segment_store.exists(self.job.recovery_file): return
+        default_name = f"{os.path.splitext(self.job.filename)[0]}_transcript.txt"
+        save_path = filedialog.asksaveasfilename(
+            defaultextension=".txt", initialfile=default_name,
+            filetypes=[("Text", "*.txt"), ("Subtitles (SRT)", "*.srt"), ("WebVTT", "*.vtt"), ("JSON segments", "*.json"), ("Word (RTF)", "*.rtf"), ("Word (DOCX)", "*.docx")])
         if save_path:
-            with open(self.recovery_file, "r", encoding="utf-8") as src, open(save_path, "w", encoding="utf-8") as dst:
-                dst.write(src.read())
+            # Format follows the chosen extension; streamed from the store
+            ext = os.path.splitext(save_path)[1].lstrip(".").lower()
+            try:
+                SegmentStore(self.job.recovery_file).export(save_path, ext if ext in segment_store.EXPORT_FORMATS else "txt")
+            except Exception as e:
+                print(f"Save Failed: {e}")
+                messagebox.showerror("Save Failed", f"Could not save {os.path.basename(save_path)}:\n{e}")
 
     
     
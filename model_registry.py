@@ -0,0 +1,199 @@
+"""
+Resident Whisper models, loaded on demand.
+
+global_vars.models names the available models (e.g. a small one for quick
+drafts, a large one for final transcripts); every job says which one it
+needs (job.model, default global_vars.default_model). Loaded models stay
+resident while they fit the memory budget:
+
+    model_ram_budget_mb    models loaded on the CPU
+    model_vram_budget_mb   models loaded on the GPU
+
+When a model has to be loaded and the budget is full, the least recently
+used idle models are dropped first. A model in use by a job is never
+dropped; if all of them are, the new one is loaded anyway (over budget)
+rather than making the job wait. Models nobody used for
+model_idle_unload_seconds are dropped too, so a long-running session gives
+the memory back.
+
+Sizes are estimated from model.bin on disk - close enough for deciding
+what to keep. With worker_isolation = "process" every worker process has
+its own registry, with budget / worker_count (see process_worker), so the
+budgets hold for the app as a whole.
+"""
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+import global_vars
+from util import Util
+
+
+def model_names():
+    return list(global_vars.models)
+
+
+def model_dir(name=None):
+    """ Folder of the named model (relative paths are next to the app). """
+    name = name or global_vars.default_model
+    if name not in global_vars.models:
+        raise ValueError(f"Unknown model: {name} (available: {', '.join(global_vars.models)})")
+    path = global_vars.models[name]
+    return path if os.path.isabs(path) else Util.resource_path(path)
+
+
+def estimated_bytes(name):
+    model_file = os.path.join(model_dir(name), "model.bin")
+    return os.path.getsize(model_file) if os.path.exists(model_file) else 0
+
+
+class _Entry:
+    __slots__ = ("key", "model", "device", "size", "users", "last_used", "loaded", "error")
+
+    def __init__(self, key, size):
+        self.key = key
+        self.model = None
+        self.device = None
+        self.size = size
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.loaded = threading.Event()
+        self.error = None
+
+
+class ModelRegistry:
+    """
+    loader(name, slot) creates a model; slot is None for the instance shared
+    by all slots (share_model), otherwise the slot's own instance.
+
+    Use acquire() / release() (or the use() context manager) around
+    everything that runs the model.
+    """
+    def __init__(self, loader):
+        self.loader = loader
+        self._entries = OrderedDict()   # (name, slot) -> _Entry, least recently used first
+        self._lock = threading.Lock()
+        self._janitor = None
+
+    # --- USE ---
+    def acquire(self, name=None, slot=None, status_callback=None):
+        key = (name or global_vars.default_model, slot)
+        with self._lock:
+            entry = self._entries.get(key)
+            loading = entry is None
+            if loading:
+                entry = _Entry(key, estimated_bytes(key[0]))
+                self._make_room(entry.size)
+                self._entries[key] = entry
+            entry.users += 1
+            self._entries.move_to_end(key)
+
+        if loading:
+            # Loaded outside the lock: other models stay usable meanwhile
+            try:
+                if status_callback: status_callback(f"Loading model {key[0]} (one-time setup)...")
+                entry.model = self.loader(*key)
+                entry.device = getattr(getattr(entry.model, "model", None), "device", "cpu")
+            except Exception as e:
+                entry.error = e
+                with self._lock:
+                    entry.users -= 1
+                    self._entries.pop(key, None)
+                raise
+            finally:
+                entry.loaded.set()
+            self._start_janitor()
+        else:
+            entry.loaded.wait()
+            if entry.error is not None:
+                raise entry.error
+        return entry.model
+
+    def release(self, name=None, slot=None):
+        key = (name or global_vars.default_model, slot)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.users -= 1
+                entry.last_used = time.monotonic()
+
+    @contextmanager
+    def use(self, name=None, slot=None, status_callback=None):
+        model = self.acquire(name, slot, status_callback)
+        try:
+            yield model
+        finally:
+            self.release(name, slot)
+
+    # --- EVICTION ---
+    def _budget(self, device):
+        mb = global_vars.model_vram_budget_mb if device == "cuda" else global_vars.model_ram_budget_mb
+        return mb * 1024 * 1024 if mb else None
+
+    def _resident(self, device):
+        return sum(e.size for e in self._entries.values() if (e.device or "cpu") == device)
+
+    def _make_room(self, size):
+        """ Drops idle models (least recently used first) until size fits. Called with the lock held. """
+        # Where the new model ends up is only known once it is loaded;
+        # make room on the device the resident models mostly use
+        devices = {e.device or "cpu" for e in self._entries.values()} or {"cpu"}
+        for device in devices:
+            budget = self._budget(device)
+            if budget is None:
+                continue
+            for entry in list(self._entries.values()):
+                if self._resident(device) + size <= budget:
+                    break
+                if (entry.device or "cpu") == device and entry.users == 0 and entry.loaded.is_set():
+                    self._drop(entry, "memory budget")
+
+    def _drop(self, entry, reason):
+        del self._entries[entry.key]
+        name, slot = entry.key
+        where = f" (slot {slot})" if slot is not None else ""
+        print(f"Unloading model {name}{where}: {reason}")
+        # A chunk thread may still hold a reference for a moment; the model
+        # is freed when the last one goes
+        entry.model = None
+
+    def unload_idle(self, max_idle=None):
+        max_idle = global_vars.model_idle_unload_seconds if max_idle is None else max_idle
+        now = time.monotonic()
+        with self._lock:
+            idle = [e for e in self._entries.values()
+                    if e.users == 0 and e.loaded.is_set() and now - e.last_used >= max_idle]
+            for entry in idle:
+                self._drop(entry, f"unused for {int(now - entry.last_used)}s")
+        if idle:
+            gc.collect()
+        return len(idle)
+
+    def unload_all(self):
+        return self.unload_idle(max_idle=0)
+
+    def _start_janitor(self):
+        if self._janitor is not None or not global_vars.model_idle_unload_seconds:
+            return
+
+        def run():
+            while True:
+                time.sleep(max(5, min(60, global_vars.model_idle_unload_seconds / 4)))
+                try:
+                    self.unload_idle()
+                except Exception as e:
+                    print(f"Model janitor: {e}")
+
+        with self._lock:
+            if self._janitor is None:
+                self._janitor = threading.Thread(target=run, daemon=True, name="model-janitor")
+                self._janitor.start()
+
+    # --- INFO ---
+    def loaded(self):
+        """ [(name, slot, device, size_mb, users)] of resident models, least recently used first. """
+        with self._lock:
+            return [(e.key[0], e.key[1], e.device, e.size / 1024 / 1024, e.users)
+                    for e in self._entries.values() if e.loaded.is_set()]
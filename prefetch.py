@@ -0,0 +1,206 @@
+"""
+Decodes upcoming queue items in a background process while the current ones
+are being transcribed.
+
+The child process decodes + resamples to 16 kHz mono float32 and leaves the
+samples in a shared memory block; the worker wraps that block in a numpy
+array without copying it. How far ahead it runs is limited by
+global_vars.prefetch_ahead (items) and global_vars.prefetch_budget_mb
+(decoded PCM kept around, including audio currently being transcribed).
+Files whose audio is in the audio cache already are skipped: the worker
+maps them from disk instead (see audio_cache). While streamed decoding is
+on (global_vars.stream_decode, not in chunked mode) there is nothing to
+prefetch - files are decoded a window at a time while they are transcribed
+- and the scheduler doesn't start a prefetcher at all (see prefetch_applies).
+"""
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import global_vars
+import audio_cache
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 4  # float32
+
+
+def prefetch_applies():
+    """ Whether the current settings leave anything to decode ahead. """
+    if not global_vars.prefetch_enabled:
+        return False
+    return not (global_vars.stream_decode and global_vars.transcription_mode != "chunked")
+
+
+def _decode_to_shared_memory(file_path):
+    """ Runs in the child process. Returns (shared memory name, sample count). """
+    from faster_whisper import decode_audio
+    import numpy as np
+
+    audio = decode_audio(file_path, sampling_rate=SAMPLE_RATE)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, audio.nbytes))
+    np.ndarray(audio.shape, dtype=np.float32, buffer=shm.buf)[:] = audio
+
+    # The parent owns the block from now on; stop this process's resource
+    # tracker from unlinking it when the child exits.
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    shm.close()
+    return shm.name, len(audio)
+
+
+def _unlink(name):
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+        shm.close()
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class PrefetchedAudio:
+    """ Decoded PCM living in shared memory. Call release() when done with it. """
+    def __init__(self, prefetcher, name, samples, reserved):
+        import numpy as np
+        self._prefetcher = prefetcher
+        self._reserved = reserved
+        self._shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray((samples,), dtype=np.float32, buffer=self._shm.buf)
+        # Enough for another process to map the same block (see process_worker)
+        self.name = name
+        self.samples = samples
+
+    def release(self):
+        if self._shm is None:
+            return
+        self.array = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # Someone still holds a view; the mapping goes away with it
+            pass
+        self._shm.unlink()
+        self._shm = None
+        self._prefetcher._release(self._reserved)
+
+
+class DecodePrefetcher:
+    def __init__(self, ahead=None, budget_mb=None):
+        self.ahead = max(1, ahead or global_vars.prefetch_ahead)
+        self.budget_bytes = int((budget_mb or global_vars.prefetch_budget_mb) * 1024 * 1024)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._waiting = deque()   # queued jobs not decoding yet
+        self._running = {}        # id(job) -> (future, reserved bytes)
+        self._reserved = 0
+
+    def _estimate_bytes(self, job):
+        seconds = getattr(job, "durationInSeconds", 0) or global_vars.prefetch_unknown_seconds
+        return int(seconds * SAMPLE_RATE * BYTES_PER_SAMPLE)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1)
+        return self._executor
+
+    def enqueue(self, job):
+        with self._lock:
+            self._waiting.append(job)
+        self._fill()
+
+    def reorder(self, jobs):
+        """ Decode the waiting jobs in this order from now on (the queue's order). """
+        with self._lock:
+            waiting = {id(job) for job in self._waiting}
+            self._waiting = deque(job for job in jobs if id(job) in waiting)
+        self._fill()
+
+    def _skip(self, job, cache):
+        return cache is not None and cache.has_pcm(job.file_path)
+
+    def _fill(self):
+        cache = audio_cache.get_cache()
+        with self._lock:
+            while self._waiting and len(self._running) < self.ahead:
+                job = self._waiting[0]
+                if job.cancel_flag or self._skip(job, cache):
+                    self._waiting.popleft()
+                    continue
+
+                need = self._estimate_bytes(job)
+                # Always allow one, even if it alone is over budget
+                if self._running and self._reserved + need > self.budget_bytes:
+                    break
+
+                self._waiting.popleft()
+                try:
+                    future = self._get_executor().submit(_decode_to_shared_memory, job.file_path)
+                except BrokenProcessPool:
+                    self._executor = None
+                    future = self._get_executor().submit(_decode_to_shared_memory, job.file_path)
+                self._running[id(job)] = (future, need)
+                self._reserved += need
+
+    def _release(self, reserved):
+        with self._lock:
+            self._reserved -= reserved
+        self._fill()
+
+    def _pop(self, job):
+        with self._lock:
+            try:
+                self._waiting.remove(job)
+            except ValueError:
+                pass
+            return self._running.pop(id(job), None)
+
+    def take(self, job):
+        """
+        Returns PrefetchedAudio for the job (waiting for its decode if it is
+        still running), or None if it was never prefetched / decoding failed.
+        """
+        entry = self._pop(job)
+        if entry is None:
+            self._fill()
+            return None
+
+        future, reserved = entry
+        try:
+            name, samples = future.result()
+        except Exception as e:
+            print(f"Prefetch failed for {job.file_path}: {e}")
+            self._release(reserved)
+            return None
+        return PrefetchedAudio(self, name, samples, reserved)
+
+    def discard(self, job):
+        """ Drops a job's prefetched audio (cache hit, cancelled, deleted...). """
+        entry = self._pop(job)
+        if entry is None:
+            return
+        future, reserved = entry
+
+        def cleanup(done_future):
+            try:
+                name, _ = done_future.result()
+                _unlink(name)
+            except Exception:
+                pass
+            self._release(reserved)
+
+        future.add_done_callback(cleanup)
+
+    def shutdown(self):
+        # Don't leave decoded blocks behind in shared memory
+        with self._lock:
+            self._waiting.clear()
+            running = list(self._running.values())
+            self._running.clear()
+        for future, _ in running:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                _unlink(future.result()[0])
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,331 @@
+"""
+Transcription in supervised child processes (global_vars.worker_isolation = "process").
+
+Every scheduler slot owns one WorkerProcess: a child that loads the model
+once and keeps it resident, then transcribes one request at a time. The
+slot thread stays in charge of everything else (segment store, checkpoints,
+listener) - the child only streams back what run_transcription reports:
+
+    ("ready",)                            model loaded
+    ("failed", message)                   model could not be loaded
+    ("segment", start, end, text, ...)    one Segment
+    ("progress", percent, chunk_text)     the usual 1% updates
+    ("checkpoint", end_seconds, percent)
+    ("metrics", stages, spans, audio_seconds, segments)
+    ("done", duration) / ("stopped",) / ("error", message)
+
+Decoded audio from the prefetcher is handed over by shared memory name, so
+it is never copied or pickled.
+
+Cancelling first asks the child to stop at the next segment; if it hasn't
+within global_vars.cancel_grace_seconds (a long segment, a stuck decode) the
+process is killed and a fresh one started in the background. A crash in
+CTranslate2 / the decoder only ends the child: that job fails with an error,
+the app and the other slots keep running.
+"""
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+import global_vars
+
+# Polling interval of the slot thread (cancel flag / dead child)
+POLL_SECONDS = 0.1
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _settings_snapshot():
+    """ global_vars as changed at runtime (CLI flags, benchmark) - a spawned child re-imports the defaults. """
+    return {name: value for name, value in vars(global_vars).items()
+            if not name.startswith("_") and isinstance(value, (bool, int, float, str, list, tuple, dict, type(None)))}
+
+
+def _child_settings():
+    """ What a child runs with: the parent's settings, with the machine split between the slots. """
+    import device_select
+    settings = _settings_snapshot()
+    # The child sees worker_count = 1; left to itself it would take every core
+    settings["cpu_threads"] = device_select.cpu_threads_per_worker(global_vars.worker_count)
+    # Every child has its own model registry: the memory budgets are split
+    # too, so all of them together stay within the app-wide budget
+    slots = max(1, global_vars.worker_count)
+    for name in ("model_ram_budget_mb", "model_vram_budget_mb"):
+        if settings.get(name):
+            settings[name] = settings[name] / slots
+    return settings
+
+
+def _attach_audio(name, samples):
+    import numpy as np
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: attaching registers the block with the resource
+        # tracker, which would unlink it when this child exits. The parent owns it.
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+    return shm, np.ndarray((samples,), dtype=np.float32, buffer=shm.buf)
+
+
+def _worker_main(conn, cancel_event, settings):
+    """ Runs in the child process. """
+    for name, value in settings.items():
+        setattr(global_vars, name, value)
+    # One instance per model in this process: it only serves this slot (and
+    # its chunk threads). Its share of the cores came with settings.
+    global_vars.worker_count = 1
+    global_vars.share_model = True
+
+    import transcribe_module
+    from job_metrics import JobMetrics
+
+    try:
+        transcribe_module.warm_up()
+    except Exception as e:
+        conn.send(("failed", str(e)))
+        return
+    conn.send(("ready",))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return  # Parent went away
+        if message[0] == "quit":
+            return
+
+        request = message[1]
+        metrics = JobMetrics()
+        shm, audio = None, None
+
+        def check_cancel():
+            if cancel_event.is_set():
+                raise _Cancelled()
+            return False
+
+        try:
+            if request.get("shm_name"):
+                shm, audio = _attach_audio(request["shm_name"], request["samples"])
+            duration = transcribe_module.run_transcription(
+                request["file_path"],
+                progress_callback=lambda percent, text: conn.send(("progress", percent, text)),
+                check_cancel=check_cancel,
+                mode=request.get("mode"),
+                start_offset=request.get("start_offset", 0.0),
+                checkpoint_callback=lambda end, percent: conn.send(("checkpoint", end, percent)),
+                audio=audio,
+                segment_callback=lambda segment: conn.send(("segment",) + tuple(segment)),
+                metrics=metrics,
+                model_name=request.get("model"))
+            result = ("done", duration)
+        except _Cancelled:
+            result = ("stopped",)
+        except Exception as e:
+            result = ("error", str(e))
+        finally:
+            audio = None
+            if shm is not None:
+                shm.close()
+
+        conn.send(("metrics", metrics.stages, metrics.spans, metrics.audio_seconds, metrics.segments))
+        conn.send(result)
+
+
+class WorkerProcess:
+    """ Parent side of one child. Used by a single slot thread at a time. """
+    def __init__(self, slot):
+        self.slot = slot
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self.process = None
+        self.conn = None
+        self.cancel_event = None
+        self.ready = False
+
+    # --- LIFECYCLE ---
+    def start(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        self.cancel_event = self._ctx.Event()
+        self.process = self._ctx.Process(target=_worker_main, args=(child_conn, self.cancel_event, _child_settings()),
+                                         daemon=True, name=f"transcribe-worker-{self.slot}")
+        self.conn = parent_conn
+        self.ready = False
+        try:
+            self.process.start()
+        finally:
+            child_conn.close()
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def kill(self):
+        if self.process is not None and self.process.pid is not None:
+            # (pid is None: start() failed, there is nothing to join)
+            try:
+                if self.process.is_alive():
+                    self.process.kill()
+                self.process.join(timeout=5)
+            except Exception as e:
+                print(f"Worker {self.slot}: could not stop the child: {e}")
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+        self.process, self.conn, self.ready = None, None, False
+
+    def restart(self):
+        self.kill()
+        self.start()
+
+    def shutdown(self):
+        if self.alive():
+            try:
+                self.conn.send(("quit",))
+                self.process.join(timeout=2)
+            except Exception:
+                pass
+        self.kill()
+
+    def warm_up(self, wait=True):
+        """
+        Starts the child (if needed); with wait, until its model is loaded.
+        Skipped while a job holds the worker - it is loaded (or loading) then.
+        """
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if not self.alive():
+                self.start()
+            if wait:
+                self._ensure_ready(check_cancel=None)
+        finally:
+            self._lock.release()
+
+    def _receive(self, check_cancel):
+        """ Next message; checks check_cancel and whether the child is still alive while waiting. """
+        while True:
+            if check_cancel:
+                check_cancel()
+            try:
+                if self.conn.poll(POLL_SECONDS):
+                    return self.conn.recv()
+            except (EOFError, OSError):
+                pass
+            else:
+                if self.process.is_alive():
+                    continue
+            # Pipe closed or the child is gone (crash, out of memory, killed)
+            code = self.process.exitcode if self.process else None
+            self.restart()
+            raise WorkerCrashed(f"Transcription worker crashed (exit code {code})")
+
+    def _ensure_ready(self, check_cancel):
+        if not self.alive():
+            self.start()
+        while not self.ready:
+            message = self._receive(check_cancel)
+            if message[0] == "ready":
+                self.ready = True
+            elif message[0] == "failed":
+                # The child exits by itself; the next job tries again
+                self.kill()
+                raise RuntimeError(message[1])
+
+    # --- JOBS ---
+    def run(self, request, segment_callback, progress_callback, checkpoint_callback, check_cancel, metrics):
+        """
+        Transcribes request (file_path, mode, start_offset, model, optional
+        shm_name / samples) in the child. The callbacks run on the calling thread and
+        may raise (check_cancel / progress_callback raise the scheduler's
+        UserCancelled); the child is then cancelled and the exception re-raised.
+        Returns the duration like run_transcription.
+        """
+        from transcribe_module import Segment
+
+        with self._lock:
+            child_busy = False
+            try:
+                with metrics.stage("model_load"):
+                    self._ensure_ready(check_cancel)
+                self.cancel_event.clear()
+                self.conn.send(("transcribe", request))
+                child_busy = True
+
+                while True:
+                    message = self._receive(check_cancel)
+                    kind = message[0]
+                    if kind == "segment":
+                        segment_callback(Segment(*message[1:]))
+                    elif kind == "progress":
+                        progress_callback(message[1], message[2])
+                    elif kind == "checkpoint":
+                        checkpoint_callback(message[1], message[2])
+                    elif kind == "metrics":
+                        _, stages, spans, audio_seconds, segments = message
+                        for name, seconds in stages.items():
+                            metrics.add(name, seconds)
+                        metrics.spans.extend(spans)
+                        metrics.audio_seconds = audio_seconds
+                        metrics.segments = segments
+                    elif kind == "done":
+                        return message[1]
+                    elif kind == "error":
+                        child_busy = False
+                        raise RuntimeError(message[1])
+                    elif kind == "stopped":
+                        # Only happens when a cancel raced with the end of the job
+                        raise WorkerCrashed("Transcription worker stopped unexpectedly")
+            except WorkerCrashed:
+                raise
+            except Exception:
+                # Cancelled by the user, or a callback failed: the child must not
+                # keep going on its own
+                if child_busy and self.alive():
+                    self._cancel()
+                raise
+
+    def _cancel(self):
+        """ Asks the child to stop; kills (and replaces) it if it doesn't within the grace period. """
+        self.cancel_event.set()
+        deadline = time.monotonic() + max(0.0, global_vars.cancel_grace_seconds)
+        try:
+            while time.monotonic() < deadline:
+                if self.conn.poll(min(POLL_SECONDS, max(0.0, deadline - time.monotonic()))):
+                    if self.conn.recv()[0] in ("done", "stopped", "error"):
+                        return  # Stopped cleanly, model stays loaded
+        except (EOFError, OSError):
+            pass
+        print(f"Worker {self.slot} did not stop in time, restarting it")
+        self.restart()
+
+
+class WorkerPool:
+    """ One WorkerProcess per scheduler slot, started lazily. """
+    def __init__(self, worker_count):
+        self.workers = [WorkerProcess(slot) for slot in range(worker_count)]
+
+    def get(self, slot):
+        return self.workers[slot]
+
+    def warm_up(self):
+        # Children load their models in parallel
+        for worker in self.workers:
+            worker.warm_up(wait=False)
+        for worker in self.workers:
+            worker.warm_up()
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.shutdown()
@@ -0,0 +1,125 @@
+import customtkinter as ctk
+from media_item import MediaItem, ROW_HEIGHT
+
+
+class QueueView(ctk.CTkFrame):
+    """
+    Virtualized list of jobs: only as many MediaItem rows as fit on screen
+    exist, and they get re-bound to other jobs when the user scrolls.
+    """
+    def __init__(self, parent, app_manager, job_list, label_text=""):
+        super().__init__(parent)
+        self.app = app_manager
+        self.job_list = job_list
+        self.first_index = 0
+        self.rows = []
+        self.row_of_job = {}  # job_id -> row currently showing it
+
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        if label_text:
+            self.lbl_title = ctk.CTkLabel(self, text=label_text, font=("Arial", 13, "bold"))
+            self.lbl_title.grid(row=0, column=0, columnspan=2, pady=(5, 0))
+
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=1, column=0, sticky="nsew", padx=(5, 0), pady=5)
+        self.body.grid_columnconfigure(0, weight=1)
+        # Rows must not make the list taller than the window
+        self.body.grid_propagate(False)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns", pady=5)
+
+        self.body.bind("<Configure>", self._on_resize)
+        self.bind_all("<MouseWheel>", self._on_wheel, add="+")
+        self.bind_all("<Button-4>", self._on_wheel, add="+")
+        self.bind_all("<Button-5>", self._on_wheel, add="+")
+
+    # --- ROW POOL ---
+    def _on_resize(self, event):
+        needed = max(1, event.height // ROW_HEIGHT + 1)
+        while len(self.rows) < needed:
+            row = MediaItem(self.body, self.app)
+            row.grid(row=len(self.rows), column=0, sticky="ew", pady=2, padx=5)
+            self.rows.append(row)
+        while len(self.rows) > needed:
+            self.rows.pop().destroy()
+        self.refresh()
+
+    def visible_count(self):
+        return len(self.rows)
+
+    # --- SCROLLING ---
+    def _max_first(self):
+        return max(0, len(self.job_list) - max(1, self.visible_count() - 1))
+
+    def scroll_to(self, index):
+        index = max(0, min(int(index), self._max_first()))
+        if index != self.first_index:
+            self.first_index = index
+            self.refresh()
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * len(self.job_list))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= max(1, self.visible_count() - 1)
+            self.scroll_to(self.first_index + step)
+
+    def _on_wheel(self, event):
+        # Only scroll while the pointer is over the list
+        try:
+            widget = self.winfo_containing(event.x_root, event.y_root)
+        except Exception:
+            return
+        if widget is None or not str(widget).startswith(str(self)):
+            return
+
+        if getattr(event, "num", None) == 4:
+            step = -1
+        elif getattr(event, "num", None) == 5:
+            step = 1
+        else:
+            step = -1 if event.delta > 0 else 1
+        self.scroll_to(self.first_index + step)
+
+    # --- RENDERING ---
+    def refresh(self):
+        """ Re-binds every row to the jobs at the current scroll position. """
+        self.first_index = min(self.first_index, self._max_first())
+        self.row_of_job.clear()
+        for offset, row in enumerate(self.rows):
+            index = self.first_index + offset
+            if index < len(self.job_list):
+                job = self.job_list[index]
+                row.bind_job(job)
+                self.row_of_job[job.job_id] = row
+                row.grid()
+            else:
+                row.bind_job(None)
+                row.grid_remove()
+        self._update_scrollbar()
+
+    def refresh_job(self, job):
+        """ Redraws one job if it is on screen (cheap no-op otherwise). """
+        row = self.row_of_job.get(job.job_id)
+        if row is not None and row.job is job:
+            row.render()
+
+    def tick_clocks(self):
+        """ Advances the stopwatches of the visible rows (shared 1 s clock). """
+        for row in self.rows:
+            if row.job is not None:
+                row.lbl_stopwatch.tick()
+
+    def _update_scrollbar(self):
+        total = len(self.job_list)
+        if total == 0:
+            self.scrollbar.set(0, 1)
+            return
+        first = self.first_index / total
+        last = min(1.0, (self.first_index + self.visible_count()) / total)
+        self.scrollbar.set(first, last)
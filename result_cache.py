@@ -0,0 +1,197 @@
+"""
+Persistent cache of finished transcripts.
+
+Entries are keyed by a hash of the audio *content* plus everything that
+changes the output (model, decoding options, mode), so re-adding the same
+recording - even renamed or from another folder - completes instantly.
+The cache lives in Util.app_data_dir("result_cache"), apart from the queue's
+rec_folder, and is capped at global_vars.result_cache_max_mb with LRU eviction.
+
+Inspect / clear it with:
+    python result_cache.py stats
+    python result_cache.py list
+    python result_cache.py clear
+"""
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import global_vars
+import segment_store
+from util import Util
+
+HASH_BLOCK_SIZE = 1024 * 1024
+# How often hashes of deleted files are looked for: it stats every file
+# ever hashed (network shares, see watch_folder), so not per job
+HASH_PRUNE_SECONDS = 24 * 3600
+
+
+class ResultCache:
+    def __init__(self, folder=None, max_bytes=None):
+        self.folder = folder or Util.app_data_dir("result_cache")
+        self.max_bytes = max_bytes if max_bytes is not None else int(global_vars.result_cache_max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.folder, "index.sqlite"), check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, source_name TEXT, size INTEGER,"
+                " created REAL, last_access REAL)")
+            # Content hashes by (path, size, mtime): unchanged files aren't re-read
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS file_hashes ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime REAL, digest TEXT)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value REAL)")
+
+    # --- KEYS ---
+    def content_hash(self, file_path):
+        st = os.stat(file_path)
+        path = os.path.abspath(file_path)
+        with self._lock:
+            row = self._db.execute("SELECT size, mtime, digest FROM file_hashes WHERE path=?", (path,)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime:
+            return row[2]
+
+        digest = Util.file_sha256(file_path, HASH_BLOCK_SIZE)
+
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                             (path, st.st_size, st.st_mtime, digest))
+        return digest
+
+    def key_for(self, file_path, identity):
+        """ identity: dict describing the model + decoding parameters. """
+        h = hashlib.sha256(self.content_hash(file_path).encode("ascii"))
+        h.update(json.dumps(identity, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        return h.hexdigest()
+
+    def _entry_path(self, key):
+        # Entries are segment stores (data + .idx), see segment_store
+        return os.path.join(self.folder, key + ".seg")
+
+    # --- LOOKUP / STORE ---
+    def get(self, key):
+        """ Returns the path of the cached segment store, or None. """
+        path = self._entry_path(key)
+        with self._lock, self._db:
+            row = self._db.execute("SELECT key FROM entries WHERE key=?", (key,)).fetchone()
+            if not row:
+                return None
+            if not segment_store.exists(path):
+                self._db.execute("DELETE FROM entries WHERE key=?", (key,))
+                return None
+            self._db.execute("UPDATE entries SET last_access=? WHERE key=?", (time.time(), key))
+        return path
+
+    def put(self, key, store_path, source_name=""):
+        path = self._entry_path(key)
+        # Index last: get() only trusts entries whose both files exist
+        shutil.copyfile(store_path, path)
+        shutil.copyfile(segment_store.index_path(store_path), segment_store.index_path(path))
+        size = os.path.getsize(path) + os.path.getsize(segment_store.index_path(path))
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                             (key, source_name, size, now, now))
+        self._evict()
+        self._prune_hashes_due()
+
+    def _evict(self):
+        with self._lock, self._db:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+                if total <= self.max_bytes:
+                    break
+                self._remove_file(key)
+                self._db.execute("DELETE FROM entries WHERE key=?", (key,))
+                total -= size
+
+    def _prune_hashes_due(self):
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute("SELECT value FROM meta WHERE name='hashes_pruned'").fetchone()
+            if row and now - row[0] < HASH_PRUNE_SECONDS:
+                return
+            # Claimed before the slow part: other processes skip it meanwhile
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('hashes_pruned', ?)", (now,))
+        self._prune_hashes()
+
+    def _prune_hashes(self):
+        # Hashes of files that were deleted or changed since can't be hit again
+        with self._lock:
+            rows = self._db.execute("SELECT path, size, mtime FROM file_hashes").fetchall()
+        stale = []
+        for path, size, mtime in rows:
+            try:
+                st = os.stat(path)
+            except OSError:
+                stale.append((path, size, mtime))
+                continue
+            if st.st_size != size or st.st_mtime != mtime:
+                stale.append((path, size, mtime))
+        if stale:
+            # Only the rows as read: a file hashed again meanwhile keeps its new row
+            with self._lock, self._db:
+                self._db.executemany("DELETE FROM file_hashes WHERE path=? AND size=? AND mtime=?", stale)
+
+    def _remove_file(self, key):
+        segment_store.delete(self._entry_path(key))
+
+    # --- INSPECT / CLEAR ---
+    def stats(self):
+        with self._lock:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"folder": self.folder, "entries": count, "bytes": total, "max_bytes": self.max_bytes}
+
+    def entries(self):
+        with self._lock:
+            return self._db.execute(
+                "SELECT key, source_name, size, created, last_access FROM entries ORDER BY last_access DESC").fetchall()
+
+    def clear(self):
+        with self._lock, self._db:
+            for (key,) in self._db.execute("SELECT key FROM entries").fetchall():
+                self._remove_file(key)
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("DELETE FROM file_hashes")
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+def get_cache():
+    """ Shared instance (None when the cache is disabled). """
+    global _CACHE
+    if not global_vars.result_cache_enabled:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ResultCache()
+        return _CACHE
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = ResultCache()
+
+    if command == "stats":
+        s = cache.stats()
+        print(f"Folder:  {s['folder']}")
+        print(f"Entries: {s['entries']}")
+        print(f"Size:    {s['bytes'] / 1024 / 1024:.1f} MB of {s['max_bytes'] / 1024 / 1024:.0f} MB")
+    elif command == "list":
+        for key, name, size, created, last_access in cache.entries():
+            used = time.strftime("%Y-%m-%d %H:%M", time.localtime(last_access))
+            print(f"{key[:12]}  {size:>10}  {used}  {name}")
+    elif command == "clear":
+        cache.clear()
+        print("Cache cleared.")
+    else:
+        print("Usage: python result_cache.py [stats|list|clear]")
+        sys.exit(1)
@@ -0,0 +1,128 @@
+"""
+Right-to-left documents (Arabic transcripts) for Word.
+
+Both writers take the text as an iterable of chunks (e.g.
+SegmentStore.iter_text()) and stream it to disk, so the size of the
+transcript doesn't matter. Escaping is done per chunk with str.translate
+instead of character by character in Python.
+
+    write_rtf(chunks, f)        f: text file
+    write_docx(chunks, target)  target: path or binary file
+"""
+import zipfile
+from xml.sax.saxutils import escape
+
+# --- RTF ---
+# \deflang1025 = Arabic default language, \fcharset178 = Arabic charset
+RTF_HEADER = r"{\rtf1\ansi\ansicpg1252\deff0\nouicompat\deflang1025" \
+             r"{\fonttbl{\f0\fnil\fcharset178 Arial;}}" \
+             r"\viewkind4\uc1"
+# \rtlpar = Right-to-Left paragraph, \qr = right aligned, \fs32 = 16pt
+RTF_PARAGRAPH = r"\pard\sa200\sl276\slmult1\rtlpar\qr\lang1025\f0\fs32 "
+
+
+def _rtf_unicode(code):
+    # \uN takes a signed 16-bit number; \uc1 = one "?" fallback char after it
+    if code > 0xFFFF:
+        code -= 0x10000
+        return _rtf_unicode(0xD800 + (code >> 10)) + _rtf_unicode(0xDC00 + (code & 0x3FF))
+    if code > 0x7FFF:
+        code -= 0x10000
+    return f"\\u{code}?"
+
+
+# str.translate table. Plain dict (much faster than one with __missing__):
+# ASCII and the Arabic blocks are filled in up front, anything else the first
+# time rtf_escape() meets it.
+RTF_TABLE = {code: chr(code) for code in range(128)}
+RTF_TABLE.update({ord("\\"): "\\\\", ord("{"): "\\{", ord("}"): "\\}", ord("\n"): "\\par "})
+for _first, _last in ((0x0600, 0x06FF), (0x0750, 0x077F), (0x2000, 0x206F), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)):
+    RTF_TABLE.update({code: _rtf_unicode(code) for code in range(_first, _last + 1)})
+
+
+def rtf_escape(text):
+    """ Encodes text to RTF-safe ASCII so every Arabic character is readable by Word. """
+    out = text.translate(RTF_TABLE)
+    if not out.isascii():
+        # Characters the table doesn't know yet came through unchanged
+        for char in set(out):
+            if ord(char) > 127:
+                RTF_TABLE[ord(char)] = _rtf_unicode(ord(char))
+        out = text.translate(RTF_TABLE)
+    return out
+
+
+def batched(chunks, size=64 * 1024):
+    """ Joins small chunks (one per segment) into ~size characters, so the encoding runs in bulk. """
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def write_rtf(chunks, f):
+    f.write(RTF_HEADER)
+    f.write(RTF_PARAGRAPH)
+    for chunk in batched(chunks):
+        f.write(rtf_escape(chunk))
+    f.write("}")
+
+
+# --- DOCX ---
+# The smallest package Word opens: content types, one relationship, the body
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>')
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>')
+_DOCUMENT_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>')
+_DOCUMENT_END = '<w:sectPr/></w:body></w:document>'
+# <w:bidi/> = Right-to-Left paragraph (starts at the right edge), 16pt Arial
+_PARAGRAPH_START = '<w:p><w:pPr><w:bidi/><w:spacing w:after="200" w:line="276" w:lineRule="auto"/></w:pPr>'
+_RUN_START = ('<w:r><w:rPr><w:rFonts w:ascii="Arial" w:hAnsi="Arial" w:cs="Arial"/><w:rtl/>'
+              '<w:sz w:val="32"/><w:szCs w:val="32"/><w:lang w:bidi="ar-SA"/></w:rPr>'
+              '<w:t xml:space="preserve">')
+_RUN_END = '</w:t></w:r>'
+
+# Control characters are not allowed in XML 1.0 at all
+_XML_TABLE = {code: None for code in range(32) if code not in (9, 10, 13)}
+
+
+def _docx_runs(chunk):
+    """ XML for one chunk; new lines start a new paragraph. """
+    lines = escape(chunk.translate(_XML_TABLE)).split("\n")
+    parts = []
+    for n, line in enumerate(lines):
+        if n:
+            parts.append("</w:p>" + _PARAGRAPH_START)
+        if line:
+            parts.append(_RUN_START + line + _RUN_END)
+    return "".join(parts)
+
+
+def write_docx(chunks, target):
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _RELS)
+        with zf.open("word/document.xml", "w") as f:
+            f.write((_DOCUMENT_START + _PARAGRAPH_START).encode("utf-8"))
+            for chunk in batched(chunks):
+                f.write(_docx_runs(chunk).encode("utf-8"))
+            f.write(("</w:p>" + _DOCUMENT_END).encode("utf-8"))
@@ -0,0 +1,412 @@
+import os
+import threading
+import time
+import transcribe_module
+import result_cache
+import job_metrics
+import eta
+import job_journal
+from job_queue import JobQueue
+from job_metrics import JobMetrics
+import segment_store
+from segment_store import SegmentWriter
+from prefetch import DecodePrefetcher, prefetch_applies
+from process_worker import WorkerPool
+import global_vars
+
+
+class UserCancelled(Exception):
+    pass
+
+
+# --- CHECKPOINTS (resume after stop / crash) ---
+# Kept in the job journal of rec_folder (see job_journal), per segment
+# store: how far the audio is done and how many stored segments belong to
+# that point.
+
+def load_checkpoint(job):
+    """ Returns the checkpoint dict if the job can be resumed, otherwise None. """
+    try:
+        ckpt = job_journal.get_journal().get_checkpoint(job.recovery_file)
+        if not (ckpt and segment_store.exists(job.recovery_file)):
+            return None
+        st = os.stat(job.file_path)
+        # The source file changed since: the checkpoint is worthless
+        if ckpt["source_size"] != st.st_size or ckpt["source_mtime"] != st.st_mtime:
+            return None
+        if len(segment_store.SegmentStore(job.recovery_file)) < ckpt["segments"]:
+            return None
+        return ckpt
+    except Exception as e:
+        print(f"Ignoring checkpoint of {job.file_path}: {e}")
+        return None
+
+def save_checkpoint(job, end_seconds, percent, segments):
+    st = os.stat(job.file_path)
+    ckpt = {
+        "offset": end_seconds,
+        "percent": percent,
+        "segments": segments,
+        "source_size": st.st_size,
+        "source_mtime": st.st_mtime,
+    }
+    job_journal.get_journal().set_checkpoint(job.recovery_file, ckpt)
+
+def clear_checkpoint(job):
+    try:
+        job_journal.get_journal().clear_checkpoint(job.recovery_file)
+    except Exception as e:
+        print(f"Failed to delete checkpoint: {e}")
+
+
+class TranscriptionScheduler:
+    """
+    Runs queued jobs on a fixed number of worker threads ("slots"), in the
+    order of a JobQueue (see job_queue: policy, reordering, removal).
+
+    A job is any object with file_path, recovery_file (path of its segment
+    store, see segment_store) and cancel_flag attributes, plus a writable
+    metrics attribute that gets the run's job_metrics.JobMetrics
+    (job_model.Job in the GUI). An optional model attribute names the
+    model to use (see model_registry). The listener gets told what happens to
+    each job; its methods are called from the worker threads, so a GUI
+    listener has to hop back to the UI thread itself (self.after).
+
+    Listener methods:
+        on_job_started(job)
+        on_job_progress(job, percent, chunk_text)
+        on_job_done(job)
+        on_job_stopped(job)
+        on_job_error(job, err_msg)
+
+    eta() predicts when every job will be done from the speed measured on
+    this machine (see eta). With a deadline set, jobs picked up while the
+    queue would finish too late run with global_vars.deadline_fast_model /
+    deadline_fast_mode instead, until it is back on track.
+    """
+    def __init__(self, listener, worker_count=None):
+        self.listener = listener
+        self.worker_count = max(1, worker_count or global_vars.worker_count)
+        self.job_queue = JobQueue()
+        self.workers = []
+        # Recovery file -> the job a slot is writing it for
+        self._active_files = {}
+        self._active_lock = threading.Lock()
+        # Decodes the next queued files while the current ones run
+        self.prefetcher = DecodePrefetcher() if prefetch_applies() else None
+        # id(job) -> perf_counter() when submitted (queue wait metric)
+        self._submitted = {}
+        # Inference in child processes: killable on cancel, crashes stay there
+        self.worker_pool = WorkerPool(self.worker_count) if global_vars.worker_isolation == "process" else None
+        # Measured speed, for ETAs
+        self.rtf = eta.RtfEstimator()
+        # id(job) -> (job, model, mode) of the jobs the slots are running
+        self._running = {}
+        # time.time() by which the queue should be done (None = no deadline)
+        self.deadline = None
+        # True while jobs are being run with the faster settings
+        self.fast_active = False
+
+    def start(self):
+        for slot in range(self.worker_count):
+            worker = threading.Thread(target=self.worker_loop, args=(slot,), daemon=True,
+                                      name=f"transcribe-slot-{slot}")
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, job):
+        self._submitted[id(job)] = time.perf_counter()
+        self.job_queue.put(job)
+        if self.prefetcher:
+            self.prefetcher.enqueue(job)
+
+    # --- QUEUE ORDER ---
+    def remove(self, job):
+        """ Takes a waiting job out of the queue (stop / delete). False if a slot already has it. """
+        if not self.job_queue.remove(job):
+            return False
+        self._submitted.pop(id(job), None)
+        if self.prefetcher:
+            self.prefetcher.discard(job)
+        return True
+
+    def move(self, job, index):
+        """ Puts a waiting job at position index of the queue (0 = next). """
+        moved = self.job_queue.move(job, index)
+        self._sync_prefetch()
+        return moved
+
+    def set_policy(self, policy):
+        self.job_queue.set_policy(policy)
+        self._sync_prefetch()
+
+    def update(self, job):
+        """ Call when a waiting job's duration became known (matters for sjf / ljf). """
+        self.job_queue.update(job)
+        if self.job_queue.policy != "fifo":
+            self._sync_prefetch()
+
+    def _sync_prefetch(self):
+        # Decode ahead in the order the slots will actually take the jobs
+        if self.prefetcher:
+            self.prefetcher.reorder(self.job_queue.snapshot())
+
+    # --- ETA ---
+    @staticmethod
+    def _audio_left(job):
+        return (getattr(job, "durationInSeconds", 0) or global_vars.prefetch_unknown_seconds) \
+            * (1.0 - getattr(job, "progress", 0.0))
+
+    def _predict(self, next_job=None):
+        with self._active_lock:
+            running = list(self._running.values())
+        busy = [(job, self._audio_left(job) * self.rtf.rtf(model, mode)) for job, model, mode in running]
+        waiting = ([next_job] if next_job is not None else []) + self.job_queue.snapshot()
+        work = [(job, self._audio_left(job) * self.rtf.rtf(getattr(job, "model", None))) for job in waiting]
+        return eta.predict(busy, work, self.worker_count)
+
+    def eta(self):
+        """
+        ({id(job): seconds until it is done}, seconds until the queue is empty,
+        whether that misses the deadline) for the running and waiting jobs.
+        """
+        finish, total = self._predict()
+        at_risk = self.deadline is not None and time.time() + total > self.deadline
+        return finish, total, at_risk
+
+    def _settings_for(self, job):
+        """ (model, mode) to run job with: the faster ones if the deadline is at risk. """
+        model, mode = getattr(job, "model", None), None
+        if self.deadline is None or not (global_vars.deadline_fast_model or global_vars.deadline_fast_mode):
+            self.fast_active = False
+            return model, mode
+        _, total = self._predict(next_job=job)
+        fast = time.time() + total > self.deadline
+        if fast != self.fast_active:
+            print("Deadline at risk: switching to faster settings" if fast else "Back on track for the deadline")
+            self.fast_active = fast
+        if fast:
+            model = global_vars.deadline_fast_model or model
+            mode = global_vars.deadline_fast_mode or mode
+        return model, mode
+
+    def warm_up(self):
+        """ Gets the model(s) loaded before the first job: in the worker processes, or in this one. """
+        if self.worker_pool:
+            self.worker_pool.warm_up()
+        else:
+            transcribe_module.warm_up()
+
+    def shutdown(self):
+        if self.prefetcher:
+            self.prefetcher.shutdown()
+        if self.worker_pool:
+            self.worker_pool.shutdown()
+
+    def _claim(self, job):
+        """
+        JobQueue.get() filter. The same file added twice maps to the same
+        recovery file: the second copy stays queued until the first one is
+        finished. Takes the file for the slot that gets the job.
+        """
+        if job.cancel_flag:
+            return True
+        with self._active_lock:
+            if job.recovery_file in self._active_files:
+                return False
+            self._active_files[job.recovery_file] = job
+            return True
+
+    def _unclaim(self, job):
+        with self._active_lock:
+            if self._active_files.get(job.recovery_file) is job:
+                del self._active_files[job.recovery_file]
+            self._running.pop(id(job), None)
+        # A copy of the same file may be waiting for it
+        self.job_queue.wake()
+
+    def worker_loop(self, slot):
+        while True:
+            try:
+                # 1. Get next job (every slot pulls from the same queue)
+                job = self.job_queue.get(self._claim)
+
+                if job.cancel_flag:
+                    # Normally taken out by remove() already (or cancelled
+                    # just after it was claimed)
+                    self._unclaim(job)
+                    if self.prefetcher:
+                        self.prefetcher.discard(job)
+                    self._submitted.pop(id(job), None)
+                    continue
+
+                metrics = JobMetrics(getattr(job, "job_id", None), os.path.basename(job.file_path), slot)
+                submitted = self._submitted.pop(id(job), None)
+                if submitted is not None:
+                    metrics.add("queue_wait", metrics.started - submitted, submitted)
+                # The row shows metrics.summary() once the job is finished
+                job.metrics = metrics
+                model, mode = self._settings_for(job)
+                with self._active_lock:
+                    self._running[id(job)] = (job, model, mode)
+                try:
+                    self.listener.on_job_started(job)
+                    self.run_job(job, slot, metrics, model, mode)
+                finally:
+                    job_metrics.record(metrics)
+                    self.rtf.record(model, mode, metrics)
+                    self._unclaim(job)
+            except Exception as e:
+                print(f"Queue Error (slot {slot}): {e}")
+                time.sleep(1)
+
+    def _cache_key(self, cache, job, model=None, mode=None):
+        try:
+            return cache.key_for(job.file_path, transcribe_module.cache_identity(model, mode))
+        except Exception as e:
+            print(f"Result cache unavailable for {job.file_path}: {e}")
+            return None
+
+    def _complete_from_cache(self, job, cached_path):
+        segment_store.copy(cached_path, job.recovery_file)
+        clear_checkpoint(job)
+        self.listener.on_job_progress(job, 1.0, None)
+        self.listener.on_job_done(job)
+
+    def _open_output(self, job):
+        """
+        Opens the job's segment store for writing. If a checkpoint exists the
+        store is cut back to the checkpointed segments and appended to.
+        Returns (writer, start_offset).
+        """
+        ckpt = load_checkpoint(job)
+        if not ckpt:
+            clear_checkpoint(job)
+            return SegmentWriter(job.recovery_file), 0.0
+
+        writer = SegmentWriter(job.recovery_file, keep_segments=ckpt["segments"])
+        if writer.count < ckpt["segments"]:
+            # Segments the checkpoint counts never reached the disk: its
+            # offset would skip them, so start over
+            writer.close()
+            clear_checkpoint(job)
+            return SegmentWriter(job.recovery_file), 0.0
+
+        # Put the row's progress back where it stopped
+        self.listener.on_job_progress(job, ckpt["percent"], None)
+        return writer, ckpt["offset"]
+
+    @staticmethod
+    def _save_last_mark(job, last_mark):
+        # The writer is closed by now: every segment up to the mark is written
+        if last_mark:
+            try:
+                save_checkpoint(job, *last_mark)
+            except Exception as e:
+                print(f"Failed to save checkpoint: {e}")
+
+    def run_job(self, job, slot, metrics=None, model=None, mode=None):
+        """ model / mode: None = the job's model, global_vars.transcription_mode. """
+        metrics = metrics or JobMetrics(getattr(job, "job_id", None), os.path.basename(job.file_path), slot)
+        model = model or getattr(job, "model", None)
+        cache = result_cache.get_cache()
+        with metrics.stage("cache_lookup"):
+            cache_key = self._cache_key(cache, job, model, mode) if cache else None
+            cached_path = cache.get(cache_key) if cache_key else None
+        if cached_path:
+            try:
+                self._complete_from_cache(job, cached_path)
+                if self.prefetcher:
+                    self.prefetcher.discard(job)
+                metrics.finish("cached")
+                return
+            except Exception as e:
+                print(f"Result cache read failed, transcribing instead: {e}")
+
+        with metrics.stage("prefetch"):
+            prefetched = self.prefetcher.take(job) if self.prefetcher else None
+        # Last (end_seconds, percent, segments) reported; recorded on stop /
+        # error even if its commit interval wasn't up yet
+        last_mark = []
+        try:
+            # Each job owns its recovery file and its handle, so slots never
+            # write into each other's output.
+            writer, start_offset = self._open_output(job)
+            with writer:
+
+                def on_segment(segment):
+                    writer.append(segment)
+
+                def on_progress(percent, chunk_text):
+                    if job.cancel_flag:
+                        raise UserCancelled()  # Abort immediately!
+
+                    self.listener.on_job_progress(job, percent, chunk_text)
+
+                def on_checkpoint(end_seconds, percent):
+                    # Group commit: segments are made durable and the
+                    # checkpoint recorded once per journal_commit_seconds,
+                    # not on every progress update
+                    last_mark[:] = [end_seconds, percent, writer.count]
+                    if writer.commit_due():
+                        writer.flush(sync=True)
+                        save_checkpoint(job, end_seconds, percent, writer.count)
+
+                def check_cancel():
+                    if job.cancel_flag:
+                        raise UserCancelled()  # Abort immediately!
+                    return False
+
+                if self.worker_pool:
+                    # Same callbacks, driven by the slot's child process
+                    request = {
+                        "file_path": job.file_path,
+                        "start_offset": start_offset,
+                        "model": model,
+                        "mode": mode,
+                        "shm_name": prefetched.name if prefetched else None,
+                        "samples": prefetched.samples if prefetched else 0,
+                    }
+                    self.worker_pool.get(slot).run(request, on_segment, on_progress, on_checkpoint,
+                                                   check_cancel, metrics)
+                else:
+                    transcribe_module.run_transcription(
+                        job.file_path,
+                        progress_callback=on_progress,
+                        check_cancel=check_cancel,
+                        slot=slot,
+                        mode=mode,
+                        start_offset=start_offset,
+                        checkpoint_callback=on_checkpoint,
+                        segment_callback=on_segment,
+                        audio=prefetched.array if prefetched else None,
+                        metrics=metrics,
+                        model_name=model
+                    )
+            clear_checkpoint(job)
+
+            if cache_key:
+                try:
+                    with metrics.stage("cache_store"):
+                        cache.put(cache_key, job.recovery_file, os.path.basename(job.file_path))
+                except Exception as e:
+                    print(f"Result cache write failed: {e}")
+
+            metrics.finish("done")
+            self.listener.on_job_done(job)
+
+        # On stop / error the recovery file and its checkpoint are kept, so
+        # the next start continues from the last completed segment.
+        except UserCancelled:
+            self._save_last_mark(job, last_mark)
+            metrics.finish("stopped")
+            self.listener.on_job_stopped(job)
+
+        except Exception as e:
+            self._save_last_mark(job, last_mark)
+            metrics.finish("error")
+            self.listener.on_job_error(job, str(e))
+
+        finally:
+            if prefetched:
+                prefetched.release()
@@ -0,0 +1,279 @@
+"""
+Append-only on-disk store of transcript segments.
+
+Two files per transcript:
+    <path>      data:  one record per segment (header + UTF-8 text)
+    <path>.idx  index: one fixed-size (start time, data offset) entry per segment
+
+Workers append segments as they are decoded; readers (Copy, Save, View,
+exports) stream them back without loading the whole transcript. The index
+gives O(1) access to segment i and binary search by timestamp.
+"""
+import json
+import os
+import shutil
+import struct
+import time
+import global_vars
+import rtl_document
+
+# start, end, avg_logprob, no_speech_prob, text length in bytes
+RECORD = struct.Struct("<ddffI")
+# start, offset of the record in the data file
+INDEX = struct.Struct("<dQ")
+
+EXPORT_FORMATS = ("txt", "srt", "vtt", "json", "rtf", "docx")
+# Written as bytes (write_binary), the rest as text (write)
+BINARY_FORMATS = ("docx",)
+
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+def exists(path):
+    return os.path.exists(path) and os.path.exists(index_path(path))
+
+
+def delete(path):
+    for p in (path, index_path(path)):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+class SegmentWriter:
+    """
+    Appends segments. Opening with keep_segments=N cuts the store back to its
+    first N segments (resume from a checkpoint); None starts a new store.
+
+    Appended segments are buffered here and written out together (group
+    commit): when global_vars.journal_commit_bytes have piled up, on
+    flush(), and on close. commit_due() says when the caller's commit
+    interval (global_vars.journal_commit_seconds) is up.
+    """
+    def __init__(self, path, keep_segments=None):
+        self.path = path
+        self._pending_data = bytearray()
+        self._pending_index = bytearray()
+        self._last_commit = time.monotonic()
+        if keep_segments is None or not exists(path):
+            self._data = open(path, "wb")
+            self._index = open(index_path(path), "wb")
+            self._data_size = 0
+            self.count = 0
+        else:
+            # Cut right after the last kept record: whatever follows it (a
+            # record whose index entry never made it, half a record) goes
+            keep_segments = min(keep_segments, os.path.getsize(index_path(path)) // INDEX.size)
+            data_size = 0
+            with open(index_path(path), "rb") as index, open(path, "rb") as data:
+                file_size = os.fstat(data.fileno()).st_size
+                while keep_segments > 0:
+                    index.seek((keep_segments - 1) * INDEX.size)
+                    offset = INDEX.unpack(index.read(INDEX.size))[1]
+                    data.seek(offset)
+                    header = data.read(RECORD.size)
+                    if len(header) == RECORD.size:
+                        data_size = offset + RECORD.size + RECORD.unpack(header)[4]
+                        if data_size <= file_size:
+                            break
+                    # Its record didn't reach the disk (crash before fsync)
+                    keep_segments -= 1
+                    data_size = 0
+            os.truncate(index_path(path), keep_segments * INDEX.size)
+            os.truncate(path, data_size)
+            self._data = open(path, "ab")
+            self._index = open(index_path(path), "ab")
+            self._data_size = data_size
+            self.count = keep_segments
+
+    def append(self, segment):
+        """ segment: anything with start, end, text, avg_logprob, no_speech_prob. """
+        text = segment.text.encode("utf-8")
+        offset = self._data_size + len(self._pending_data)
+        self._pending_data += RECORD.pack(segment.start, segment.end, segment.avg_logprob or 0.0,
+                                          segment.no_speech_prob or 0.0, len(text))
+        self._pending_data += text
+        self._pending_index += INDEX.pack(segment.start, offset)
+        self.count += 1
+        if len(self._pending_data) >= global_vars.journal_commit_bytes:
+            self._write_out()
+
+    def _write_out(self):
+        # Data before index: an index entry never points past the data
+        if self._pending_data:
+            self._data.write(self._pending_data)
+            self._data.flush()
+            self._data_size += len(self._pending_data)
+            self._pending_data = bytearray()
+        if self._pending_index:
+            self._index.write(self._pending_index)
+            self._index.flush()
+            self._pending_index = bytearray()
+
+    def commit_due(self):
+        return time.monotonic() - self._last_commit >= global_vars.journal_commit_seconds
+
+    def flush(self, sync=False):
+        """ Makes everything appended so far visible to readers; with sync, durable on disk. """
+        self._write_out()
+        if sync:
+            os.fsync(self._data.fileno())
+            os.fsync(self._index.fileno())
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StoredSegment:
+    __slots__ = ("start", "end", "avg_logprob", "no_speech_prob", "text")
+
+    def __init__(self, start, end, avg_logprob, no_speech_prob, text):
+        self.start = start
+        self.end = end
+        self.avg_logprob = avg_logprob
+        self.no_speech_prob = no_speech_prob
+        self.text = text
+
+
+class SegmentStore:
+    """ Read side. Cheap to create; files are opened per call. """
+    def __init__(self, path):
+        self.path = path
+
+    def __len__(self):
+        if not exists(self.path):
+            return 0
+        return os.path.getsize(index_path(self.path)) // INDEX.size
+
+    def _read_record(self, f):
+        header = f.read(RECORD.size)
+        if len(header) < RECORD.size:
+            return None
+        start, end, avg_logprob, no_speech_prob, length = RECORD.unpack(header)
+        text = f.read(length).decode("utf-8")
+        return StoredSegment(start, end, avg_logprob, no_speech_prob, text)
+
+    def _index_entry(self, f, i):
+        f.seek(i * INDEX.size)
+        return INDEX.unpack(f.read(INDEX.size))
+
+    def find(self, seconds):
+        """ Index of the first segment starting at or after seconds (binary search). """
+        lo, hi = 0, len(self)
+        if hi == 0:
+            return 0
+        with open(index_path(self.path), "rb") as f:
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._index_entry(f, mid)[0] < seconds:
+                    lo = mid + 1
+                else:
+                    hi = mid
+        return lo
+
+    def segment(self, i):
+        with open(index_path(self.path), "rb") as idx, open(self.path, "rb") as data:
+            data.seek(self._index_entry(idx, i)[1])
+            return self._read_record(data)
+
+    def iter_segments(self, start_index=0, from_seconds=None):
+        """ Streams segments in order (records are sequential in the data file). """
+        count = len(self)
+        if from_seconds is not None:
+            start_index = self.find(from_seconds)
+        if start_index >= count:
+            return
+        with open(index_path(self.path), "rb") as idx:
+            offset = self._index_entry(idx, start_index)[1]
+        with open(self.path, "rb") as data:
+            data.seek(offset)
+            for _ in range(start_index, count):
+                segment = self._read_record(data)
+                if segment is None:
+                    return
+                yield segment
+
+    def iter_text(self):
+        """ Plain text in chunks, the same format the recovery .txt used to have. """
+        for segment in self.iter_segments():
+            yield segment.text + " "
+
+    def read_text(self):
+        return "".join(self.iter_text())
+
+    # --- STREAMING EXPORTS ---
+    def export(self, out_path, fmt=None):
+        """ Writes the transcript in any EXPORT_FORMATS without loading it all. """
+        fmt = (fmt or os.path.splitext(out_path)[1].lstrip(".") or "txt").lower()
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        if fmt in BINARY_FORMATS:
+            self.write_binary(out_path, fmt)
+            return
+        with open(out_path, "w", encoding="utf-8", newline="\n") as f:
+            self.write(f, fmt)
+
+    def write(self, f, fmt):
+        """ Streams the transcript in the given format into an open text file. """
+        getattr(self, f"_write_{fmt}")(f)
+
+    def _write_txt(self, f):
+        for chunk in self.iter_text():
+            f.write(chunk)
+
+    def _write_srt(self, f):
+        for n, segment in enumerate(self.iter_segments(), 1):
+            f.write(f"{n}\n{format_timestamp(segment.start, ',')} --> {format_timestamp(segment.end, ',')}\n"
+                    f"{segment.text}\n\n")
+
+    def _write_vtt(self, f):
+        f.write("WEBVTT\n\n")
+        for segment in self.iter_segments():
+            f.write(f"{format_timestamp(segment.start, '.')} --> {format_timestamp(segment.end, '.')}\n"
+                    f"{segment.text}\n\n")
+
+    def _write_json(self, f):
+        f.write("[")
+        for n, segment in enumerate(self.iter_segments()):
+            if n:
+                f.write(",")
+            f.write("\n  ")
+            json.dump({"start": round(segment.start, 3), "end": round(segment.end, 3), "text": segment.text,
+                       "avg_logprob": segment.avg_logprob, "no_speech_prob": segment.no_speech_prob},
+                      f, ensure_ascii=False)
+        f.write("\n]\n")
+
+    def _write_rtf(self, f):
+        rtl_document.write_rtf(self.iter_text(), f)
+
+    def write_binary(self, f, fmt):
+        """ Same as write() for BINARY_FORMATS; f is a binary file or a path. """
+        if fmt == "docx":
+            rtl_document.write_docx(self.iter_text(), f)
+        else:
+            raise ValueError(f"Not a binary export format: {fmt}")
+
+
+def format_timestamp(seconds, decimal_marker):
+    millis = int(round(max(0.0, seconds) * 1000))
+    h, millis = divmod(millis, 3600000)
+    m, millis = divmod(millis, 60000)
+    s, millis = divmod(millis, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{decimal_marker}{millis:03d}"
+
+
+def copy(src_path, dst_path):
+    """ Copies a whole store (data + index). """
+    shutil.copyfile(src_path, dst_path)
+    shutil.copyfile(index_path(src_path), index_path(dst_path))
@@ -0,0 +1,569 @@
+"""
+Local transcription service: one resident model and one scheduler shared
+by every tool on this machine, over HTTP on localhost.
+
+    python server.py [--port 8765]
+
+    POST   /jobs                      {"path": "C:/calls/a.mp3", "model": "large"}  - a local file
+    POST   /jobs?filename=a.mp3&model=large
+                                      raw file bytes as the body  - an upload
+           ("model" is optional: one of global_vars.models)
+           -> 202 {"id": 3, ...}   429 + Retry-After when the queue is full
+    GET    /jobs                      all jobs
+    GET    /jobs/<id>                 state, progress, segment count, error
+    GET    /jobs/<id>/segments?from=N segments N.. decoded so far (JSON)
+    GET    /jobs/<id>/segments?from=N&stream=1
+                                      same, then keeps streaming new segments
+                                      (one JSON object per line) until the job ends
+    GET    /jobs/<id>/result?format=txt|srt|vtt|json|rtf|docx
+    DELETE /jobs/<id>                 stop it / forget it (deletes its files)
+    GET    /health                    queue length, limits and when the queue will be done
+
+Only this machine's own clients get in: the Host header must name the
+address the service is bound to (so a web page can't reach it by DNS
+rebinding), a browser's Origin must be that same address, JSON bodies need
+Content-Type: application/json and uploads application/octet-stream (or
+audio/*, video/*) - types a cross-site form can't send. With
+global_vars.server_require_token every request but /health must also carry
+the per-install token from <app data>/server/token:
+
+    X-Transcriptor-Token: <token>
+
+Admission control: at most global_vars.server_max_queue jobs waiting or
+running; beyond that submissions are refused with 429 so clients back off
+instead of piling work onto the queue. Submitting a path that is already
+queued, running or done returns the existing job.
+"""
+import argparse
+import collections
+import io
+import json
+import hmac
+import os
+import secrets
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote
+import global_vars
+import job_journal
+import segment_store
+from segment_store import SegmentStore
+from job_model import JobList
+from scheduler import TranscriptionScheduler
+from util import Util
+
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+# Bound to every interface: the Host can be any of the machine's names
+ANY_HOSTS = ("", "0.0.0.0", "::")
+UPLOAD_TYPES = ("application/octet-stream", "audio/", "video/")
+TOKEN_HEADER = "X-Transcriptor-Token"
+# How often a streaming client checks for new segments while nothing happens
+STREAM_POLL_SECONDS = 1.0
+
+CONTENT_TYPES = {"txt": "text/plain; charset=utf-8", "srt": "application/x-subrip; charset=utf-8",
+                 "vtt": "text/vtt; charset=utf-8", "json": "application/json; charset=utf-8",
+                 "rtf": "application/rtf",
+                 "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document"}
+
+
+class QueueFull(Exception):
+    pass
+
+
+class TranscriptionService:
+    """
+    Jobs + scheduler, thread-safe. It is the scheduler's listener: state
+    changes are applied here and wake up clients waiting for segments.
+    """
+    def __init__(self, max_queue=None, keep_jobs=None):
+        self.max_queue = max_queue or global_vars.server_max_queue
+        self.keep_jobs = keep_jobs or global_vars.server_keep_jobs
+        self.upload_folder = Util.app_data_dir("server", "uploads")
+        self.jobs = JobList()
+        self.by_id = {}
+        self.errors = {}       # job_id -> error message
+        self.uploads = set()   # job_ids whose file is an upload we own
+        self.active = set()    # jobs waiting or processing
+        self.finished = collections.deque()  # done / error / idle, oldest first
+        self.reserved = 0      # queue places held by uploads still arriving
+        self._lock = threading.Lock()
+        # Notified on every progress / state change (streaming clients wait on it)
+        self.changed = threading.Condition(self._lock)
+        self.scheduler = TranscriptionScheduler(self)
+        self.scheduler.start()
+
+    # --- SUBMIT ---
+    def _queue_length(self):
+        return len(self.active) + self.reserved
+
+    def reserve(self):
+        """ Takes a queue place (call before a long upload); QueueFull if there is none. """
+        with self._lock:
+            if self._queue_length() >= self.max_queue:
+                raise QueueFull()
+            self.reserved += 1
+
+    def unreserve(self):
+        with self._lock:
+            self.reserved -= 1
+
+    def submit(self, file_path, upload=False, reserved=False, model=None):
+        """ Queues file_path. Returns (job, created). """
+        model = model or global_vars.default_model
+        with self._lock:
+            if not upload:
+                for job in self.jobs:
+                    if job.file_path == file_path and job.model == model \
+                            and job.state in ("waiting", "processing", "done"):
+                        return job, False
+            if reserved:
+                self.reserved -= 1
+            elif self._queue_length() >= self.max_queue:
+                raise QueueFull()
+
+            job = self.jobs.add(file_path, model)
+            self.active.add(job)
+            self.by_id[job.job_id] = job
+            if upload:
+                self.uploads.add(job.job_id)
+            self.jobs.set_state(job, "waiting", "Waiting...")
+            self._trim()
+        self.scheduler.submit(job)
+        return job, True
+
+    def _trim(self):
+        # Forget the oldest finished jobs beyond keep_jobs
+        while len(self.finished) > self.keep_jobs:
+            self._forget(self.finished[0])
+
+    def _finish(self, job):
+        if job in self.active:
+            self.active.discard(job)
+            self.finished.append(job)
+
+    def _forget(self, job):
+        job_id = job.job_id
+        if self.finished and self.finished[0] is job:
+            self.finished.popleft()
+        elif job in self.finished:
+            # Deleted by a client: rare, so the scan is fine
+            self.finished.remove(job)
+        self.jobs.remove(job)
+        self.by_id.pop(job_id, None)
+        self.errors.pop(job_id, None)
+        segment_store.delete(job.recovery_file)
+        if job_id in self.uploads:
+            self.uploads.discard(job_id)
+            if os.path.exists(job.file_path):
+                os.remove(job.file_path)
+
+    # --- QUERY / CONTROL ---
+    def get(self, job_id):
+        with self._lock:
+            return self.by_id.get(job_id)
+
+    def status(self, job, finish=None):
+        """ finish: scheduler.eta()[0], when it is already at hand. """
+        if finish is None and job.state in ("waiting", "processing"):
+            finish = self.scheduler.eta()[0]
+        with self._lock:
+            info = {
+                "id": job.job_id,
+                "file": job.filename,
+                "model": job.model,
+                "state": job.state,
+                "progress": round(job.progress, 4),
+                "segments": len(SegmentStore(job.recovery_file)),
+                "error": self.errors.get(job.job_id),
+            }
+            if job.metrics is not None and job.state == "done":
+                info["rtf"] = job.metrics.rtf
+                info["audio_seconds"] = job.metrics.audio_seconds
+            if finish and id(job) in finish:
+                # Predicted from this machine's measured speed (see eta)
+                info["eta_seconds"] = round(finish[id(job)], 1)
+            return info
+
+    def list_status(self):
+        with self._lock:
+            jobs = list(self.jobs)
+        finish = self.scheduler.eta()[0]
+        return [self.status(job, finish) for job in jobs]
+
+    def cancel(self, job):
+        """ Stops a queued / running job, or forgets a finished one. Returns the new state. """
+        with self._lock:
+            if job.state in ("waiting", "processing"):
+                job.cancel_flag = True
+                if job.state == "waiting":
+                    # Out of the queue at once (or skipped, if a slot just
+                    # took it); nothing else will report back
+                    self.scheduler.remove(job)
+                    self.jobs.set_state(job, "idle", "Cancelled")
+                    self._finish(job)
+                else:
+                    self.jobs.set_state(job, "stopping", "Stopping...")
+                self.changed.notify_all()
+                return job.state
+            if job.state != "stopping":
+                self._forget(job)
+                self.changed.notify_all()
+                return "deleted"
+            return job.state
+
+    def health(self):
+        _, total, _ = self.scheduler.eta()
+        with self._lock:
+            return {"active": self._queue_length(), "max_queue": self.max_queue, "jobs": len(self.jobs),
+                    "workers": self.scheduler.worker_count, "models": list(global_vars.models),
+                    "eta_seconds": round(total, 1)}
+
+    def shutdown(self):
+        with self._lock:
+            for job in self.jobs:
+                job.cancel_flag = True
+        self.scheduler.shutdown()
+        # Checkpoints of the cancelled jobs (see job_journal)
+        job_journal.get_journal().commit()
+
+    # --- SCHEDULER LISTENER (worker threads) ---
+    def _update(self, job, state=None, status_text=None, finished=False):
+        with self._lock:
+            if finished:
+                self._finish(job)
+            if job in self.jobs and state is not None:
+                self.jobs.set_state(job, state, status_text)
+            self.changed.notify_all()
+
+    def on_job_started(self, job):
+        with self._lock:
+            if job in self.jobs and not job.cancel_flag:
+                self.jobs.set_state(job, "processing", "Processing...")
+            self.changed.notify_all()
+
+    def on_job_progress(self, job, percent, chunk_text):
+        job.progress = percent
+        self._update(job)
+
+    def on_job_done(self, job):
+        job.progress = 1.0
+        self._update(job, "done", "Completed", finished=True)
+
+    def on_job_stopped(self, job):
+        self._update(job, "idle", "Stopped", finished=True)
+
+    def on_job_error(self, job, err_msg):
+        with self._lock:
+            self.errors[job.job_id] = err_msg
+        self._update(job, "error", f"Error: {err_msg}", finished=True)
+
+
+def load_token():
+    """ The per-install token, created on first use. """
+    path = os.path.join(Util.app_data_dir("server"), "token")
+    if not os.path.exists(path):
+        # Readable by this user only
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_urlsafe(32))
+    with open(path) as f:
+        return f.read().strip()
+
+
+def _host_name(host):
+    return f"[{host}]" if ":" in host else host
+
+
+def _segment_json(index, segment):
+    return {"index": index, "start": round(segment.start, 3), "end": round(segment.end, 3), "text": segment.text}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.0: streamed responses simply end when the connection closes
+    protocol_version = "HTTP/1.0"
+    server_version = "Transcriptor"
+    service = None  # set by serve()
+    token = None    # set by serve() when global_vars.server_require_token
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} {format % args}")
+
+    # --- HELPERS ---
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message, headers=None):
+        self._send_json(status, {"error": message}, headers)
+
+    def _route(self):
+        """ Returns (parts of the path, query dict). """
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        return parts, query
+
+    def _allowed_hosts(self):
+        host, port = self.server.server_address[:2]
+        if host in ANY_HOSTS:
+            return None
+        names = LOCAL_HOSTS if host in LOCAL_HOSTS else (host,)
+        return {f"{_host_name(name)}:{port}" for name in names}
+
+    def _check_request(self, parts, content_types=None):
+        """
+        Refuses requests that don't come from a local client (see the module
+        docstring); sends the error and returns False.
+        content_types: accepted Content-Type prefixes, for requests with a body.
+        """
+        host = (self.headers.get("Host") or "").lower()
+        allowed = self._allowed_hosts()
+        if not host or (allowed is not None and host not in allowed):
+            self._error(HTTPStatus.FORBIDDEN, "Host not allowed")
+            return False
+        origin = self.headers.get("Origin")
+        if origin is not None and origin.lower() != f"http://{host}":
+            self._error(HTTPStatus.FORBIDDEN, "Cross-origin requests are not allowed")
+            return False
+        if self.token and parts != ["health"]:
+            if not hmac.compare_digest(self.headers.get(TOKEN_HEADER) or "", self.token):
+                self._error(HTTPStatus.UNAUTHORIZED, f"Missing or wrong {TOKEN_HEADER}")
+                return False
+        if content_types is not None:
+            content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+            if not content_type.startswith(content_types):
+                self._error(HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                            f"Content-Type must be {' or '.join(t + '*' if t.endswith('/') else t for t in content_types)}")
+                return False
+        return True
+
+    def _job(self, parts):
+        try:
+            job = self.service.get(int(parts[1]))
+        except ValueError:
+            job = None
+        if job is None:
+            self._error(HTTPStatus.NOT_FOUND, "No such job")
+        return job
+
+    def _queue_full(self):
+        self._error(HTTPStatus.TOO_MANY_REQUESTS, "Queue is full, try again later",
+                    {"Retry-After": str(global_vars.server_retry_after)})
+
+    # --- METHODS ---
+    def do_GET(self):
+        parts, query = self._route()
+        if not self._check_request(parts):
+            return
+        if parts == ["health"]:
+            return self._send_json(HTTPStatus.OK, self.service.health())
+        if parts == ["jobs"]:
+            return self._send_json(HTTPStatus.OK, self.service.list_status())
+        if len(parts) >= 2 and parts[0] == "jobs":
+            job = self._job(parts)
+            if job is None:
+                return
+            if len(parts) == 2:
+                return self._send_json(HTTPStatus.OK, self.service.status(job))
+            if parts[2] == "segments":
+                return self._segments(job, query)
+            if parts[2] == "result":
+                return self._result(job, query)
+        self._error(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+
+    def do_POST(self):
+        parts, query = self._route()
+        if parts != ["jobs"]:
+            return self._error(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+        if not self._check_request(parts, UPLOAD_TYPES if "filename" in query else ("application/json",)):
+            return
+        try:
+            model = query.get("model")
+            if model is not None and model not in global_vars.models:
+                raise ValueError(f"Unknown model: {model} (available: {', '.join(global_vars.models)})")
+            if "filename" in query:
+                job, created = self._submit_upload(query["filename"], model)
+            else:
+                job, created = self._submit_path()
+        except QueueFull:
+            return self._queue_full()
+        except ValueError as e:
+            return self._error(HTTPStatus.BAD_REQUEST, str(e))
+        if job is None:
+            return  # Error already sent
+        info = self.service.status(job)
+        info["status_url"] = f"/jobs/{job.job_id}"
+        self._send_json(HTTPStatus.ACCEPTED if created else HTTPStatus.OK, info)
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if not self._check_request(parts):
+            return
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self._error(HTTPStatus.NOT_FOUND, "Unknown endpoint")
+        job = self._job(parts)
+        if job is not None:
+            self._send_json(HTTPStatus.OK, {"id": job.job_id, "state": self.service.cancel(job)})
+
+    # --- SUBMISSION ---
+    def _submit_path(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            raise ValueError("Body must be JSON: {\"path\": ...}")
+        path = body.get("path")
+        if not path or not os.path.isfile(path):
+            raise ValueError(f"No such file: {path}")
+        model = body.get("model")
+        if model is not None and model not in global_vars.models:
+            raise ValueError(f"Unknown model: {model} (available: {', '.join(global_vars.models)})")
+        return self.service.submit(os.path.abspath(path), model=model)
+
+    def _submit_upload(self, filename, model=None):
+        if self.headers.get("Content-Length") is None:
+            self._error(HTTPStatus.LENGTH_REQUIRED, "Content-Length required")
+            return None, False
+        length = int(self.headers["Content-Length"])
+        if length > global_vars.server_max_upload_mb * 1024 * 1024:
+            self._error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Upload too large")
+            return None, False
+
+        # Refuse before reading the body: a full queue shouldn't cost an upload
+        self.service.reserve()
+        try:
+            name = os.path.basename(filename) or "upload"
+            path = os.path.join(self.service.upload_folder, f"{time.time_ns()}_{name}")
+            remaining = length
+            with open(path, "wb") as f:
+                while remaining > 0:
+                    block = self.rfile.read(min(UPLOAD_BLOCK_SIZE, remaining))
+                    if not block:
+                        raise ValueError("Upload ended early")
+                    f.write(block)
+                    remaining -= len(block)
+        except BaseException:
+            self.service.unreserve()
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return self.service.submit(path, upload=True, reserved=True, model=model)
+
+    # --- RESULTS ---
+    def _segments(self, job, query):
+        try:
+            start = int(query.get("from", 0))
+            if start < 0:
+                raise ValueError()
+        except ValueError:
+            return self._error(HTTPStatus.BAD_REQUEST, "from must be a segment number (0 or more)")
+        if query.get("stream") not in ("1", "true"):
+            store = SegmentStore(job.recovery_file)
+            segments = [_segment_json(i, s) for i, s in enumerate(store.iter_segments(start), start)]
+            return self._send_json(HTTPStatus.OK, {"state": job.state, "segments": segments})
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.end_headers()
+        index = start
+        try:
+            while True:
+                # State first: segments written before a job ended are all flushed by then
+                state = job.state
+                store = SegmentStore(job.recovery_file)
+                for segment in store.iter_segments(index):
+                    self.wfile.write((json.dumps(_segment_json(index, segment), ensure_ascii=False) + "\n").encode("utf-8"))
+                    index += 1
+                self.wfile.flush()
+                if state not in ("waiting", "processing", "stopping"):
+                    self.wfile.write((json.dumps({"state": state}) + "\n").encode("utf-8"))
+                    return
+                with self.service.changed:
+                    self.service.changed.wait(STREAM_POLL_SECONDS)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away
+
+    def _result(self, job, query):
+        fmt = query.get("format", "txt").lower()
+        if fmt not in segment_store.EXPORT_FORMATS:
+            return self._error(HTTPStatus.BAD_REQUEST, f"format must be one of {', '.join(segment_store.EXPORT_FORMATS)}")
+        if job.state != "done":
+            return self._error(HTTPStatus.CONFLICT, f"Job is {job.state}, not done")
+
+        name = os.path.splitext(job.filename)[0]
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", CONTENT_TYPES[fmt])
+        self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(name, safe='')}.{fmt}")
+        self.end_headers()
+        # Streamed straight from the segment store
+        store = SegmentStore(job.recovery_file)
+        if fmt in segment_store.BINARY_FORMATS:
+            store.write_binary(self.wfile, fmt)
+        else:
+            f = io.TextIOWrapper(self.wfile, encoding="utf-8", newline="\n", write_through=True)
+            store.write(f, fmt)
+            f.flush()
+            f.detach()
+
+
+def _clear_folder(folder):
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        try:
+            if os.path.isdir(path):
+                Util.force_delete_folder(path)
+            else:
+                os.remove(path)
+        except OSError as e:
+            print(f"Could not delete {path}: {e}")
+
+
+def serve(host=None, port=None):
+    global_vars.rec_folder = Util.app_data_dir("server", "jobs")
+    # Jobs live only as long as the process (ids start again at 0), so
+    # the uploads and transcripts of the last run can't be asked for again
+    for folder in (global_vars.rec_folder, Util.app_data_dir("server", "uploads")):
+        _clear_folder(folder)
+    service = TranscriptionService()
+    RequestHandler.service = service
+    if global_vars.server_require_token:
+        RequestHandler.token = load_token()
+    server = ThreadingHTTPServer((host or global_vars.server_host, port or global_vars.server_port), RequestHandler)
+    server.daemon_threads = True
+
+    # Model up front, so the first request doesn't wait for it
+    threading.Thread(target=service.scheduler.warm_up, daemon=True).start()
+    print(f"Transcription service on http://{_host_name(server.server_address[0])}:{server.server_address[1]}")
+    if RequestHandler.token:
+        print(f"Clients send the token in {os.path.join(Util.app_data_dir('server'), 'token')} as {TOKEN_HEADER}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down...")
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve transcriptions over HTTP (localhost).")
+    parser.add_argument("--host", default=None, help=f"Default {global_vars.server_host}")
+    parser.add_argument("--port", type=int, default=None, help=f"Default {global_vars.server_port}")
+    parser.add_argument("--max-queue", type=int, default=None, help="Jobs waiting or running before 429")
+    args = parser.parse_args()
+    if args.max_queue:
+        global_vars.server_max_queue = args.max_queue
+    if (args.host or global_vars.server_host) not in LOCAL_HOSTS and not global_vars.server_require_token:
+        print("Warning: server_require_token is off; anyone who can reach this address can use the service.",
+              file=sys.stderr)
+    serve(args.host, args.port)
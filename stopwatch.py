@@ -9,40 +9,25 @@ class StopWatchLabel(ctk.CTkLabel):
         # Initialize the Label (pass all styling options to the parent)
         super().__init__(master, **kwargs)
         
-        # Internal state variables
         self.seconds = 0
-        self.running = False
+        # Job whose time is shown (rows in the queue view are recycled)
+        self.job = None
 
+    # Nothing here schedules itself: the app's shared clock calls tick() on
+    # every visible stopwatch once a second. The time always comes from the
+    # job (Job.elapsed_seconds), so there is nothing to start or stop.
+    def track(self, job):
+        """Shows job's processing time, ticking while it is processing."""
+        self.job = job
+        self.seconds = job.elapsed_seconds()
+        self.show()
 
-    def start(self):
-        if not self.running:
-            self.running = True
-            self.update_timer()
+    def show(self):
+        minutes, secs = divmod(self.seconds, 60)
+        self.configure(text=f"{minutes:02d}:{secs:02d}")
 
-    def stop(self):
-        self.running = False
-        
-    def stopAndReset(self):
-        self.stop()
-        self.reset()
-
-
-    def reset(self):
-        self.seconds = 0
-        self.configure(text="00:00")
-
-    def update_timer(self):
-        # 1. Check if we should keep running
-        # 2. Check if the label still exists (prevents crash if window closes)
-        if self.running and self.winfo_exists():
-            self.seconds += 1
-            
-            # Math: Convert total seconds to M:S
-            minutes, secs = divmod(self.seconds, 60)
-            
-            
-            # Update the text of THIS label
-            self.configure(text=f"{minutes:02d}:{secs:02d}")
-            
-            # Schedule the next update in 1000ms (1 second)
-            self.after(1000, self.update_timer)
\ No newline at end of file
+    def tick(self):
+        # Check the label still exists (prevents crash if window closes)
+        if self.job is not None and self.job.started_at is not None and self.winfo_exists():
+            self.seconds = self.job.elapsed_seconds()
+            self.show()
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repo, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import global_vars
+
+
+@pytest.fixture(autouse=True)
+def app_data(tmp_path, monkeypatch):
+    """ App data and the queue folder in a fresh temp dir for every test. """
+    home = tmp_path / "home"
+    monkeypatch.setenv("TRANSCRIPTOR_HOME", str(home))
+    monkeypatch.setattr(global_vars, "rec_folder", str(tmp_path / "jobs"))
+    os.makedirs(global_vars.rec_folder)
+    return home
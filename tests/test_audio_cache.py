@@ -0,0 +1,103 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from audio_cache import BYTES_PER_SAMPLE, AudioCache
+
+SAMPLES = 1000
+ENTRY_BYTES = SAMPLES * BYTES_PER_SAMPLE
+
+
+@pytest.fixture
+def cache(tmp_path):
+    folder = tmp_path / "cache"
+    folder.mkdir()
+    # Room for two entries
+    return AudioCache(str(folder), max_bytes=2 * ENTRY_BYTES)
+
+
+def recording(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(name.encode("utf-8"))
+    return str(path)
+
+
+def store(cache, path, value=0.5):
+    audio = cache.store(path, np.full(SAMPLES, value, dtype=np.float32))
+    # Distinct access times for the LRU order
+    time.sleep(0.01)
+    return audio
+
+
+def cached(cache, path):
+    return cache.load(path) is not None
+
+
+def test_store_and_load(tmp_path, cache):
+    path = recording(tmp_path, "a.mp3")
+    assert cache.load(path) is None
+    store(cache, path, 0.25)
+    audio = cache.load(path)
+    assert isinstance(audio, np.memmap)
+    assert audio.shape == (SAMPLES,) and float(audio[0]) == 0.25
+    assert cache.stats()["bytes"] == ENTRY_BYTES
+
+
+def test_least_recently_used_goes_first(tmp_path, cache):
+    a, b, c = (recording(tmp_path, name) for name in ("a.mp3", "b.mp3", "c.mp3"))
+    store(cache, a)
+    store(cache, b)
+    # Reading a makes b the oldest
+    assert cached(cache, a)
+    time.sleep(0.01)
+    store(cache, c)
+    assert [cached(cache, path) for path in (a, b, c)] == [True, False, True]
+    assert cache.stats()["bytes"] == 2 * ENTRY_BYTES
+    assert not os.path.exists(cache._pcm_path(cache.key_for(b)))
+
+
+def test_entry_over_budget_is_kept_alone(tmp_path):
+    folder = tmp_path / "small"
+    folder.mkdir()
+    cache = AudioCache(str(folder), max_bytes=ENTRY_BYTES // 2)
+    a, b = recording(tmp_path, "a.mp3"), recording(tmp_path, "b.mp3")
+    store(cache, a)
+    store(cache, b)
+    # The one just written is never evicted by its own commit
+    assert [cached(cache, path) for path in (a, b)] == [False, True]
+
+
+def test_changed_file_misses(tmp_path, cache):
+    path = recording(tmp_path, "a.mp3")
+    store(cache, path)
+    with open(path, "ab") as f:
+        f.write(b"more")
+    assert cache.load(path) is None
+
+
+def test_aborted_writer_leaves_nothing(tmp_path, cache):
+    path = recording(tmp_path, "a.mp3")
+    writer = cache.writer(path)
+    writer.write(np.zeros(10, dtype=np.float32))
+    writer.abort()
+    assert cache.load(path) is None
+    assert [name for name in os.listdir(cache.folder) if name.endswith(".part")] == []
+
+
+def test_speech_map_per_parameters(tmp_path, cache):
+    path = recording(tmp_path, "a.mp3")
+    writer = cache.writer(path)
+    writer.write(np.zeros(SAMPLES, dtype=np.float32))
+    writer.commit({"min_silence_duration_ms": 500}, [{"start": 10, "end": 200}])
+    assert cache.cached_speech(path, {"min_silence_duration_ms": 500}) == ([{"start": 10, "end": 200}], SAMPLES)
+    assert cache.cached_speech(path, {"min_silence_duration_ms": 100}) is None
+
+
+def test_clear(tmp_path, cache):
+    path = recording(tmp_path, "a.mp3")
+    store(cache, path)
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+    assert cache.load(path) is None
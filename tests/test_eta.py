@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+import eta
+import global_vars
+
+
+class FakeMetrics:
+    def __init__(self, audio_seconds, rtf, result="done"):
+        self.audio_seconds = audio_seconds
+        self.rtf = rtf
+        self.result = result
+
+
+class FakeJob:
+    pass
+
+
+@pytest.fixture
+def estimator(tmp_path, monkeypatch):
+    monkeypatch.setattr(global_vars, "eta_default_rtf", 0.5)
+    import device_select
+    monkeypatch.setattr(device_select, "load_calibration", lambda: None)
+    return eta.RtfEstimator(str(tmp_path / "rtf.json"))
+
+
+def test_default_until_measured(estimator):
+    assert estimator.rtf("large", "sequential") == 0.5
+
+
+def test_calibration_replaces_default(tmp_path, monkeypatch):
+    import device_select
+    monkeypatch.setattr(device_select, "load_calibration", lambda: {"rtf": 0.2})
+    assert eta.RtfEstimator(str(tmp_path / "rtf.json")).rtf() == 0.2
+
+
+def test_first_measurement_is_taken_as_is(estimator):
+    estimator.record("large", "sequential", FakeMetrics(600, 0.1))
+    assert estimator.rtf("large", "sequential") == pytest.approx(0.1)
+    # Other combinations keep the default
+    assert estimator.rtf("large", "chunked") == 0.5
+
+
+def test_later_measurements_move_the_average_by_audio_length(estimator):
+    estimator.record("large", "sequential", FakeMetrics(3600, 0.1))
+    # One hour moves it halfway (WEIGHT_PER_HOUR)
+    estimator.record("large", "sequential", FakeMetrics(3600, 0.3))
+    assert estimator.rtf("large", "sequential") == pytest.approx(0.2)
+    # Six minutes move it a twentieth of the way
+    estimator.record("large", "sequential", FakeMetrics(360, 1.2))
+    assert estimator.rtf("large", "sequential") == pytest.approx(0.2 + 0.05 * 1.0)
+
+
+def test_short_failed_or_unmeasured_jobs_are_ignored(estimator):
+    estimator.record("large", "sequential", FakeMetrics(eta.MIN_AUDIO_SECONDS - 1, 0.1))
+    estimator.record("large", "sequential", FakeMetrics(600, 0.1, result="error"))
+    estimator.record("large", "sequential", FakeMetrics(600, None))
+    assert estimator.rtf("large", "sequential") == 0.5
+
+
+def test_measurements_survive_a_restart(estimator):
+    estimator.record("large", "sequential", FakeMetrics(600, 0.1))
+    with open(estimator.path, encoding="utf-8") as f:
+        assert json.load(f) == {"large|sequential": pytest.approx(0.1)}
+    assert eta.RtfEstimator(estimator.path).rtf("large", "sequential") == pytest.approx(0.1)
+
+
+def test_unreadable_file_is_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(global_vars, "eta_default_rtf", 0.5)
+    path = tmp_path / "rtf.json"
+    path.write_text("{not json")
+    assert eta.RtfEstimator(str(path)).rtf("large", "sequential") == 0.5
+
+
+def test_predict_hands_jobs_to_first_free_slot():
+    running = [(FakeJob(), 10.0), (FakeJob(), 4.0)]
+    waiting = [(FakeJob(), 3.0), (FakeJob(), 5.0), (FakeJob(), 1.0)]
+    finish, total = eta.predict(running, waiting, slots=2)
+    assert [finish[id(job)] for job, _ in waiting] == [7.0, 12.0, 11.0]
+    assert total == 12.0
+
+
+def test_predict_with_idle_slots():
+    waiting = [(FakeJob(), 3.0), (FakeJob(), 5.0)]
+    finish, total = eta.predict([], waiting, slots=4)
+    assert [finish[id(job)] for job, _ in waiting] == [3.0, 5.0]
+    assert total == 5.0
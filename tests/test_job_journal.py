@@ -0,0 +1,158 @@
+import sqlite3
+
+import pytest
+
+import global_vars
+from job_journal import JobJournal
+from job_model import JobList
+
+
+@pytest.fixture
+def folder(monkeypatch):
+    # Only explicit commits: the background thread never gets to run one
+    monkeypatch.setattr(global_vars, "journal_commit_seconds", 3600)
+    return global_vars.rec_folder
+
+
+def crash(journal):
+    """ The process dies: whatever wasn't committed is lost. """
+    journal._pending.clear()
+    journal.close()
+
+
+def test_replay_sees_only_committed_batches(folder):
+    journal = JobJournal(folder)
+    jobs = JobList(journal)
+    a = jobs.add("/calls/a.mp3")
+    b = jobs.add("/calls/b.mp3")
+    jobs.set_state(a, "done", "Completed")
+    journal.set_checkpoint(b.recovery_file, {"segments": 3, "offset": 12.5})
+    journal.commit()
+
+    # Uncommitted batch: a new job, a state change and a newer checkpoint
+    jobs.add("/calls/c.mp3")
+    jobs.set_state(b, "error", "Error: boom")
+    journal.set_checkpoint(b.recovery_file, {"segments": 9, "offset": 40.0})
+    crash(journal)
+
+    journal = JobJournal(folder)
+    restored = JobList(journal).restore()
+    assert [(job.file_path, job.state) for job in restored] == [("/calls/a.mp3", "done"),
+                                                                ("/calls/b.mp3", "idle")]
+    assert journal.get_checkpoint(b.recovery_file) == {"segments": 3, "offset": 12.5}
+    journal.close()
+
+
+def test_restore_counts_and_order(folder):
+    journal = JobJournal(folder)
+    jobs = JobList(journal)
+    for name in ("c", "a", "b"):
+        job = jobs.add(f"/calls/{name}.mp3")
+        jobs.set_duration(job, 60)
+    jobs.set_state(jobs[1], "done", "Completed")
+    jobs.remove(jobs[2])
+    journal.close()
+
+    journal = JobJournal(folder)
+    restored = JobList(journal)
+    restored.restore()
+    assert [job.filename for job in restored] == ["c.mp3", "a.mp3"]
+    assert restored.done_count == 1
+    assert restored.total_duration == 120
+    journal.close()
+
+
+def test_last_value_of_a_row_wins(folder):
+    journal = JobJournal(folder)
+    journal.set_checkpoint("x.seg", {"segments": 1})
+    journal.clear_checkpoint("x.seg")
+    journal.set_checkpoint("x.seg", {"segments": 2})
+    # Visible before the commit, too
+    assert journal.get_checkpoint("x.seg") == {"segments": 2}
+    journal.commit()
+    journal.clear_checkpoint("x.seg")
+    journal.close()
+
+    journal = JobJournal(folder)
+    assert journal.get_checkpoint("x.seg") is None
+    journal.close()
+
+
+def test_rows_of_a_moved_queue_folder_are_rekeyed(folder, tmp_path, monkeypatch):
+    journal = JobJournal(folder)
+    JobList(journal).add("/calls/a.mp3")
+    journal.close()
+
+    # Same journal, but the jobs' recovery files now live elsewhere
+    monkeypatch.setattr(global_vars, "rec_folder", str(tmp_path / "moved"))
+    journal = JobJournal(folder)
+    job, = JobList(journal).restore()
+    journal.close()
+
+    journal = JobJournal(folder)
+    assert [row["recovery_file"] for row in journal.load_jobs()] == [job.recovery_file]
+    assert job.recovery_file.startswith(global_vars.rec_folder)
+    journal.close()
+
+
+def test_same_file_queued_twice_keeps_both_rows(folder):
+    journal = JobJournal(folder)
+    jobs = JobList(journal)
+    first = jobs.add("/calls/call.mp3")
+    jobs.add("/calls/other.mp3")
+    copy = jobs.add("/calls/call.mp3")
+    assert first.recovery_file == copy.recovery_file
+    jobs.set_state(first, "done", "Completed")
+    journal.close()
+
+    journal = JobJournal(folder)
+    jobs = JobList(journal)
+    restored = jobs.restore()
+    assert [(job.filename, job.state) for job in restored] == [("call.mp3", "done"), ("other.mp3", "idle"),
+                                                               ("call.mp3", "idle")]
+
+    # Deleting the copy keeps the finished one's row (and so its store)
+    jobs.remove(restored[2])
+    journal.close()
+    journal = JobJournal(folder)
+    rows = journal.load_jobs()
+    assert [(row["file_path"], row["state"]) for row in rows] == [("/calls/call.mp3", "done"),
+                                                                  ("/calls/other.mp3", "idle")]
+    assert rows[0]["recovery_file"] == first.recovery_file
+    journal.close()
+
+
+def test_new_rows_never_reuse_an_id(folder):
+    journal = JobJournal(folder)
+    jobs = JobList(journal)
+    a = jobs.add("/calls/a.mp3")
+    b = jobs.add("/calls/b.mp3")
+    jobs.remove(b)
+    journal.close()
+
+    journal = JobJournal(folder)
+    jobs = JobList(journal)
+    jobs.restore()
+    c = jobs.add("/calls/c.mp3")
+    assert c.journal_id not in (a.journal_id, None)
+    journal.close()
+    journal = JobJournal(folder)
+    assert [row["file_path"] for row in journal.load_jobs()] == ["/calls/a.mp3", "/calls/c.mp3"]
+    journal.close()
+
+
+def test_journal_keyed_by_recovery_file_is_upgraded(folder):
+    db = sqlite3.connect(f"{folder}/journal.sqlite")
+    with db:
+        db.execute("CREATE TABLE jobs (recovery_file TEXT PRIMARY KEY, position INTEGER, file_path TEXT,"
+                   " model TEXT, state TEXT, status_text TEXT, progress REAL, duration REAL, elapsed REAL)")
+        db.execute("INSERT INTO jobs VALUES ('b.seg', 1, '/calls/b.mp3', 'm', 'idle', 'Idle', 0, 5, 0)")
+        db.execute("INSERT INTO jobs VALUES ('a.seg', 0, '/calls/a.mp3', 'm', 'done', 'Completed', 1, 5, 3)")
+    db.close()
+
+    journal = JobJournal(folder)
+    rows = journal.load_jobs()
+    assert [(row["file_path"], row["state"]) for row in rows] == [("/calls/a.mp3", "done"),
+                                                                  ("/calls/b.mp3", "idle")]
+    assert len({row["row_id"] for row in rows}) == 2
+    journal.close()
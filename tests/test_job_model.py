@@ -0,0 +1,16 @@
+from job_model import JobList
+
+
+def test_with_path_follows_add_and_remove():
+    jobs = JobList()
+    first = jobs.add("/calls/a.mp3")
+    other = jobs.add("/calls/b.mp3")
+    again = jobs.add("/calls/a.mp3")
+    assert jobs.with_path("/calls/a.mp3") is again
+    assert jobs.with_path("/calls/b.mp3") is other
+    assert jobs.with_path("/calls/c.mp3") is None
+
+    jobs.remove(again)
+    assert jobs.with_path("/calls/a.mp3") is first
+    jobs.remove(first)
+    assert jobs.with_path("/calls/a.mp3") is None
@@ -0,0 +1,128 @@
+import threading
+
+import pytest
+
+from job_queue import JobQueue
+
+
+class FakeJob:
+    def __init__(self, name, seconds=0):
+        self.name = name
+        self.durationInSeconds = seconds
+
+    def __repr__(self):
+        return self.name
+
+
+def names(jobs):
+    return [job.name for job in jobs]
+
+
+def drain(queue):
+    return names(queue.get() for _ in range(len(queue)))
+
+
+def make_queue(policy, *durations):
+    queue = JobQueue(policy)
+    jobs = [FakeJob(f"j{n}", seconds) for n, seconds in enumerate(durations)]
+    for job in jobs:
+        queue.put(job)
+    return queue, jobs
+
+
+def test_fifo_keeps_submission_order():
+    queue, _ = make_queue("fifo", 30, 10, 20)
+    assert drain(queue) == ["j0", "j1", "j2"]
+
+
+def test_sjf_takes_shortest_first():
+    queue, _ = make_queue("sjf", 30, 10, 20)
+    assert names(queue.snapshot()) == ["j1", "j2", "j0"]
+    assert drain(queue) == ["j1", "j2", "j0"]
+
+
+def test_ljf_takes_longest_first():
+    queue, _ = make_queue("ljf", 30, 10, 20)
+    assert drain(queue) == ["j0", "j2", "j1"]
+
+
+def test_equal_durations_keep_arrival_order():
+    queue, _ = make_queue("sjf", 10, 10, 10)
+    assert drain(queue) == ["j0", "j1", "j2"]
+
+
+def test_unknown_duration_counts_as_default(monkeypatch):
+    import global_vars
+    monkeypatch.setattr(global_vars, "prefetch_unknown_seconds", 15)
+    queue, _ = make_queue("sjf", 0, 10, 20)
+    assert drain(queue) == ["j1", "j0", "j2"]
+
+
+def test_update_resorts_after_duration_is_known():
+    queue, jobs = make_queue("sjf", 30, 20)
+    jobs[0].durationInSeconds = 5
+    queue.update(jobs[0])
+    assert drain(queue) == ["j0", "j1"]
+
+
+def test_move_pins_order_and_later_jobs_go_behind():
+    queue, jobs = make_queue("sjf", 30, 10, 20)
+    assert queue.move(jobs[0], 0)
+    queue.put(FakeJob("short", 1))
+    assert names(queue.snapshot()) == ["j0", "j1", "j2", "short"]
+    assert drain(queue) == ["j0", "j1", "j2", "short"]
+
+
+def test_move_to_back_and_unknown_job():
+    queue, jobs = make_queue("fifo", 1, 2, 3)
+    assert queue.move_to_back(jobs[0])
+    assert not queue.move(FakeJob("stranger"), 0)
+    assert drain(queue) == ["j1", "j2", "j0"]
+
+
+def test_set_policy_forgets_manual_order():
+    queue, jobs = make_queue("sjf", 30, 10, 20)
+    queue.move(jobs[0], 0)
+    queue.set_policy("sjf")
+    assert drain(queue) == ["j1", "j2", "j0"]
+
+
+def test_unknown_policy_is_refused():
+    with pytest.raises(ValueError):
+        JobQueue("random")
+    with pytest.raises(ValueError):
+        JobQueue("fifo").set_policy("random")
+
+
+def test_remove_takes_job_out_at_once():
+    queue, jobs = make_queue("fifo", 1, 2, 3)
+    assert queue.remove(jobs[1])
+    assert not queue.remove(jobs[1])
+    assert len(queue) == 2 and jobs[1] not in queue
+    assert drain(queue) == ["j0", "j2"]
+
+
+def test_put_again_keeps_place():
+    queue, jobs = make_queue("fifo", 1, 2)
+    queue.put(jobs[0])
+    assert drain(queue) == ["j0", "j1"]
+
+
+def test_get_with_filter_leaves_rejected_jobs_in_place():
+    queue, jobs = make_queue("fifo", 1, 2, 3)
+    assert queue.get(lambda job: job.name != "j0").name == "j1"
+    assert names(queue.snapshot()) == ["j0", "j2"]
+
+
+def test_get_with_filter_waits_for_wake():
+    queue, jobs = make_queue("fifo", 1)
+    allowed = threading.Event()
+    got = []
+    taker = threading.Thread(target=lambda: got.append(queue.get(lambda job: allowed.is_set())))
+    taker.start()
+    taker.join(0.2)
+    assert taker.is_alive() and not got
+    allowed.set()
+    queue.wake()
+    taker.join(5)
+    assert names(got) == ["j0"]
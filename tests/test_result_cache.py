@@ -0,0 +1,113 @@
+import os
+import time
+
+import pytest
+
+import result_cache
+import segment_store
+from result_cache import ResultCache
+from segment_store import SegmentWriter
+
+IDENTITY = {"model": "large", "beam_size": 1}
+
+
+class FakeSegment:
+    def __init__(self, text):
+        self.start, self.end = 0.0, 1.0
+        self.text = text
+        self.avg_logprob = self.no_speech_prob = 0.0
+
+
+def transcript(tmp_path, name, text="hello"):
+    path = str(tmp_path / f"{name}.seg")
+    with SegmentWriter(path) as writer:
+        writer.append(FakeSegment(text))
+    return path
+
+
+def entry_bytes(path):
+    return os.path.getsize(path) + os.path.getsize(segment_store.index_path(path))
+
+
+def recording(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / "cache"
+    folder.mkdir()
+    return str(folder)
+
+
+def test_same_content_same_key(tmp_path, folder):
+    cache = ResultCache(folder, max_bytes=10**9)
+    a = recording(tmp_path, "a.mp3", b"audio")
+    renamed = recording(tmp_path, "renamed.mp3", b"audio")
+    other = recording(tmp_path, "other.mp3", b"other")
+    assert cache.key_for(a, IDENTITY) == cache.key_for(renamed, IDENTITY)
+    assert cache.key_for(a, IDENTITY) != cache.key_for(other, IDENTITY)
+    assert cache.key_for(a, IDENTITY) != cache.key_for(a, dict(IDENTITY, model="small"))
+
+
+def test_put_and_get(tmp_path, folder):
+    cache = ResultCache(folder, max_bytes=10**9)
+    key = cache.key_for(recording(tmp_path, "a.mp3", b"audio"), IDENTITY)
+    assert cache.get(key) is None
+    cache.put(key, transcript(tmp_path, "a"), "a.mp3")
+    assert segment_store.SegmentStore(cache.get(key)).read_text().strip() == "hello"
+
+
+def test_least_recently_used_goes_first(tmp_path, folder):
+    store = transcript(tmp_path, "t")
+    # Room for two entries
+    cache = ResultCache(folder, max_bytes=2 * entry_bytes(store))
+    keys = [cache.key_for(recording(tmp_path, f"{n}.mp3", bytes([n])), IDENTITY) for n in range(3)]
+    cache.put(keys[0], store)
+    time.sleep(0.01)
+    cache.put(keys[1], store)
+    time.sleep(0.01)
+    # Reading the first makes the second the oldest
+    assert cache.get(keys[0])
+    time.sleep(0.01)
+    cache.put(keys[2], store)
+    assert [cache.get(key) is not None for key in keys] == [True, False, True]
+    assert cache.stats()["bytes"] == 2 * entry_bytes(store)
+    assert not segment_store.exists(cache._entry_path(keys[1]))
+
+
+def test_hashes_of_deleted_or_changed_files_are_pruned(tmp_path, folder):
+    cache = ResultCache(folder, max_bytes=10**9)
+    kept = recording(tmp_path, "kept.mp3", b"1")
+    deleted = recording(tmp_path, "deleted.mp3", b"2")
+    changed = recording(tmp_path, "changed.mp3", b"3")
+    for path in (kept, deleted, changed):
+        cache.content_hash(path)
+    os.remove(deleted)
+    with open(changed, "ab") as f:
+        f.write(b"more")
+    os.utime(changed, (1, 1))
+
+    cache.put(cache.key_for(kept, IDENTITY), transcript(tmp_path, "t"))
+    rows = cache._db.execute("SELECT path FROM file_hashes").fetchall()
+    assert rows == [(os.path.abspath(kept),)]
+
+
+def test_hashes_are_pruned_at_most_once_a_day(tmp_path, folder, monkeypatch):
+    cache = ResultCache(folder, max_bytes=10**9)
+    first = recording(tmp_path, "first.mp3", b"1")
+    cache.put(cache.key_for(first, IDENTITY), transcript(tmp_path, "t"))
+
+    gone = recording(tmp_path, "gone.mp3", b"2")
+    cache.put(cache.key_for(gone, IDENTITY), transcript(tmp_path, "t"))
+    os.remove(gone)
+    cache.put(cache.key_for(first, IDENTITY), transcript(tmp_path, "t"))
+    # Not due yet: the other puts didn't stat anything
+    assert cache._db.execute("SELECT COUNT(*) FROM file_hashes").fetchone()[0] == 2
+
+    later = time.time() + result_cache.HASH_PRUNE_SECONDS + 1
+    monkeypatch.setattr(result_cache.time, "time", lambda: later)
+    cache.put(cache.key_for(first, IDENTITY), transcript(tmp_path, "t"))
+    assert cache._db.execute("SELECT path FROM file_hashes").fetchall() == [(os.path.abspath(first),)]
@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+import segment_store
+from segment_store import INDEX, SegmentStore, SegmentWriter
+
+
+class FakeSegment:
+    def __init__(self, n):
+        self.start = float(n)
+        self.end = n + 0.5
+        self.text = f"segment {n}"
+        self.avg_logprob = -0.1
+        self.no_speech_prob = 0.0
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "job.seg")
+
+
+def write(path, count, keep_segments=None, first=0):
+    with SegmentWriter(path, keep_segments=keep_segments) as writer:
+        for n in range(first, first + count):
+            writer.append(FakeSegment(n))
+    return writer
+
+
+def texts(path):
+    return [segment.text for segment in SegmentStore(path).iter_segments()]
+
+
+def test_round_trip_and_lookup(path):
+    write(path, 5)
+    store = SegmentStore(path)
+    assert len(store) == 5
+    assert store.segment(3).text == "segment 3"
+    assert store.find(2.2) == 3
+    assert store.find(2.0) == 2
+    assert [s.text for s in store.iter_segments(from_seconds=3.0)] == ["segment 3", "segment 4"]
+
+
+def test_resume_cuts_back_to_checkpoint(path):
+    write(path, 5)
+    writer = write(path, 2, keep_segments=3, first=3)
+    assert writer.count == 5
+    assert texts(path) == [f"segment {n}" for n in range(5)]
+
+
+def test_resume_after_partial_index_write(path):
+    write(path, 4)
+    # Crash while segment 4 was going out: its record is on disk, its
+    # index entry only half
+    with SegmentWriter(path, keep_segments=4) as writer:
+        writer.append(FakeSegment(4))
+    with open(segment_store.index_path(path), "r+b") as f:
+        f.truncate(4 * INDEX.size + INDEX.size // 2)
+    data_size = os.path.getsize(path)
+
+    writer = write(path, 1, keep_segments=4, first=4)
+    assert writer.count == 5
+    assert texts(path) == [f"segment {n}" for n in range(5)]
+    # The orphaned record was cut, not left in front of the new one
+    assert os.path.getsize(path) == data_size
+
+
+def test_resume_drops_unindexed_records(path):
+    write(path, 3)
+    with open(path, "ab") as f:
+        f.write(b"half a record")
+    write(path, 0, keep_segments=3)
+    with open(segment_store.index_path(path), "rb") as f:
+        f.seek(2 * INDEX.size)
+        last_offset = INDEX.unpack(f.read(INDEX.size))[1]
+    record = SegmentStore(path).segment(2)
+    assert os.path.getsize(path) == last_offset + segment_store.RECORD.size + len(record.text.encode("utf-8"))
+
+
+def test_resume_beyond_written_keeps_what_is_there(path):
+    write(path, 2)
+    writer = write(path, 0, keep_segments=10)
+    assert writer.count == 2
+    assert texts(path) == ["segment 0", "segment 1"]
+
+
+def test_resume_drops_segments_whose_data_is_missing(path):
+    write(path, 3)
+    # The data of the last segment never reached the disk
+    os.truncate(path, os.path.getsize(path) - 3)
+    writer = write(path, 0, keep_segments=3)
+    assert writer.count == 2
+    assert texts(path) == ["segment 0", "segment 1"]
+
+
+def test_resume_from_zero_empties_the_store(path):
+    write(path, 3)
+    write(path, 0, keep_segments=0)
+    assert os.path.getsize(path) == 0
+    assert len(SegmentStore(path)) == 0
+
+
+def test_no_checkpoint_starts_over(path):
+    write(path, 3)
+    write(path, 1, first=7)
+    assert texts(path) == ["segment 7"]
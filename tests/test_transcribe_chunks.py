@@ -0,0 +1,100 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import global_vars
+from transcribe_module import SAMPLE_RATE, _chunked_segments, _clip_groups, _window_cut, plan_chunks
+
+
+def regions(*pairs):
+    return [{"start": start, "end": end} for start, end in pairs]
+
+
+# --- STREAMED WINDOWS ---
+
+def test_window_cut_in_trailing_silence():
+    assert _window_cut(regions((0, 100), (200, 300)), 500) == 400
+
+
+def test_window_cut_before_speech_running_into_the_next_block():
+    assert _window_cut(regions((0, 100), (200, 500)), 500) == 150
+
+
+def test_window_cut_without_a_silence_takes_the_whole_window():
+    assert _window_cut(regions((0, 500)), 500) == 500
+    assert _window_cut([], 500) == 500
+
+
+# --- CHUNK PLANNING ---
+
+def test_plan_chunks_cuts_in_the_middle_of_gaps():
+    speech = regions((0, 40), (60, 120), (140, 160), (200, 260))
+    assert plan_chunks(speech, 100) == [(0, 130), (130, 260)]
+
+
+def test_plan_chunks_covers_every_region_once():
+    speech = regions(*[(n * 100, n * 100 + 60) for n in range(20)])
+    chunks = plan_chunks(speech, 250)
+    assert chunks[0][0] == 0 and chunks[-1][1] == speech[-1]["end"]
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+    for r in speech:
+        assert sum(start <= r["start"] and r["end"] <= end for start, end in chunks) == 1
+
+
+def test_plan_chunks_without_speech():
+    assert plan_chunks([], 100) == []
+
+
+def test_clip_groups_join_short_regions_and_cut_long_ones():
+    speech = regions((0, 10), (20, 30), (40, 95), (100, 110))
+    assert _clip_groups(speech, 50) == [[0, 30], [40, 90], [90, 110]]
+
+
+# --- CHUNKED MODE ---
+
+class FakeModel:
+    """ One segment per call, covering the audio it got; early chunks are the slowest. """
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def transcribe(self, audio, **options):
+        with self.lock:
+            self.calls += 1
+            delay = 0.3 / self.calls
+        time.sleep(delay)
+        info = type("Info", (), {"duration": len(audio) / SAMPLE_RATE})
+        text = f"{int(audio[0])}"
+        return iter([type("S", (), dict(start=0.0, end=len(audio) / SAMPLE_RATE, text=text,
+                                        avg_logprob=0.0, no_speech_prob=0.0))]), info
+
+
+@pytest.fixture
+def chunked(monkeypatch):
+    monkeypatch.setattr(global_vars, "chunk_workers", 4)
+    # Shorter than a speech region: one chunk per region
+    monkeypatch.setattr(global_vars, "chunk_seconds", 0.5)
+
+
+def test_chunked_segments_come_back_in_order(chunked):
+    # Four seconds of speech with a short gap after every second; each
+    # second's samples hold its number, so a segment tells where it came from
+    audio = np.repeat(np.arange(4, dtype=np.float32), SAMPLE_RATE)
+    speech = regions(*[(n * SAMPLE_RATE, (n + 1) * SAMPLE_RATE - 1600) for n in range(4)])
+    segments, duration = _chunked_segments(FakeModel(), audio, None, offset=10.0, speech=speech)
+    segments = list(segments)
+    assert [s.text for s in segments] == ["0", "1", "2", "3"]
+    assert [round(s.start, 2) for s in segments] == [10.0, 11.0, 12.0, 13.0]
+    assert duration == 4.0
+
+
+def test_chunked_segments_stop_on_cancel(chunked):
+    audio = np.repeat(np.arange(4, dtype=np.float32), SAMPLE_RATE)
+    speech = regions(*[(n * SAMPLE_RATE, (n + 1) * SAMPLE_RATE - 1600) for n in range(4)])
+    taken = []
+    segments, _ = _chunked_segments(FakeModel(), audio, lambda: len(taken) >= 2, speech=speech)
+    for segment in segments:
+        taken.append(segment)
+    assert [s.text for s in taken] == ["0", "1"]
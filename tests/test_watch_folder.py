@@ -0,0 +1,166 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import global_vars
+import watch_folder
+from watch_folder import FolderWatcher
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setattr(global_vars, "watch_stable_seconds", 0)
+    monkeypatch.setattr(global_vars, "watch_batch_size", 1000)
+
+
+def make_watcher(tmp_path):
+    batches = []
+    watcher = FolderWatcher(str(tmp_path / "in"), str(tmp_path / "out"), batches.append)
+    # One I/O thread, so waiting for an empty task waits for everything before it
+    watcher._io.shutdown()
+    watcher._io = ThreadPoolExecutor(max_workers=1)
+    return watcher, batches
+
+
+def settle(watcher):
+    """ One round of the watcher's loop, waiting for the hashing it started. """
+    watcher._check_pending()
+    watcher._io.submit(lambda: None).result()
+    watcher._flush_batch(force=True)
+
+
+def drop(tmp_path, name, content=b"audio"):
+    path = tmp_path / "in" / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+@pytest.fixture
+def watcher(tmp_path, settings):
+    (tmp_path / "in").mkdir()
+    watcher, batches = make_watcher(tmp_path)
+    yield watcher, batches
+    watcher.stop()
+
+
+def test_candidates():
+    assert watch_folder.is_candidate("/x/call.MP3")
+    assert not watch_folder.is_candidate("/x/call.mp3.part")
+    assert not watch_folder.is_candidate("/x/.call.mp3")
+    assert not watch_folder.is_candidate("/x/notes.txt")
+
+
+def test_file_is_taken_once_stable(tmp_path, watcher):
+    watcher, batches = watcher
+    path = drop(tmp_path, "a.mp3")
+    watcher._candidate(path)
+    # First look only records size and mtime
+    settle(watcher)
+    assert batches == []
+    settle(watcher)
+    assert batches == [[path]]
+
+
+def test_growing_file_waits(tmp_path, watcher):
+    watcher, batches = watcher
+    path = drop(tmp_path, "a.mp3")
+    watcher._candidate(path)
+    settle(watcher)
+    with open(path, "ab") as f:
+        f.write(b"more")
+    settle(watcher)
+    assert batches == []
+    settle(watcher)
+    assert batches == [[path]]
+
+
+def test_quiet_period(tmp_path, watcher, monkeypatch):
+    monkeypatch.setattr(global_vars, "watch_stable_seconds", 3600)
+    watcher, batches = watcher
+    watcher._candidate(drop(tmp_path, "a.mp3"))
+    settle(watcher)
+    settle(watcher)
+    assert batches == []
+
+
+def test_empty_and_vanished_files_are_not_taken(tmp_path, watcher):
+    watcher, batches = watcher
+    empty = drop(tmp_path, "empty.mp3", b"")
+    gone = drop(tmp_path, "gone.mp3")
+    watcher._candidate(empty)
+    watcher._candidate(gone)
+    settle(watcher)
+    os.remove(gone)
+    settle(watcher)
+    assert batches == []
+    assert list(watcher._pending) == [empty]
+
+
+def test_same_content_is_transcribed_once(tmp_path, watcher):
+    watcher, batches = watcher
+    first = drop(tmp_path, "a.mp3", b"same")
+    copy = drop(tmp_path, "sub/b.mp3", b"same")
+    other = drop(tmp_path, "c.mp3", b"other")
+    for path in (first, copy, other):
+        watcher._candidate(path)
+    settle(watcher)
+    settle(watcher)
+    assert batches == [[first, other]]
+    state = watcher._db.execute("SELECT state FROM files WHERE path=?", (copy,)).fetchone()[0]
+    assert state == "duplicate"
+
+
+def test_finished_files_are_skipped_next_session(tmp_path, settings):
+    (tmp_path / "in").mkdir()
+    done = drop(tmp_path, "done.mp3", b"one")
+    unfinished = drop(tmp_path, "unfinished.mp3", b"two")
+
+    watcher, batches = make_watcher(tmp_path)
+    for path in (done, unfinished):
+        watcher._candidate(path)
+    settle(watcher)
+    settle(watcher)
+    assert sorted(batches[0]) == sorted([done, unfinished])
+    with watcher._db_lock, watcher._db:
+        watcher._db.execute("UPDATE files SET state='done' WHERE path=?", (done,))
+    watcher.stop()
+
+    watcher, batches = make_watcher(tmp_path)
+    for path in (done, unfinished):
+        watcher._candidate(path)
+    settle(watcher)
+    settle(watcher)
+    watcher.stop()
+    assert batches == [[unfinished]]
+
+
+def test_output_tree_inside_watched_one_is_ignored(tmp_path, settings):
+    (tmp_path / "in").mkdir()
+    batches = []
+    watcher = FolderWatcher(str(tmp_path / "in"), str(tmp_path / "in" / "out"), batches.append)
+    try:
+        watcher._candidate(drop(tmp_path, "out/a.mp3"))
+        assert watcher._pending == {}
+        assert watcher.output_path(str(tmp_path / "in" / "2024" / "call.mp3"), "txt") \
+            == str(tmp_path / "in" / "out" / "2024" / "call.txt")
+    finally:
+        watcher.stop()
+
+
+def test_poller_finds_new_files_in_changed_directories(tmp_path):
+    root = tmp_path / "in"
+    (root / "sub").mkdir(parents=True)
+    found = []
+    poller = watch_folder._DirectoryPoller(str(root), found.append, lambda path: False)
+    poller.scan(str(root))
+    assert found == []
+
+    new = drop(tmp_path, "sub/a.mp3")
+    # Force a visible mtime change even on coarse-grained file systems
+    mtime = os.stat(root / "sub").st_mtime_ns
+    os.utime(root / "sub", ns=(mtime + 10**9, mtime + 10**9))
+    poller.poll()
+    poller.poll()
+    assert found == [new]
@@ -1,10 +1,22 @@
 import os
 import sys
 import time
-from faster_whisper import WhisperModel
+import threading
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import global_vars
+import audio_cache
+import device_select
+import model_registry
+from job_metrics import JobMetrics
 
-DEVICE = "cuda"
-COMPUTE_TYPE = "float16"
+# faster_whisper (CTranslate2, onnxruntime) is imported inside the functions
+# that need it: importing it takes seconds and must not delay the window.
+
+# Filled in with the configuration that actually loaded (see device_select)
+DEVICE = None
+COMPUTE_TYPE = None
 
 def resource_path(relative_path):
     try:
@@ -15,57 +27,516 @@ def resource_path(relative_path):
 
 MODEL_DIR = resource_path("models")
 
-# --- GLOBAL MODEL (Prevents Crash) ---
-_GLOBAL_MODEL = None
-
-def load_model_globally(status_callback=None):
-    global _GLOBAL_MODEL
-    if _GLOBAL_MODEL is None:
-        if status_callback: status_callback("Loading Model (One-time setup)...")
-        # Validate path first
-        model_file = os.path.join(MODEL_DIR, "model.bin")
-        if not os.path.exists(model_file):
-            raise FileNotFoundError(f"CRITICAL: 'model.bin' not found in {MODEL_DIR}")
-            
-        _GLOBAL_MODEL = WhisperModel(MODEL_DIR, device=DEVICE, compute_type=COMPUTE_TYPE)
-    return _GLOBAL_MODEL
+def _create_model(num_workers, model_dir=MODEL_DIR):
+    global DEVICE, COMPUTE_TYPE
+    # Validate path first
+    model_file = os.path.join(model_dir, "model.bin")
+    if not os.path.exists(model_file):
+        raise FileNotFoundError(f"CRITICAL: 'model.bin' not found in {model_dir}")
+
+    # Try the fastest configuration first, fall back when it can't load
+    # (no GPU, missing CUDA libraries, unsupported compute type...)
+    from faster_whisper import WhisperModel
+
+    last_error = None
+    for config in device_select.candidate_configs(global_vars.worker_count):
+        try:
+            model = WhisperModel(
+                model_dir,
+                device=config.device,
+                compute_type=config.compute_type,
+                cpu_threads=config.cpu_threads,
+                # CTranslate2 runs up to num_workers transcribe() calls in parallel
+                num_workers=num_workers
+            )
+        except Exception as e:
+            print(f"Could not load model on {config.device}/{config.compute_type}: {e}")
+            last_error = e
+            continue
+
+        DEVICE, COMPUTE_TYPE = config.device, config.compute_type
+        print(f"Model loaded on {DEVICE} ({COMPUTE_TYPE}, cpu_threads={config.cpu_threads})")
+        return model
+
+    raise last_error or RuntimeError("No usable device configuration found")
+
+def _shared_num_workers():
+    # Enough CTranslate2 workers for every slot (and every chunk of a chunked job)
+    workers = max(1, global_vars.worker_count)
+    if global_vars.transcription_mode == "chunked":
+        workers = max(workers, global_vars.chunk_workers)
+    return workers
+
+def _load_model(name, slot):
+    # slot None = the instance all slots share (num_workers = worker_count),
+    # otherwise the slot's own single-worker instance (share_model = False)
+    num_workers = _shared_num_workers() if slot is None else 1
+    return _create_model(num_workers=num_workers, model_dir=model_registry.model_dir(name))
+
+# --- RESIDENT MODELS (loaded on demand, dropped when idle / over budget) ---
+MODELS = model_registry.ModelRegistry(_load_model)
+
+def _registry_slot(slot):
+    return slot if slot is not None and not global_vars.share_model else None
+
+def load_model_globally(status_callback=None, slot=None, model_name=None):
+    """
+    Loads model_name (default global_vars.default_model) if it isn't resident
+    yet and returns it. It stays resident until it is idle for too long or
+    has to make room (see model_registry); code that runs it for a while
+    holds it with MODELS.use() instead.
+    """
+    with MODELS.use(model_name, _registry_slot(slot), status_callback) as model:
+        return model
+
+SAMPLE_RATE = 16000
+
+# --- DECODING SETTINGS (shared by every mode) ---
+LANGUAGE = "ar"
+INITIAL_PROMPT = (
+    "هذا التسجيل باللهجة الأردنية العامية. "
+    "يرجى كتابة النص كما هو مسموع تماماً. "
+    "المصطلحات التقنية تكتب بالإنجليزية."
+)
+BEAM_SIZE = 1
+VAD_PARAMETERS = dict(min_silence_duration_ms=500)
+
+def decode_options():
+    return dict(
+        language=LANGUAGE,
+        initial_prompt=INITIAL_PROMPT,
+        beam_size=BEAM_SIZE,
+        vad_filter=True,
+        vad_parameters=dict(VAD_PARAMETERS),
+        condition_on_previous_text=False
+    )
+
+def cache_identity(model_name=None, mode=None):
+    """ Everything besides the audio that changes the transcript (for result_cache). """
+    mode = mode or global_vars.transcription_mode
+    model_dir = model_registry.model_dir(model_name)
+    model_file = os.path.join(model_dir, "model.bin")
+    st = os.stat(model_file) if os.path.exists(model_file) else None
+    identity = {
+        "model": [os.path.abspath(model_dir), st.st_size if st else 0, st.st_mtime if st else 0],
+        "options": decode_options(),
+        "mode": mode,
+    }
+    if mode == "batched":
+        identity["batch_size"] = global_vars.batch_size
+    elif mode == "chunked":
+        identity["chunk_seconds"] = global_vars.chunk_seconds
+    return identity
+
+# Timestamps are always absolute (seconds from the start of the file)
+Segment = namedtuple("Segment", ["start", "end", "text", "avg_logprob", "no_speech_prob"])
+
+def _to_segment(segment, offset=0.0):
+    return Segment(segment.start + offset, segment.end + offset, segment.text.strip(),
+                   segment.avg_logprob, segment.no_speech_prob)
+
+# --- SPEECH MAP KNOWN IN ADVANCE (see audio_cache) ---
+
+def _speech_after(speech, start):
+    """ The speech regions (samples) from sample start on, relative to it. """
+    return [{"start": max(r["start"], start) - start, "end": r["end"] - start}
+            for r in speech if r["end"] > start]
+
+def _speech_options():
+    # The VAD already ran: the model only gets the speech
+    options = decode_options()
+    options["vad_filter"] = False
+    del options["vad_parameters"]
+    return options
+
+def _speech_segments(model, audio, speech, offset=0.0):
+    """
+    Transcribes the speech regions of audio joined together - what
+    vad_filter does inside faster-whisper - and maps the timestamps back
+    to the original audio.
+    """
+    import numpy as np
+
+    if not speech:
+        return iter(())
+    joined_audio = np.concatenate([audio[r["start"]:r["end"]] for r in speech])
+    starts, shifts, joined = [], [], 0
+    for r in speech:
+        starts.append(joined / SAMPLE_RATE)
+        shifts.append((r["start"] - joined) / SAMPLE_RATE)
+        joined += r["end"] - r["start"]
+
+    def original(t, is_end):
+        # A segment ending exactly where two regions meet belongs to the first
+        i = (bisect_left if is_end else bisect_right)(starts, t) - 1
+        return t + shifts[max(0, i)] + offset
+
+    segments_generator, _ = model.transcribe(joined_audio, **_speech_options())
+
+    def generate():
+        for segment in segments_generator:
+            yield Segment(original(segment.start, False), original(segment.end, True), segment.text.strip(),
+                          segment.avg_logprob, segment.no_speech_prob)
+
+    return generate()
+
+def _sequential_segments(model, audio, check_cancel, offset=0.0, metrics=None, speech=None):
+    with metrics.stage("prepare"):
+        if speech is None:
+            segments_generator, info = model.transcribe(audio, **decode_options())
+            converted = (_to_segment(segment, offset) for segment in segments_generator)
+            duration = info.duration
+        else:
+            converted = _speech_segments(model, audio, speech, offset)
+            duration = len(audio) / SAMPLE_RATE
+
+    def generate():
+        for segment in converted:
+            if check_cancel and check_cancel():
+                return
+            yield segment
+
+    return generate(), duration
+
+# --- CHUNKED MODE (one long file, several workers) ---
+
+def plan_chunks(speech_timestamps, target_samples):
+    """
+    Groups VAD speech regions into chunks of roughly target_samples. Chunks are
+    cut in the middle of a silence gap, so no word is split between two chunks.
+    Returns a list of (start_sample, end_sample).
+    """
+    chunks = []
+    chunk_start = None
+    for i, region in enumerate(speech_timestamps):
+        if chunk_start is None:
+            chunk_start = region["start"]
+
+        is_last = i == len(speech_timestamps) - 1
+        if is_last:
+            chunks.append((chunk_start, region["end"]))
+        elif region["end"] - chunk_start >= target_samples:
+            next_start = speech_timestamps[i + 1]["start"]
+            cut = (region["end"] + next_start) // 2
+            chunks.append((chunk_start, cut))
+            chunk_start = cut
+    return chunks
+
+def _chunked_segments(model, audio, check_cancel, offset=0.0, metrics=None, speech=None):
+    if speech is None:
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+        with metrics.stage("vad"):
+            speech = get_speech_timestamps(audio, VadOptions(**VAD_PARAMETERS))
+    chunks = plan_chunks(speech, int(global_vars.chunk_seconds * SAMPLE_RATE))
+    stop_event = threading.Event()
+
+    def transcribe_chunk(start, end):
+        chunk_offset = offset + start / SAMPLE_RATE
+        # Chunks are cut in silence gaps, so every region lies within one;
+        # the VAD doesn't have to run again for the chunk
+        regions = [{"start": r["start"] - start, "end": min(r["end"], end) - start}
+                   for r in speech if start <= r["start"] < end]
+        result = []
+        for segment in _speech_segments(model, audio[start:end], regions, chunk_offset):
+            if stop_event.is_set():
+                break
+            result.append(segment)
+        return result
+
+    def generate():
+        executor = ThreadPoolExecutor(max_workers=max(1, global_vars.chunk_workers),
+                                      thread_name_prefix="transcribe-chunk")
+        try:
+            futures = [executor.submit(transcribe_chunk, start, end) for start, end in chunks]
+            # Hand chunks back in order; later chunks keep running meanwhile
+            for future in futures:
+                for segment in future.result():
+                    if check_cancel and check_cancel():
+                        return
+                    yield segment
+        finally:
+            stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return generate(), len(audio) / SAMPLE_RATE
 
-def run_transcription(audio_path, progress_callback=None, status_callback=None, check_cancel=None):
+# --- BATCHED MODE (faster-whisper decodes many VAD chunks per forward pass) ---
+
+def _clip_groups(speech, max_samples):
+    """ Speech regions grouped into clips of at most max_samples (longer regions are cut). """
+    groups = []
+    for r in speech:
+        start, end = r["start"], r["end"]
+        while end - start > max_samples:
+            groups.append([start, start + max_samples])
+            start += max_samples
+        if groups and end - groups[-1][0] <= max_samples:
+            groups[-1][1] = end
+        else:
+            groups.append([start, end])
+    return groups
+
+# BatchedInferencePipeline takes clips of at most one 30 s window
+BATCH_CLIP_SECONDS = 30
+
+def _batched_speech_options(speech):
+    options = _speech_options()
+    options["clip_timestamps"] = [
+        {"start": start / SAMPLE_RATE, "end": end / SAMPLE_RATE}
+        for start, end in _clip_groups(speech, BATCH_CLIP_SECONDS * SAMPLE_RATE)]
+    return options
+
+def _batched_segments(model, audio, check_cancel, offset=0.0, metrics=None, speech=None):
+    from faster_whisper import BatchedInferencePipeline
+
+    pipeline = BatchedInferencePipeline(model=model)
+    with metrics.stage("prepare"):
+        options = decode_options() if speech is None else _batched_speech_options(speech)
+        segments_generator, info = pipeline.transcribe(
+            audio, batch_size=max(1, global_vars.batch_size), **options)
+
+    def generate():
+        for segment in segments_generator:
+            if check_cancel and check_cancel():
+                return
+            yield _to_segment(segment, offset)
+
+    return generate(), info.duration
+
+# --- STREAMING INPUT (decoded window by window, see audio_stream) ---
+
+def _window_cut(speech, length):
+    """ Where a window of length samples ends: in its last silence, so no word is split. """
+    if speech and speech[-1]["end"] < length:
+        # Speech stopped before the end of the window
+        return (speech[-1]["end"] + length) // 2
+    if len(speech) > 1:
+        # The last region may go on in the next block: keep it for the next window
+        return (speech[-2]["end"] + speech[-1]["start"]) // 2
+    return length
+
+def _window_segments(model, audio, speech, offset, mode):
+    if mode == "batched":
+        from faster_whisper import BatchedInferencePipeline
+
+        pipeline = BatchedInferencePipeline(model=model)
+        segments_generator, _ = pipeline.transcribe(
+            audio, batch_size=max(1, global_vars.batch_size), **_batched_speech_options(speech))
+        return (_to_segment(segment, offset) for segment in segments_generator)
+    return _speech_segments(model, audio, speech, offset)
+
+def _streamed_segments(get_model, audio_path, check_cancel, start_sample=0, metrics=None, mode=None, cache=None):
+    """
+    Decodes audio_path a block at a time and transcribes it in windows of
+    about stream_window_seconds, each as soon as it is decoded; only the
+    current window is in memory. The model is loaded once the first window
+    with speech is ready (get_model). With a cache the samples go to disk
+    as they are decoded and, once the whole file went through, become its
+    audio_cache entry along with the speech map.
+    Returns (segments, StreamDecoder): decoder.samples is the real length
+    once the segments are exhausted.
+    """
+    import numpy as np
+    import audio_stream
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    decoder = audio_stream.StreamDecoder(audio_path)
+    window = max(1, int(global_vars.stream_window_seconds * SAMPLE_RATE))
+
+    def generate():
+        writer = cache.writer(audio_path) if cache is not None else None
+        speech_map = []
+        blocks = iter(decoder)
+        pending, pending_samples = [], 0   # decoded, not transcribed yet
+        base = 0                           # file position of pending's first sample
+        finished = False
+        try:
+            while not finished:
+                decode_start = time.perf_counter()
+                block = next(blocks, None)
+                metrics.add("decode", time.perf_counter() - decode_start, decode_start)
+                if block is None:
+                    finished = True
+                else:
+                    if writer is not None:
+                        writer.write(block)
+                    pending.append(block)
+                    pending_samples += len(block)
+                    if pending_samples < window:
+                        continue
+                if not pending:
+                    break
+
+                audio = np.concatenate(pending) if len(pending) > 1 else pending[0]
+                with metrics.stage("vad"):
+                    speech = get_speech_timestamps(audio, VadOptions(**VAD_PARAMETERS))
+                cut = len(audio) if finished else _window_cut(speech, len(audio))
+                regions = [{"start": r["start"], "end": min(r["end"], cut)} for r in speech if r["start"] < cut]
+                speech_map.extend({"start": r["start"] + base, "end": r["end"] + base} for r in regions)
+
+                # Resume: what is before start_sample was transcribed already
+                skip = start_sample - base
+                todo = [{"start": max(r["start"], skip), "end": r["end"]} for r in regions if r["end"] > skip]
+                if todo:
+                    for segment in _window_segments(get_model(), audio[:cut], todo, base / SAMPLE_RATE, mode):
+                        if check_cancel and check_cancel():
+                            return
+                        yield segment
+
+                pending = [audio[cut:]] if cut < len(audio) else []
+                pending_samples = len(audio) - cut
+                base += cut
+
+            if writer is not None:
+                writer.commit(VAD_PARAMETERS, speech_map)
+                writer = None
+        finally:
+            if writer is not None:
+                writer.abort()
+
+    return generate(), decoder
+
+def warm_up(status_callback=None, model_name=None):
+    """
+    Loads the shared model (default: global_vars.default_model) and runs a
+    tiny dummy inference so the first real job doesn't pay for CUDA/kernel
+    initialisation.
+    """
+    import numpy as np
+
+    with MODELS.use(model_name, status_callback=status_callback) as model:
+        silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        segments, _ = model.transcribe(silence, language=LANGUAGE, beam_size=1, vad_filter=False)
+        list(segments)
+        return model
+
+TRANSCRIPTION_MODES = ("sequential", "chunked", "batched")
+
+def run_transcription(audio_path, progress_callback=None, status_callback=None, check_cancel=None, slot=None, mode=None,
+                      start_offset=0.0, checkpoint_callback=None, audio=None, segment_callback=None,
+                      metrics=None, model_name=None):
+    """
+    mode overrides global_vars.transcription_mode ("sequential", "chunked"
+    or "batched"); every mode reports through the same callbacks.
+
+    start_offset (seconds) skips audio that was already transcribed; all
+    timestamps and percentages stay relative to the whole file.
+    checkpoint_callback(end_seconds, percent) is called right after each
+    progress_callback with the end time of the last segment it contained.
+    segment_callback(segment) gets every Segment (absolute timestamps) as soon
+    as it is decoded, before the progress_callback that covers it.
+    audio: already decoded 16 kHz mono float32 samples of audio_path (see
+    prefetch), used instead of decoding the file again.
+    metrics: JobMetrics the stage timings are added to (see job_metrics).
+    model_name: one of global_vars.models (default global_vars.default_model).
+
+    With global_vars.audio_cache_enabled the decoded audio and the VAD
+    speech map come from (and go to) audio_cache; a file without speech is
+    finished before any model is loaded.
+    """
+    metrics = metrics or JobMetrics(filename=os.path.basename(audio_path))
+    model_slot = _registry_slot(slot)
+    model = None
     try:
-        # 1. Load the persistent model
-        model = load_model_globally(status_callback)
+        mode = mode or global_vars.transcription_mode
+        if mode not in TRANSCRIPTION_MODES:
+            raise ValueError(f"Unknown transcription mode: {mode}")
+
+        # 1. Audio + where the speech is, cached per file (see audio_cache)
+        cache = audio_cache.get_cache()
+        speech = None
+        start_sample = int(start_offset * SAMPLE_RATE)
+        # Not decoded up front but window by window while transcribing
+        streaming = (audio is None and global_vars.stream_decode and mode != "chunked"
+                     and not (cache is not None and cache.has_pcm(audio_path)))
+        if cache is not None:
+            with metrics.stage("vad"):
+                cached = cache.cached_speech(audio_path, VAD_PARAMETERS)
+            if cached is not None:
+                speech, total_samples = cached
+            if not streaming and (speech is None or _speech_after(speech, start_sample)):
+                with metrics.stage("decode"):
+                    if audio is None:
+                        audio = cache.decode(audio_path)
+                    elif not cache.has_pcm(audio_path):
+                        cache.store(audio_path, audio)
+                if speech is None:
+                    with metrics.stage("vad"):
+                        speech = cache.speech(audio_path, audio, VAD_PARAMETERS)
+                    total_samples = len(audio)
+            if speech is not None and not _speech_after(speech, start_sample):
+                # Nothing (left) to transcribe: no model needed
+                metrics.audio_seconds = max(0.0, total_samples / SAMPLE_RATE - start_offset)
+                if status_callback: status_callback("No speech found")
+                return total_samples / SAMPLE_RATE
+
+        # 2. Get the resident model (held until this job is finished)
+        def get_model():
+            nonlocal model
+            if model is None:
+                with metrics.stage("model_load"):
+                    model = MODELS.acquire(model_name, model_slot, status_callback)
+            return model
 
         if status_callback: status_callback(f"Transcribing {os.path.basename(audio_path)}...")
 
-        initial_prompt = (
-            "هذا التسجيل باللهجة الأردنية العامية. "
-            "يرجى كتابة النص كما هو مسموع تماماً. "
-            "المصطلحات التقنية تكتب بالإنجليزية."
-        )
-
-        segments_generator, info = model.transcribe(
-            audio_path,
-            language="ar",
-            initial_prompt=initial_prompt,
-            beam_size=1,
-            vad_filter=True,
-            vad_parameters=dict(min_silence_duration_ms=500),
-            condition_on_previous_text=False 
-        )
-
-        total_duration = info.duration
-        
+        decoder = None
+        if streaming:
+            # Loads the model itself, once there is speech to transcribe
+            segments, decoder = _streamed_segments(get_model, audio_path, check_cancel, start_sample, metrics,
+                                                   mode, cache)
+            try:
+                from duration_probe import read_container_duration
+                remaining = max(0.0, read_container_duration(audio_path) - start_offset)
+            except Exception:
+                remaining = 0.0  # percentages stay at 0 until the end
+        else:
+            get_model()
+            if audio is None:
+                audio = audio_path
+                if mode == "chunked" or start_offset > 0:
+                    from faster_whisper import decode_audio
+                    with metrics.stage("decode"):
+                        audio = decode_audio(audio_path, sampling_rate=SAMPLE_RATE)
+            if start_offset > 0:
+                # Resume: cut off what is already done, shift timestamps back
+                audio = audio[start_sample:]
+                if speech is not None:
+                    speech = _speech_after(speech, start_sample)
+
+            if mode == "batched":
+                segments, remaining = _batched_segments(model, audio, check_cancel, start_offset, metrics, speech)
+            elif mode == "chunked" and len(audio) / SAMPLE_RATE >= global_vars.chunked_min_seconds:
+                segments, remaining = _chunked_segments(model, audio, check_cancel, start_offset, metrics, speech)
+            else:
+                segments, remaining = _sequential_segments(model, audio, check_cancel, start_offset, metrics, speech)
+        total_duration = start_offset + remaining
+        metrics.audio_seconds = remaining
+
         text_buffer = []
-        last_milestone = 0
+        last_milestone = (start_offset / total_duration) * 100 if total_duration > 0 else 0
+        last_end = start_offset
 
-        for segment in segments_generator:
+        # Inference and callbacks alternate per segment: their totals are
+        # exact, the trace gets one inference span per progress update
+        span_start = time.perf_counter()
+        wait_start = span_start
+        for segment in segments:
+            received = time.perf_counter()
+            metrics.add("inference", received - wait_start)
+            metrics.segments += 1
             if check_cancel and check_cancel(): 
                 break
 
-            text_buffer.append(segment.text.strip())
+            if segment_callback:
+                segment_callback(segment)
+            text_buffer.append(segment.text)
+            last_end = segment.end
             
             if total_duration > 0:
-                current_percent = (segment.end / total_duration) * 100
+                # (A streamed file's length is the container's estimate until it is decoded)
+                current_percent = min(100.0, (segment.end / total_duration) * 100)
             else:
                 current_percent = 0
 
@@ -74,23 +545,47 @@ def run_transcription(audio_path, progress_callback=None, status_callback=None,
             if (current_percent - last_milestone >= 1) or (current_percent >= 99 and last_milestone < 99):
                 
                 chunk_text = " ".join(text_buffer)
+                metrics.span("inference", span_start, received)
                 
                 if progress_callback:
                     # Send: (0.XX float, Text Chunk)
                     progress_callback(current_percent / 100.0, chunk_text)
+                if checkpoint_callback:
+                    checkpoint_callback(last_end, current_percent / 100.0)
                 
                 text_buffer = [] # Clear buffer
                 last_milestone = current_percent
+                span_start = time.perf_counter()
+                metrics.span("callbacks", received, span_start)
+
+            wait_start = time.perf_counter()
+            metrics.add("callbacks", wait_start - received)
+
+        metrics.span("inference", span_start, time.perf_counter())
+
+        if decoder is not None and decoder.done:
+            # A streamed file's real length is known now
+            total_duration = decoder.samples / SAMPLE_RATE
+            metrics.audio_seconds = max(0.0, total_duration - start_offset)
 
         # Final flush for any remaining text
         if text_buffer:
-            final_chunk = " ".join(text_buffer)
-            if progress_callback:
-                progress_callback(1.0, final_chunk)
+            with metrics.stage("callbacks"):
+                final_chunk = " ".join(text_buffer)
+                if progress_callback:
+                    progress_callback(1.0, final_chunk)
+                if checkpoint_callback:
+                    checkpoint_callback(last_end, 1.0)
 
         if status_callback: status_callback("Done!")
 
+        # Duration as decoded by the model (works for video containers too)
+        return total_duration
+
     except Exception as e:
         raise e
-    
-    # CRITICAL: Model stays alive globally.
\ No newline at end of file
+
+    finally:
+        # The model stays resident; the registry may now drop it when idle
+        if model is not None:
+            MODELS.release(model_name, model_slot)
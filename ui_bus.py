@@ -0,0 +1,44 @@
+import threading
+from collections import deque
+
+
+class UIEventBus:
+    """
+    Thread-safe hand-off from the worker threads to the UI thread.
+
+    Workers post events; the UI drains them on its own clock (one after()
+    loop) instead of every chunk scheduling its own self.after(0, ...).
+    Consecutive progress events of the same job are merged into one: the
+    latest percentage wins and the text chunks are collected in order.
+    Lifecycle events (started, done, ...) keep their order relative to the
+    progress around them.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = deque()
+        self._open_progress = {}  # job_id -> progress event still accepting merges
+
+    def post_progress(self, job, percent, chunk_text):
+        with self._lock:
+            event = self._open_progress.get(job.job_id)
+            if event is None:
+                event = ["progress", job, percent, []]
+                self._events.append(event)
+                self._open_progress[job.job_id] = event
+            event[2] = percent
+            if chunk_text:
+                event[3].append(chunk_text)
+
+    def post(self, kind, job, *args):
+        with self._lock:
+            # Progress after this event must not merge into earlier progress
+            self._open_progress.pop(job.job_id, None)
+            self._events.append((kind, job) + args)
+
+    def drain(self):
+        """ Returns everything posted since the last drain, in order. """
+        with self._lock:
+            events = self._events
+            self._events = deque()
+            self._open_progress.clear()
+        return events
@@ -1,9 +1,11 @@
 from mutagen.mp3 import MP3
 from mutagen.wave import WAVE
+import hashlib
 import os
 import shutil
 import time
 import stat
+import subprocess
 import sys
 
 
@@ -66,6 +68,47 @@ class Util():
 
         return os.path.join(base_path, relative_path)
     @staticmethod
+    def app_data_dir(*parts):
+        """
+        Stable per-user folder for things that must survive restarts
+        (caches, calibration results, the queue). Set TRANSCRIPTOR_HOME to
+        move it.
+        """
+        base = os.environ.get("TRANSCRIPTOR_HOME")
+        if not base:
+            if sys.platform == "win32":
+                root = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+                base = os.path.join(root, "Transcriptor")
+            elif sys.platform == "darwin":
+                base = os.path.expanduser("~/Library/Application Support/Transcriptor")
+            else:
+                root = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+                base = os.path.join(root, "transcriptor")
+
+        path = os.path.join(base, *parts)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def file_sha256(file_path, block_size=1024 * 1024):
+        """ Hex SHA-256 of the file's content, read in blocks. """
+        h = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    @staticmethod
+    def open_path(path):
+        """ Opens a file with its default application (Word for .rtf / .docx) on any OS. """
+        if sys.platform == "win32":
+            os.startfile(path)
+        elif sys.platform == "darwin":
+            subprocess.Popen(["open", path])
+        else:
+            subprocess.Popen(["xdg-open", path])
+
+    @staticmethod
     def force_delete_folder(folder_path, max_retries=10, delay=0.1):
         """
         Safely deletes a folder and all its contents, with retry logic for locked files.
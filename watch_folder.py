@@ -0,0 +1,286 @@
+"""
+Watch-folder ingestion: new recordings dropped anywhere under a folder are
+queued automatically, and their transcripts are written to a mirrored tree.
+
+    <watch root>/2024/05/call.mp3  ->  <output root>/2024/05/call.txt
+
+Change detection uses watchdog (inotify / ReadDirectoryChangesW / FSEvents)
+when it is installed. Otherwise, or with global_vars.watch_use_polling (for
+network shares that don't deliver events), a poller stats only the
+directories: a directory whose mtime didn't change has no new files, so a
+poll costs one stat per directory, not one per file.
+
+A file is taken once its size and mtime have been unchanged for
+watch_stable_seconds (recorders write for a while). It is then hashed and
+checked against every file seen before (watch.sqlite in the app data
+folder); the same recording copied twice is transcribed once. Files
+already handled in an earlier session are recognised by (path, size, mtime)
+without hashing them again. Ready files are handed over in batches
+(on_batch) from the watcher's own threads - never on the UI thread.
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import global_vars
+from segment_store import SegmentStore
+from util import Util
+
+# Names recorders / copy tools use while a file is still being written
+_TEMP_SUFFIXES = (".part", ".tmp", ".crdownload", ".partial")
+
+
+def is_candidate(path):
+    name = os.path.basename(path)
+    if name.startswith((".", "~$")) or name.lower().endswith(_TEMP_SUFFIXES):
+        return False
+    return os.path.splitext(name)[1].lower() in global_vars.media_extensions
+
+
+class _DirectoryPoller:
+    """ Fallback change detection: rescans only directories whose mtime changed. """
+    def __init__(self, root, on_file, skip_dir):
+        self.root = root
+        self.on_file = on_file
+        self.skip_dir = skip_dir
+        self.dirs = {}   # dir path -> (mtime_ns, set of entry names)
+
+    def scan(self, path):
+        """ (Re)reads one directory; new subdirectories are scanned recursively. """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            entries = list(os.scandir(path))
+        except OSError:
+            self.dirs.pop(path, None)
+            return
+        old_names = self.dirs.get(path, (None, set()))[1]
+        self.dirs[path] = (mtime, {e.name for e in entries})
+        for entry in entries:
+            if entry.name in old_names:
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if not self.skip_dir(entry.path):
+                        self.scan(entry.path)
+                elif entry.is_file():
+                    self.on_file(entry.path)
+            except OSError:
+                pass
+
+    def poll(self):
+        for path, (mtime, _) in list(self.dirs.items()):
+            try:
+                changed = os.stat(path).st_mtime_ns != mtime
+            except OSError:
+                # Directory gone; forget it and everything below it
+                for known in [d for d in self.dirs if d == path or d.startswith(path + os.sep)]:
+                    del self.dirs[known]
+                continue
+            if changed:
+                self.scan(path)
+
+
+class FolderWatcher:
+    """
+    Watches root and calls on_batch(paths) with new, complete, not yet seen
+    media files. output_path(file_path, fmt) gives the mirrored transcript
+    location; write_outputs(file_path, store_path) writes them.
+    """
+    def __init__(self, root, output_root, on_batch):
+        self.root = os.path.abspath(root)
+        self.output_root = os.path.abspath(output_root)
+        self.on_batch = on_batch
+        self._pending = {}   # path -> (size, mtime_ns, unchanged since)
+        self._batch = []
+        self._batch_started = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._observer = None
+        self._poller = None
+        # Hashing and output writing stay off the watcher's own loop
+        self._io = ThreadPoolExecutor(max_workers=2, thread_name_prefix="watch-io")
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(Util.app_data_dir(), "watch.sqlite"), check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT, added REAL,"
+                " state TEXT)")  # queued, done, duplicate
+            self._db.execute("CREATE TABLE IF NOT EXISTS digests (digest TEXT PRIMARY KEY, path TEXT)")
+
+    # --- LIFECYCLE ---
+    def start(self):
+        os.makedirs(self.output_root, exist_ok=True)
+        if not global_vars.watch_use_polling:
+            try:
+                self._start_watchdog()
+            except ImportError:
+                print("watchdog is not installed, watching by polling")
+        if self._observer is None:
+            self._poller = _DirectoryPoller(self.root, self._candidate, self._skip_dir)
+
+        loop = threading.Thread(target=self._run, daemon=True, name="watch-folder")
+        loop.start()
+        self._threads.append(loop)
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        # A transcript being written is finished (the app deletes the segment
+        # stores next); queued writes are dropped - those files stay "queued"
+        # and are transcribed again next time
+        self._io.shutdown(wait=True, cancel_futures=True)
+        self._db.close()
+
+    def _start_watchdog(self):
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_created(self, event):
+                if not event.is_directory:
+                    watcher._candidate(event.src_path)
+
+            def on_modified(self, event):
+                if not event.is_directory:
+                    watcher._candidate(event.src_path)
+
+            def on_moved(self, event):
+                # Recorders often write "x.tmp" and rename it when finished
+                if not event.is_directory:
+                    watcher._candidate(event.dest_path)
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), self.root, recursive=True)
+        self._observer.start()
+
+    def _skip_dir(self, path):
+        # The output tree may live inside the watched one
+        path = os.path.abspath(path)
+        return path == self.output_root or path.startswith(self.output_root + os.sep)
+
+    # --- DETECTION ---
+    def _candidate(self, path):
+        path = os.path.abspath(path)
+        if not is_candidate(path) or self._skip_dir(os.path.dirname(path)):
+            return
+        with self._lock:
+            if path not in self._pending:
+                self._pending[path] = (None, None, time.monotonic())
+
+    def _run(self):
+        if global_vars.watch_scan_existing or self._poller is not None:
+            # One walk at startup: files dropped while the app was closed
+            # (known ones are skipped by path/size/mtime, without hashing)
+            poller = self._poller or _DirectoryPoller(self.root, self._candidate, self._skip_dir)
+            poller.scan(self.root)
+        last_poll = time.monotonic()
+
+        while not self._stop.wait(1.0):
+            if self._poller is not None and time.monotonic() - last_poll >= global_vars.watch_poll_seconds:
+                self._poller.poll()
+                last_poll = time.monotonic()
+            self._check_pending()
+            self._flush_batch()
+
+    def _check_pending(self):
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            items = list(self._pending.items())
+        for path, (size, mtime, since) in items:
+            try:
+                st = os.stat(path)
+            except OSError:
+                with self._lock:
+                    self._pending.pop(path, None)
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime):
+                # Still growing (or first look): restart the quiet period
+                with self._lock:
+                    self._pending[path] = (st.st_size, st.st_mtime_ns, now)
+            elif st.st_size > 0 and now - since >= global_vars.watch_stable_seconds:
+                with self._lock:
+                    self._pending.pop(path, None)
+                ready.append((path, st))
+        for path, st in ready:
+            self._io.submit(self._admit, path, st)
+
+    # --- DEDUPE ---
+    def _admit(self, path, st):
+        """ Hash + dedupe (I/O thread); new files join the next batch. """
+        try:
+            with self._db_lock:
+                row = self._db.execute("SELECT size, mtime_ns, state FROM files WHERE path=?", (path,)).fetchone()
+            known = row and row[0] == st.st_size and row[1] == st.st_mtime_ns
+            if known and row[2] in ("done", "duplicate"):
+                return  # Handled in an earlier session
+            if not known:
+                digest = Util.file_sha256(path)
+                with self._db_lock, self._db:
+                    first = self._db.execute("SELECT path FROM digests WHERE digest=?", (digest,)).fetchone()
+                    if first is None or first[0] == path:
+                        self._db.execute("INSERT OR REPLACE INTO digests VALUES (?, ?)", (digest, path))
+                    duplicate = first is not None and first[0] != path
+                    self._db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                                     (path, st.st_size, st.st_mtime_ns, digest, time.time(),
+                                      "duplicate" if duplicate else "queued"))
+                if duplicate:
+                    print(f"Watch folder: {path} has the same content as {first[0]}, skipped")
+                    return
+            # else: queued in an earlier session but never finished - queue it again
+        except OSError as e:
+            print(f"Watch folder: could not read {path}: {e}")
+            return
+
+        with self._lock:
+            if not self._batch:
+                self._batch_started = time.monotonic()
+            self._batch.append(path)
+            full = len(self._batch) >= global_vars.watch_batch_size
+        if full:
+            self._flush_batch(force=True)
+
+    def _flush_batch(self, force=False):
+        with self._lock:
+            if not self._batch:
+                return
+            if not force and time.monotonic() - self._batch_started < global_vars.watch_batch_seconds:
+                return
+            batch, self._batch = self._batch, []
+        try:
+            self.on_batch(batch)
+        except Exception as e:
+            print(f"Watch folder: could not queue {len(batch)} files: {e}")
+
+    # --- OUTPUT ---
+    def output_path(self, file_path, fmt):
+        rel = os.path.relpath(os.path.abspath(file_path), self.root)
+        return os.path.join(self.output_root, os.path.splitext(rel)[0] + "." + fmt)
+
+    def write_outputs(self, file_path, store_path):
+        """ Writes the finished transcript into the mirrored tree (I/O thread). """
+        def write():
+            store = SegmentStore(store_path)
+            for fmt in global_vars.watch_output_formats:
+                out_path = self.output_path(file_path, fmt)
+                part_path = out_path + ".part"
+                try:
+                    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                    store.export(part_path, fmt)
+                    os.replace(part_path, out_path)
+                except Exception as e:
+                    print(f"Watch folder: could not write {out_path}: {e}")
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+                    return
+            with self._db_lock, self._db:
+                self._db.execute("UPDATE files SET state='done' WHERE path=?", (os.path.abspath(file_path),))
+        return self._io.submit(write)